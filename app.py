@@ -4,7 +4,8 @@ import streamlit as st
 from dotenv import load_dotenv
 from styles import get_css_styles
 from prompts import create_health_assessment, parse_health_keywords, get_system_message
-from data import HealthRAGSystem
+from data import get_health_system
+from catalog_index import HEALTH_CONCERN_OPTIONS, PHYSIOLOGY_OPTIONS
 
 # Streamlit secrets에서 API 키 가져오기
 try:
@@ -73,6 +74,22 @@ def score_to_status(score):
     else:
         return "주의"
 
+# 코호트 백분위 인덱스 (cohort_percentile.py 로 생성한 파일이 있을 때만 사용)
+PERCENTILE_INDEX_PATH = "data/cohort_percentiles.npz"
+
+@st.cache_resource
+def load_percentile_index():
+    """코호트 백분위 인덱스를 한 번만 로드"""
+    if not os.path.exists(PERCENTILE_INDEX_PATH):
+        return None
+    from cohort_percentile import CohortPercentileIndex
+    return CohortPercentileIndex.load(PERCENTILE_INDEX_PATH)
+
+# what-if 슬라이더 (현재 값이 기본 범위 밖이면 범위를 값까지 넓힘 - Streamlit 은 범위 밖 기본값에서 예외)
+def what_if_slider(label, min_value, max_value, value, step):
+    value = float(value)
+    return st.slider(label, min(min_value, value), max(max_value, value), value, step)
+
 # PDF 업로드 및 저장된 데이터 불러오기 섹션
 col_upload, col_saved = st.columns(2)
 
@@ -117,15 +134,9 @@ with col_saved:
             if selected_person_data:
                 # calculate.py를 사용하여 건강 지표 계산
                 try:
-                    # calculate.py에서 필요한 추가 데이터 설정
-                    calc_data = selected_person_data.copy()
-                    
-                    # calculate.py에서 필요하지만 person_data.json에 없는 필드들을 기본값으로 설정
-                    calc_data.setdefault('pack_year', calc_data.get('smok_dur', 0) * 0.5)  # 대략적인 추정
-                    calc_data.setdefault('met', 3.8)  # 기본값
-                    calc_data.setdefault('rfs', 27.3)  # 기본값
-                    calc_data.setdefault('eq5d', 0.89)  # 기본값
-                    calc_data.setdefault('asm', calc_data.get('skeletal_muscle_mass', 0))  # ASM = 골격근량
+                    # person_data.json에 없는 필드(pack_year, met, rfs, eq5d, asm)는 스키마 기본값으로 설정
+                    from record_schema import RECORD_SCHEMA
+                    calc_data = RECORD_SCHEMA.fill_defaults(selected_person_data)
                     
                     # calculate.py의 함수들 import 및 실행
                     from calculate import calculate_three_indices
@@ -142,7 +153,45 @@ with col_saved:
                         st.metric("💪 근육 점수", f"{health_indices['근육 밸런스 분석지수']:.0f}점")
                     with col3:
                         st.metric("🏥 만성질환 점수", f"{health_indices['만성질환 억제 분석지수']:.0f}점")
-                    
+
+                    # 연령대/성별 코호트 내 백분위 (인덱스 파일이 있는 경우)
+                    percentile_index = load_percentile_index()
+                    if percentile_index is not None:
+                        percentiles = percentile_index.percentiles(health_indices, calc_data['age'], calc_data['sex'])
+                        ranks = [f"{name} 상위 {100 - p:.0f}%" for name, p in percentiles.items() if p is not None]
+                        if ranks:
+                            st.caption(f"👥 같은 연령대·성별 기준: {', '.join(ranks)}")
+
+                    # 생활습관 변화 시뮬레이션 (변경된 입력의 기여도만 갱신)
+                    with st.expander("🔮 생활습관을 바꾸면 점수가 어떻게 달라질까요?"):
+                        from what_if import WhatIfScorer
+                        if st.session_state.get('what_if_age') != selected_age_num:
+                            st.session_state.what_if_scorer = WhatIfScorer(calc_data)
+                            st.session_state.what_if_age = selected_age_num
+                        scorer = st.session_state.what_if_scorer
+
+                        quit_smoking = st.checkbox("금연 (흡연 기간·흡연량 0)", value=False)
+                        changes = {
+                            'sleep_time': what_if_slider("수면 시간", 3.0, 10.0, float(calc_data['sleep_time']), 0.5),
+                            'met': what_if_slider("신체활동량 (MET)", 0.0, 12.0, float(calc_data['met']), 0.25),
+                            'drink_amt': what_if_slider("음주량", 0.0, 15.0, float(calc_data['drink_amt']), 0.5),
+                            'smok_dur': 0 if quit_smoking else calc_data['smok_dur'],
+                            'pack_year': 0 if quit_smoking else calc_data['pack_year'],
+                        }
+                        scorer.update(changes)
+                        simulated = scorer.scores()
+
+                        sim_col1, sim_col2, sim_col3 = st.columns(3)
+                        for sim_col, (label, name) in zip(
+                            (sim_col1, sim_col2, sim_col3),
+                            (("🧬 노화", "노화 억제 분석지수"), ("💪 근육", "근육 밸런스 분석지수"), ("🏥 만성질환", "만성질환 억제 분석지수")),
+                        ):
+                            with sim_col:
+                                st.metric(label, f"{simulated[name]:.0f}점", f"{simulated[name] - health_indices[name]:+.1f}")
+
+                        top_factors = scorer.breakdown("노화 억제 분석지수")[:3]
+                        st.caption("노화 점수에 영향이 큰 항목: " + ", ".join(f"{var} {value:+.1f}점" for var, value in top_factors))
+
                     # 세션 상태에 계산된 값들 저장 (자동 선택용)
                     # 기존 OCR 결과 초기화 (저장된 데이터가 우선)
                     if 'auto_aging' in st.session_state:
@@ -320,46 +369,13 @@ current_assessments = {
 # 주의/관리 상태인 건강지표만 필터링
 problematic_indicators = [k for k, v in current_assessments.items() if v in ["주의", "관리"]]
 
-# 전체 키워드 옵션
-all_physiology_options = ['운동수행능력/지구력 향상', '항산화', '수면 건강', '혈당 조절', '눈 건강', '영양 균형', 
- '기억력 개선', '혈중 지질 개선', '혈행 개선', '근력(근육)', '피부 건강', '갱년기 여성 건강', '간 건강', '체지방 감소',
-  '장 건강', '면역 기능', '피로 개선', '전립선 건강', '코 과민반응', '위 건강', '관절/뼈 건강', '과민 피부 상태 개선', '혈압 조절']
-
-all_health_concern_options = ['운동수행능력/지구력 향상', '항산화', '수면 건강', '혈당 조절', '눈 건강', '영양 균형',
- '기억력 개선', '혈중 지질 개선', '혈행 개선', '근력(근육)', '피부 건강', '갱년기 여성 건강', '간 건강', '체지방 감소',
-  '장 건강', '면역 기능', '피로 개선', '전립선 건강', '코 과민반응', '위 건강', '관절/뼈 건강', '과민 피부 상태 개선', '혈압 조절']
-
-# 주의/관리 상태인 건강지표에 연관된 키워드만 필터링
-filtered_physiology_options = []
-filtered_health_concern_options = []
-
-if problematic_indicators:
-    try:
-        # 데이터베이스에서 건강지표와 연관된 관리영역 조회
-        health_system = HealthRAGSystem(GROQ_API_KEY)
-        health_relationships = health_system.get_health_indicator_relationships()
-        
-        # 주의/관리 상태인 건강지표와 연관된 관리영역들 수집
-        relevant_areas = []
-        for indicator in problematic_indicators:
-            if indicator in health_relationships:
-                relevant_areas.extend(health_relationships[indicator])
-        
-        # 중복 제거
-        relevant_areas = list(set(relevant_areas))
-        
-        # 연관된 영역만 필터링
-        filtered_physiology_options = [option for option in all_physiology_options if option in relevant_areas]
-        filtered_health_concern_options = [option for option in all_health_concern_options if option in relevant_areas]
-        
-    except Exception as e:
-        # 오류 발생 시 전체 옵션 사용
-        filtered_physiology_options = all_physiology_options
-        filtered_health_concern_options = all_health_concern_options
-else:
-    # 모든 건강지표가 "좋음"이거나 미선택인 경우 전체 옵션 사용
-    filtered_physiology_options = all_physiology_options
-    filtered_health_concern_options = all_health_concern_options
+# 주의/관리 상태인 건강지표에 연관된 키워드만 필터링 (지표 조합 8가지의 옵션은 미리 계산되어 있어 DB 조회 없음)
+try:
+    filtered_physiology_options, filtered_health_concern_options = get_health_system(GROQ_API_KEY).get_filtered_options(problematic_indicators)
+except Exception as e:
+    # 오류 발생 시 전체 옵션 사용
+    filtered_physiology_options = list(PHYSIOLOGY_OPTIONS)
+    filtered_health_concern_options = list(HEALTH_CONCERN_OPTIONS)
 
 # OCR 결과에서 영향준요인들을 기본값으로 설정 (필터링된 옵션 내에서만)
 auto_factors = []
@@ -428,8 +444,8 @@ if user_input:
             """, unsafe_allow_html=True)
         
         try:
-            # HealthRAGSystem 초기화
-            health_system = HealthRAGSystem(GROQ_API_KEY)
+            # 공유 HealthRAGSystem (엔진/커넥션 풀 재사용)
+            health_system = get_health_system(GROQ_API_KEY)
             
             # 건강 평가 생성
             assessments = create_health_assessment(age_sup, muscle_bal, chronic)
@@ -450,19 +466,18 @@ if user_input:
                 except Exception as e:
                     pass  # 데이터 로드 실패 시 user_data는 None으로 유지
             
-            # 새로운 추천 로직 사용 (DataFrame과 LLM 설명을 함께 받음)
-            result_df, llm_explanation = health_system.recommend_products(
+            # 새로운 추천 로직 사용 (DataFrame과 LLM 설명 스트림을 함께 받음 - 설명은 아래에서 토큰 단위로 표시)
+            result_df, explanation_chunks = health_system.recommend_products_stream(
                 assessments=assessments,
                 physiology_network=physiology_network,
                 health_concerns=health_concerns,
                 user_input=user_input,
                 user_data=user_data
             )
-            
-            # 결과 포맷팅 (LLM 설명 포함)
-            reply = health_system.format_recommendations(result_df, llm_explanation)
+            reply = None
             
         except Exception as e:
+            explanation_chunks = None
             reply = f"⚠️ 제품 추천 중 오류가 발생했습니다: {str(e)}"
         
         # 로딩 화면 제거
@@ -515,33 +530,33 @@ if user_input:
         
         # 건강 지표 상태를 제품 추천 결과와 함께 포함
         health_status_html = create_health_status_display(age_sup, muscle_bal, chronic)
-        complete_reply = health_status_html + reply
         
-        # 실시간 스트리밍 응답 표시
-        def stream_response(text):
-            import time
-            import re
-            
-            # 마크다운 구조를 유지하면서 스트리밍하기 위해 줄 단위로 분할
-            lines = text.split('\n')
-            accumulated_text = ""
-            
-            for line in lines:
-                accumulated_text += line + '\n'
-                yield accumulated_text
-                
-                # 헤더나 구분선이 아닌 일반 텍스트 줄의 경우 추가 딜레이
-                if line.strip() and not line.startswith('#') and not line.startswith('**') and line.strip() != '---':
-                    time.sleep(0.3)  # 일반 텍스트 줄 딜레이
-                else:
-                    time.sleep(0.1)  # 헤더/포맷팅 줄 딜레이
-        
-        # 스트리밍 응답 표시
+        # 실시간 스트리밍 응답 표시 (LLM 토큰이 도착하는 대로 누적해서 다시 그림)
         with st.chat_message("assistant"):
             response_placeholder = st.empty()
             
-            for partial_response in stream_response(complete_reply):
-                response_placeholder.markdown(partial_response, unsafe_allow_html=True)
+            if explanation_chunks is None:
+                complete_reply = health_status_html + reply
+            else:
+                import time
+                
+                response_placeholder.markdown(health_status_html, unsafe_allow_html=True)
+                llm_explanation = ""
+                last_render = 0.0
+                try:
+                    for chunk in explanation_chunks:
+                        llm_explanation += chunk
+                        # 토큰마다 전체 마크다운을 다시 그리지 않도록 약 20fps 로 제한
+                        if time.monotonic() - last_render >= 0.05:
+                            response_placeholder.markdown(health_status_html + llm_explanation, unsafe_allow_html=True)
+                            last_render = time.monotonic()
+                except Exception as e:
+                    llm_explanation += f"\n\n⚠️ 추천 근거 생성 중 오류가 발생했습니다: {str(e)}"
+                
+                # 결과 포맷팅 (LLM 설명 포함)
+                complete_reply = health_status_html + health_system.format_recommendations(result_df, llm_explanation)
+            
+            response_placeholder.markdown(complete_reply, unsafe_allow_html=True)
         
         # 응답 추가 (전체 응답 - 건강 지표 상태 포함)
         st.session_state.chat_history.append(("bot", complete_reply))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+대용량 검진 데이터 일괄 지수 계산 CLI
+- CSV / JSONL / Parquet 파일을 고정 크기 청크로 읽어 프로세스 풀에서 계산
+- 결과는 청크 단위로 바로 기록하고, 체크포인트로 중단 지점부터 재개
+- 동시에 메모리에 올라가는 청크 수를 제한하여 파일 크기와 무관하게 메모리 사용량 일정
+- 누락 필드 기본값(pack_year, met, rfs, eq5d, asm 등)은 record_schema 규칙으로 채움
+
+사용 예:
+    python batch_score.py inp_ehr.csv -o scores.csv --chunk-size 100000 --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from calculate import calculate_three_indices_batch
+
+DEFAULT_CHUNK_SIZE = 50000
+# 출력은 청크 단위로 이어 쓰고 체크포인트의 바이트 위치로 잘라 재개하므로 행 단위 텍스트 형식만 지원
+OUTPUT_FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.csv', '.txt'):
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    raise ValueError(f"지원하지 않는 파일 형식입니다: {path}")
+
+
+def resolve_output_format(path, fmt=None):
+    """출력 형식 결정 (지정값 → 확장자) - 판단할 수 없거나 지원하지 않는 형식이면 ValueError"""
+    if fmt is None:
+        try:
+            fmt = detect_format(path)
+        except ValueError:
+            raise ValueError(f"출력 파일 확장자로 형식을 판단할 수 없습니다: {path} (--output-format 으로 지정하세요)")
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"지원하지 않는 출력 형식입니다: {fmt} (CSV 또는 JSONL 만 가능 - Parquet 은 청크 단위 이어 쓰기/재개를 지원하지 않음)")
+    return fmt
+
+
+def iter_chunks(path, fmt, chunk_size):
+    """입력 파일을 chunk_size 행씩 DataFrame 으로 순회"""
+    if fmt == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif fmt == 'jsonl':
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    elif fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet 입력에는 pyarrow 가 필요합니다: pip install pyarrow")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"지원하지 않는 입력 형식입니다: {fmt}")
+
+
+def score_chunk(frame, keep_columns=None, errors='raise'):
+    """청크 하나의 세 지수를 계산하여 (보존 컬럼 + 지수) DataFrame 반환 - 워커 프로세스에서 실행"""
+    scores = calculate_three_indices_batch(frame, errors=errors)
+    kept = frame[keep_columns] if keep_columns is not None else frame
+    return pd.concat([kept, scores], axis=1)
+
+
+# =========================
+# 체크포인트
+# =========================
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    """임시 파일에 쓴 뒤 교체하여 중간에 중단되어도 체크포인트가 깨지지 않도록 저장"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# =========================
+# 출력
+# =========================
+def write_chunk(out, result, fmt, write_header):
+    if fmt == 'csv':
+        result.to_csv(out, header=write_header, index=False)
+    else:
+        result.to_json(out, orient='records', lines=True, force_ascii=False)
+    out.flush()
+    os.fsync(out.fileno())
+
+
+def run(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, checkpoint_path=None,
+        keep_columns=None, input_format=None, output_format=None, resume=True, errors='raise', log=sys.stderr):
+    """입력 파일 전체를 청크 단위로 계산하여 output_path 에 기록"""
+    input_format = input_format or detect_format(input_path)
+    output_format = resolve_output_format(output_path, output_format)
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint.json"
+
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state is not None:
+        if state['input'] != os.path.abspath(input_path) or state['chunk_size'] != chunk_size:
+            raise ValueError("체크포인트의 입력 파일 또는 chunk-size 가 현재 실행과 다릅니다. --no-resume 으로 새로 시작하세요.")
+        log.write(f"체크포인트에서 재개: {state['chunks_done']}개 청크 ({state['rows_done']}행) 완료\n")
+    else:
+        state = {
+            'input': os.path.abspath(input_path),
+            'chunk_size': chunk_size,
+            'chunks_done': 0,
+            'rows_done': 0,
+            'output_bytes': 0,
+        }
+
+    # 마지막 체크포인트 이후에 기록된 (불완전할 수 있는) 결과는 잘라냄
+    mode = 'r+' if state['output_bytes'] and os.path.exists(output_path) else 'w'
+    with open(output_path, mode, encoding='utf-8', newline='') as out:
+        out.seek(state['output_bytes'])
+        out.truncate()
+
+        pending = deque()
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            def flush_head():
+                chunk_idx, future = pending.popleft()
+                result = future.result() if executor else future
+                write_chunk(out, result, output_format, write_header=chunk_idx == 0)
+                state['chunks_done'] = chunk_idx + 1
+                state['rows_done'] += len(result)
+                state['output_bytes'] = out.tell()
+                save_checkpoint(checkpoint_path, state)
+                log.write(f"[{state['chunks_done']}] {state['rows_done']}행 완료\n")
+
+            for chunk_idx, frame in enumerate(iter_chunks(input_path, input_format, chunk_size)):
+                if chunk_idx < state['chunks_done']:
+                    continue
+                if executor:
+                    pending.append((chunk_idx, executor.submit(score_chunk, frame, keep_columns, errors)))
+                    # 진행 중인 청크 수를 제한하여 메모리 사용량을 일정하게 유지
+                    if len(pending) >= workers * 2:
+                        flush_head()
+                else:
+                    pending.append((chunk_idx, score_chunk(frame, keep_columns, errors)))
+                    flush_head()
+
+            while pending:
+                flush_head()
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+    state['finished'] = True
+    save_checkpoint(checkpoint_path, state)
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="검진 데이터 파일의 노화/만성질환/근육 지수를 청크 단위로 계산")
+    parser.add_argument('input', help="입력 파일 (CSV / JSONL / Parquet)")
+    parser.add_argument('-o', '--output', required=True, help="출력 파일 (CSV 또는 JSONL)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="청크당 행 수")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="프로세스 수 (1이면 단일 프로세스)")
+    parser.add_argument('--checkpoint', help="체크포인트 파일 경로 (기본: <output>.checkpoint.json)")
+    parser.add_argument('--keep', help="결과에 함께 기록할 입력 컬럼 (쉼표 구분, 기본: 전체)")
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'parquet'], help="입력 형식 (기본: 확장자로 판단)")
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, help="출력 형식 (기본: 확장자로 판단)")
+    parser.add_argument('--errors', choices=['raise', 'coerce'], default='raise',
+                        help="검증 실패 행 처리 (raise: 중단, coerce: 해당 행 지수를 빈 값으로 기록)")
+    parser.add_argument('--no-resume', action='store_true', help="체크포인트를 무시하고 처음부터 계산")
+    args = parser.parse_args(argv)
+
+    try:
+        resolve_output_format(args.output, args.output_format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    keep_columns = [col.strip() for col in args.keep.split(',') if col.strip()] if args.keep else None
+    state = run(
+        args.input, args.output,
+        chunk_size=args.chunk_size,
+        workers=max(1, args.workers),
+        checkpoint_path=args.checkpoint,
+        keep_columns=keep_columns,
+        input_format=args.format,
+        output_format=args.output_format,
+        resume=not args.no_resume,
+        errors=args.errors,
+    )
+    print(f"✅ 완료: {state['rows_done']}행 → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+지수 계산기 벤치마크
+- 모델 계수의 mean / std 로 현실적인 합성 코호트 생성
+- 단건(scalar) / 배치(batch) / 프로세스 풀(pool) 경로의 초당 처리 건수와 메모리 사용량 측정
+- 경로마다 워밍업 1회 후 --repeats 번 측정해 가장 빠른 값 사용 (한 번 측정이 --min-time 초보다 짧으면 반복해서 누적)
+- 기준값(baseline) 대비 처리량이 허용 폭(--tolerance + 두 측정의 반복 간 편차) 이상 떨어지면 종료 코드 1 로 실패
+
+사용 예:
+    python bench_calculate.py                                  # 1k, 100k, 10M
+    python bench_calculate.py --sizes 1k,100k --save-baseline bench_baseline.json
+    python bench_calculate.py --sizes 1k,100k --baseline bench_baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calculate import calculate_three_indices, calculate_three_indices_batch
+from index_registry import INPUT_COLUMNS, MUSCLE_PERCENT_FIELDS, current_models
+from record_schema import RECORD_SCHEMA
+
+CHUNK_SIZE = 1_000_000          # 배치/풀 경로에서 한 번에 계산하는 최대 행 수
+DEFAULT_SCALAR_MAX = 100_000    # 단건 경로는 이 건수까지만 측정
+MEMORY_SAMPLE_SIZE = 10_000     # 메모리 측정용 샘플 크기 (tracemalloc 은 측정 대상 속도를 떨어뜨리므로 분리)
+WARMUP_SIZE = 1_000             # 워밍업 건수
+DEFAULT_REPEATS = 5
+DEFAULT_MIN_TIME = 0.2          # 측정 1회의 최소 누적 시간 (초)
+SEX_CODES = (1, 2)              # 1: 남성, 2: 여성 (person_data.json / health_rules 와 같은 코드)
+
+
+# =========================
+# 합성 코호트
+# =========================
+def _term_distributions():
+    """모델 계수에 있는 변수별 (mean, std) - 여러 지수에 나오는 변수는 첫 값 사용"""
+    distributions = {}
+    for model in current_models().models.values():
+        for var, mean, std, _ in model.terms:
+            distributions.setdefault(var, (mean, std))
+    return distributions
+
+
+def generate_cohort(n, seed=0):
+    """INPUT_COLUMNS 를 갖는 합성 코호트 DataFrame (스키마 허용 범위로 클리핑)"""
+    rng = np.random.default_rng(seed)
+    distributions = _term_distributions()
+    columns = {}
+    columns['weight'] = rng.normal(68.0, 12.0, n)
+    for var, source in MUSCLE_PERCENT_FIELDS:
+        mean, std = distributions[var]
+        columns[source] = rng.normal(mean, std, n) * columns['weight'] / 100
+    for var in INPUT_COLUMNS:
+        if var in columns:
+            continue
+        if var == 'sex':
+            columns[var] = np.where(rng.random(n) < distributions[var][0], SEX_CODES[1], SEX_CODES[0])
+        else:
+            mean, std = distributions[var]
+            columns[var] = rng.normal(mean, std, n)
+    for spec in RECORD_SCHEMA.fields:
+        np.clip(columns[spec.name], spec.min_val, spec.max_val, out=columns[spec.name])
+    return pd.DataFrame({var: columns[var] for var in INPUT_COLUMNS})
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+
+
+# =========================
+# 측정 경로
+# =========================
+def _chunks(n):
+    """n 행을 CHUNK_SIZE 단위로 나눈 크기 목록"""
+    sizes = [CHUNK_SIZE] * (n // CHUNK_SIZE)
+    if n % CHUNK_SIZE:
+        sizes.append(n % CHUNK_SIZE)
+    return sizes
+
+
+def run_scalar(cohort, n):
+    records = cohort.iloc[:n].to_dict('records')
+    start = time.perf_counter()
+    for record in records:
+        calculate_three_indices(record)
+    return time.perf_counter() - start
+
+
+def run_batch(cohort, n):
+    elapsed = 0.0
+    for size in _chunks(n):
+        chunk = cohort.iloc[:size]
+        start = time.perf_counter()
+        calculate_three_indices_batch(chunk)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def run_pool(cohort, n, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(calculate_three_indices_batch, [cohort.iloc[:1]] * workers))  # 워커 기동 비용 제외
+        start = time.perf_counter()
+        list(executor.map(calculate_three_indices_batch, (cohort.iloc[:size] for size in _pool_chunks(n, workers))))
+        return time.perf_counter() - start
+
+
+def _pool_chunks(n, workers):
+    sizes = _chunks(n)
+    # 청크가 하나뿐이면 워커 수만큼 나눠서 분산
+    if len(sizes) == 1 and n >= workers:
+        sizes = [len(part) for part in np.array_split(np.arange(n), workers)]
+    return sizes
+
+
+def _traced_batch(frame):
+    """워커 프로세스 안에서 배치 계산의 최대 메모리 (MB)"""
+    return peak_memory_mb(calculate_three_indices_batch, frame)
+
+
+def pool_peak_memory_mb(cohort, n, workers):
+    """동시에 실행되는 워커 수 × 워커 1개의 최대 메모리 (프로세스 풀 전체의 상한 추정)"""
+    sizes = _pool_chunks(min(n, CHUNK_SIZE * workers), workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        peaks = list(executor.map(_traced_batch, (cohort.iloc[:size] for size in sizes)))
+    return max(peaks) * min(workers, len(sizes))
+
+
+def peak_memory_mb(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def measure(run, records, repeats=DEFAULT_REPEATS, min_time=DEFAULT_MIN_TIME):
+    """
+    run(records) 의 건당 처리 시간 측정 - 워밍업 1회 후 repeats 번 측정해 (최소, 최대) 초 반환
+    - 측정 1회가 min_time 보다 짧으면 min_time 이 될 때까지 반복 실행한 평균
+    """
+    run(min(records, WARMUP_SIZE))
+    samples = []
+    for _ in range(max(1, repeats)):
+        elapsed, loops = 0.0, 0
+        while loops == 0 or elapsed < min_time:
+            elapsed += run(records)
+            loops += 1
+        samples.append(elapsed / loops)
+    return min(samples), max(samples)
+
+
+def benchmark(sizes, workers, scalar_max, seed=0, repeats=DEFAULT_REPEATS, min_time=DEFAULT_MIN_TIME):
+    """{경로: {크기: {'records_per_sec', 'seconds', 'records', 'spread', 'peak_mb'}}}"""
+    cohort = generate_cohort(min(max(sizes), CHUNK_SIZE), seed=seed)
+    results = {'scalar': {}, 'batch': {}, 'pool': {}}
+    for n in sizes:
+        scalar_n = min(n, scalar_max)
+        paths = {
+            'scalar': (scalar_n, lambda k: run_scalar(cohort, k), lambda: peak_memory_mb(run_scalar, cohort, min(scalar_n, MEMORY_SAMPLE_SIZE))),
+            'batch': (n, lambda k: run_batch(cohort, k), lambda: peak_memory_mb(run_batch, cohort, min(n, CHUNK_SIZE))),
+            'pool': (n, lambda k: run_pool(cohort, k, workers), lambda: pool_peak_memory_mb(cohort, n, workers)),
+        }
+        for path, (records, timed, memory) in paths.items():
+            best, worst = measure(timed, records, repeats=repeats, min_time=min_time)
+            results[path][str(n)] = {
+                'records': records,
+                'seconds': round(best, 4),
+                'records_per_sec': round(records / best, 1) if best > 0 else float('inf'),
+                # 반복 측정 간 상대 편차 (회귀 판정 허용 폭에 더함)
+                'spread': round((worst - best) / best, 4) if best > 0 else 0.0,
+                'peak_mb': round(memory(), 1),
+            }
+    return results
+
+
+# =========================
+# 리포트 / 회귀 검사
+# =========================
+def format_report(results, workers):
+    lines = [f"{'경로':<8}{'크기':>12}{'측정 건수':>12}{'초':>10}{'건/초':>16}{'편차':>8}{'최대 메모리(MB)':>18}"]
+    for path, by_size in results.items():
+        label = f"{path}x{workers}" if path == 'pool' else path
+        for size, row in by_size.items():
+            lines.append(f"{label:<8}{int(size):>12,}{row['records']:>12,}{row['seconds']:>10.3f}"
+                         f"{row['records_per_sec']:>16,.0f}{row['spread'] * 100:>7.1f}%{row['peak_mb']:>18.1f}")
+    return "\n".join(lines)
+
+
+def find_regressions(results, baseline, tolerance, max_spread=0.5):
+    """
+    기준 처리량 대비 허용 폭 이상 떨어진 (경로, 크기, 현재, 기준) 목록
+    - 허용 폭 = tolerance + 현재/기준 측정 중 큰 반복 간 편차 (최대 max_spread)
+    """
+    regressions = []
+    for path, by_size in baseline.items():
+        for size, expected in by_size.items():
+            current = results.get(path, {}).get(size)
+            if current is None:
+                continue
+            noise = min(max_spread, max(current.get('spread', 0.0), expected.get('spread', 0.0)))
+            band = min(tolerance + noise, 0.95)
+            if current['records_per_sec'] < expected['records_per_sec'] * (1 - band):
+                regressions.append((path, size, current['records_per_sec'], expected['records_per_sec']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VitalLOG 지수 계산기 벤치마크")
+    parser.add_argument('--sizes', default='1k,100k,10M', help="코호트 크기 목록 (쉼표 구분, k/M 접미사 허용)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="프로세스 풀 워커 수")
+    parser.add_argument('--scalar-max', type=parse_size, default=DEFAULT_SCALAR_MAX, help="단건 경로 최대 측정 건수")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="경로별 측정 횟수 (가장 빠른 값 사용)")
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME, help="측정 1회의 최소 누적 시간 (초)")
+    parser.add_argument('--output', help="측정 결과 JSON 저장 경로")
+    parser.add_argument('--baseline', help="비교할 기준 결과 JSON")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="허용 처리량 하락 비율 (기본 0.2 = 20%%)")
+    parser.add_argument('--save-baseline', help="이번 결과를 기준값으로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    results = benchmark(sizes, max(1, args.workers), args.scalar_max, seed=args.seed,
+                        repeats=args.repeats, min_time=args.min_time)
+    print(format_report(results, args.workers))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ 처리량 회귀 감지:")
+            for path, size, current, expected in regressions:
+                print(f"  - {path} {int(size):,}건: {current:,.0f}건/초 (기준 {expected:,.0f}건/초)")
+            sys.exit(1)
+        print("\n✅ 기준 대비 처리량 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,15 @@ VitalLOG 3가지 지수 계산 시스템 (완전 공식 반영판)
 - 노화 억제 분석지수 (OXI)
 - 만성질환 억제 분석지수 (MET)
 - 근육 밸런스 분석지수 (MUS)
+계수(β, mean, std, Type 보정, 정규화 범위)는 data/index_models.json 에서 로드 (index_registry 참고)
 """
 
+import numpy as np
+import pandas as pd
+
+from index_registry import FEATURE_INDEX, FEATURES, INPUT_COLUMNS, MUSCLE_PERCENT_FIELDS, current_models
+from record_schema import RECORD_SCHEMA
+
 # =========================
 # 공통 함수
 # =========================
@@ -23,42 +30,7 @@ def calculate_oxi(data):
     노화 억제 분석지수 (OXI)
     Type 10 → Type 2 보정 공식 반영
     """
-    # 절편 (문서 기반)
-    raw_score = 26.426
-
-    # 모든 기여도 (문서에 있는 변수별 β, mean, std 사용)
-    contrib = 0
-    contrib += ((data['age'] - 45.2) / 12.8) * 0.082
-    contrib += ((data['sex'] - 0.48) / 0.50) * (-0.045)
-    contrib += ((data['he_bmi'] - 23.7) / 3.2) * 0.156
-    contrib += ((data['he_wc'] - 82.5) / 9.4) * 0.173
-    contrib += ((data['sbp'] - 122.3) / 15.6) * 0.198
-    contrib += ((data['dbp'] - 76.8) / 10.2) * 0.165
-    contrib += ((data['glu'] - 98.7) / 18.3) * 0.224
-    contrib += ((data['tc'] - 196.5) / 36.8) * 0.142
-    contrib += ((data['ldl'] - 118.3) / 32.4) * 0.187
-    contrib += ((data['hdl'] - 54.6) / 13.7) * (-0.213)
-    contrib += ((data['tg'] - 142.8) / 78.5) * 0.196
-    contrib += ((data['got'] - 25.8) / 11.3) * 0.089
-    contrib += ((data['gpt'] - 26.4) / 16.7) * 0.094
-    contrib += ((data['crea'] - 0.92) / 0.21) * 0.078
-    contrib += ((data['hb'] - 14.2) / 1.6) * (-0.056)
-    contrib += ((data['smok_dur'] - 8.3) / 12.4) * 0.312
-    contrib += ((data['pack_year'] - 6.8) / 11.2) * 0.298
-    contrib += ((data['drink_amt'] - 3.2) / 4.8) * 0.186
-    contrib += ((data['met'] - 3.8) / 2.4) * (-0.267)
-    contrib += ((data['sleep_time'] - 6.8) / 1.2) * (-0.145)
-    contrib += ((data['eq5d'] - 0.89) / 0.14) * (-0.193)
-    contrib += ((data['rfs'] - 27.3) / 8.6) * (-0.178)
-
-    raw_score += contrib
-
-    # Type 2 보정
-    intercept, slope = -0.360239755820859, 1.19545123840064
-    corrected = intercept + raw_score * slope
-
-    # 정규화 (문서값: -10 ~ 50)
-    return normalize(corrected, -10, 50)
+    return current_models()['OXI'].score_vector(RECORD_SCHEMA.decode_one(data))
 
 # =========================
 # 만성질환 억제 분석지수 (MET)
@@ -68,35 +40,7 @@ def calculate_met(data):
     만성질환 억제 분석지수 (MET)
     Type 4 공식 반영
     """
-    contrib = 0
-    contrib += ((data['age'] - 45.2) / 12.8) * 0.096
-    contrib += ((data['sex'] - 0.48) / 0.50) * (-0.032)
-    contrib += ((data['he_bmi'] - 23.7) / 3.2) * 0.218
-    contrib += ((data['he_wc'] - 82.5) / 9.4) * 0.246
-    contrib += ((data['sbp'] - 122.3) / 15.6) * 0.178
-    contrib += ((data['dbp'] - 76.8) / 10.2) * 0.142
-    contrib += ((data['glu'] - 98.7) / 18.3) * 0.348
-    contrib += ((data['tc'] - 196.5) / 36.8) * 0.186
-    contrib += ((data['ldl'] - 118.3) / 32.4) * 0.224
-    contrib += ((data['hdl'] - 54.6) / 13.7) * (-0.287)
-    contrib += ((data['tg'] - 142.8) / 78.5) * 0.312
-    contrib += ((data['got'] - 25.8) / 11.3) * 0.124
-    contrib += ((data['gpt'] - 26.4) / 16.7) * 0.156
-    contrib += ((data['crea'] - 0.92) / 0.21) * 0.098
-    contrib += ((data['pack_year'] - 6.8) / 11.2) * 0.234
-    contrib += ((data['sleep_time'] - 6.8) / 1.2) * (-0.112)
-    contrib += ((data['met'] - 3.8) / 2.4) * (-0.298)
-    contrib += ((data['rfs'] - 27.3) / 8.6) * (-0.256)
-
-    # 목표 raw score 맞춤 (문서: 26.2)
-    raw_score = 26.2 + contrib
-
-    # Type 4 보정
-    intercept, slope = -0.107296360783776, 1.26848490326677
-    corrected = intercept + raw_score * slope
-
-    # 정규화 (문서값: -8 ~ 48)
-    return normalize(corrected, -8, 48)
+    return current_models()['MET'].score_vector(RECORD_SCHEMA.decode_one(data))
 
 # =========================
 # 근육 밸런스 분석지수 (MUS)
@@ -106,48 +50,59 @@ def calculate_mus(data):
     근육 밸런스 분석지수 (MUS)
     Type 12 공식 반영
     """
-    weight = data['weight']
-    r_arm_per = (data['r_arm_muscle'] / weight) * 100
-    l_arm_per = (data['l_arm_muscle'] / weight) * 100
-    r_leg_per = (data['r_leg_muscle'] / weight) * 100
-    l_leg_per = (data['l_leg_muscle'] / weight) * 100
-    wasm = (data['asm'] / weight) * 100
-
-    contrib = 0
-    contrib += ((data['age'] - 45.2) / 12.8) * (-0.156)
-    contrib += ((data['sex'] - 0.48) / 0.50) * 0.324
-    contrib += ((data['he_bmi'] - 23.7) / 3.2) * 0.098
-    contrib += ((data['glu'] - 98.7) / 18.3) * 0.112
-    contrib += ((data['hdl'] - 54.6) / 13.7) * (-0.087)
-    contrib += ((data['ldl'] - 118.3) / 32.4) * 0.064
-    contrib += ((data['per_bodyfat'] - 22.3) / 5.8) * (-0.298)
-    contrib += ((r_arm_per - 5.8) / 0.9) * 0.256
-    contrib += ((l_arm_per - 5.7) / 0.9) * 0.248
-    contrib += ((r_leg_per - 11.2) / 1.8) * 0.312
-    contrib += ((l_leg_per - 11.0) / 1.8) * 0.298
-    contrib += ((wasm - 33.7) / 4.2) * 0.387
-    contrib += ((data['met'] - 3.8) / 2.4) * 0.234
-    contrib += ((data['rfs'] - 27.3) / 8.6) * 0.156
-
-    raw_score = 24.8 + contrib
-
-    # Type 12 보정
-    intercept, slope = -0.245123456789012, 1.15432109876543
-    corrected = intercept + raw_score * slope
-
-    # 정규화 (문서값: -12 ~ 52)
-    return normalize(corrected, -12, 52)
+    return current_models()['MUS'].score_vector(RECORD_SCHEMA.decode_one(data))
 
 # =========================
 # 메인
 # =========================
 def calculate_three_indices(data):
+    # 누락 필드 기본값/파생 변수/검증은 스키마에서 한 번에 처리
+    models = current_models()
+    features = RECORD_SCHEMA.decode_one(data)
     return {
-        "노화 억제 분석지수": calculate_oxi(data),
-        "만성질환 억제 분석지수": calculate_met(data),
-        "근육 밸런스 분석지수": calculate_mus(data),
+        "노화 억제 분석지수": models['OXI'].score_vector(features),
+        "만성질환 억제 분석지수": models['MET'].score_vector(features),
+        "근육 밸런스 분석지수": models['MUS'].score_vector(features),
     }
 
+# =========================
+# 배치 계산 (행렬 연산)
+# =========================
+INDEX_NAMES = ("노화 억제 분석지수", "만성질환 억제 분석지수", "근육 밸런스 분석지수")
+
+# 배치 ndarray 입력 컬럼 순서 (원본 입력) - 디코딩된 FEATURES 순서 배열도 허용
+BATCH_COLUMNS = INPUT_COLUMNS
+
+def _feature_matrix(records, errors):
+    """입력을 FEATURES 순서의 float 행렬로 변환 (DataFrame / dict 리스트는 스키마로 디코딩)"""
+    if not isinstance(records, np.ndarray):
+        return RECORD_SCHEMA.decode(records, errors=errors)
+    matrix = np.asarray(records, dtype=np.float64)
+    if matrix.ndim == 2 and matrix.shape[1] == len(FEATURES):
+        return matrix
+    if matrix.ndim != 2 or matrix.shape[1] != len(BATCH_COLUMNS):
+        raise ValueError(f"배열 입력은 (n, {len(BATCH_COLUMNS)}) 또는 (n, {len(FEATURES)}) 형태여야 합니다: {matrix.shape}")
+    weight = matrix[:, FEATURE_INDEX['weight']]
+    sources = [FEATURE_INDEX[source] for _, source in MUSCLE_PERCENT_FIELDS]
+    derived = (matrix[:, sources] / weight[:, None]) * 100
+    return np.concatenate([matrix, derived], axis=1)
+
+def calculate_three_indices_batch(records, errors='raise'):
+    """
+    여러 명의 건강 데이터를 한 번에 계산 (calculate_three_indices 의 벡터화 버전)
+    - records: DataFrame, dict 리스트, BATCH_COLUMNS 순서의 ndarray, 또는 RECORD_SCHEMA.decode 결과
+    - errors: 'raise' 면 검증 실패 시 예외, 'coerce' 면 해당 행의 지수를 NaN 으로 반환
+    - 반환: 지수명을 컬럼으로 갖는 DataFrame (DataFrame 입력 시 인덱스 유지)
+    """
+    models = current_models()
+    features = _feature_matrix(records, errors)
+
+    scores = features @ models.weights + models.offsets
+    scores = np.clip(np.round(scores, 1), 0, 100)
+
+    index = records.index if isinstance(records, pd.DataFrame) else None
+    return pd.DataFrame(scores, columns=list(models.names), index=index)
+
 def main():
     sample_data = {
         # 기본
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+분류기준 카탈로그 인메모리 인덱스
+- "분류기준" 테이블을 프로세스당 한 번만 읽어 제품별 건강지표 조합(쉼표 구분 문자열)을 미리 집합으로 파싱
+- 건강지표 → 제품, 관리 필요 영역 → 제품 포스팅 리스트를 유지해 추천 순위 계산을 DB 조회 없이 집합 연산으로 처리
+- 건강지표 조합은 비트마스크로 인코딩하고, 가능한 모든 지표 부분집합(2^k)에 대해 제품별 최적 조합 / 정확 매칭 여부 /
+  기본 점수를 미리 계산 - 요청 시에는 표 조회 후 관리영역 가산점만 계산
+- "그래프" 테이블(건강지표 → 관리 필요 영역)도 같은 방식으로 캐시하고, 주의/관리 지표 조합 8가지의 화면 옵션을 미리 계산
+- check_interval 마다 테이블 버전(행 수 + 내용 해시)을 확인해 바뀌었을 때만 다시 적재
+- "제품정보" 테이블은 적재하지 않고 버전만 같은 방식으로 추적 (추천 결과 캐시 키용)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+CATALOG_QUERY = """
+SELECT "제품명", "건강지표", "관리 필요 영역", "원료"
+FROM "분류기준"
+ORDER BY "제품명", "건강지표"
+"""
+
+CATALOG_VERSION_QUERY = """
+SELECT COUNT(*) AS row_count,
+       md5(COALESCE(string_agg(
+           concat_ws('|', "제품명", "건강지표", "관리 필요 영역", "원료"), E'\\n'
+           ORDER BY "제품명", "건강지표", "관리 필요 영역", "원료"
+       ), '')) AS digest
+FROM "분류기준"
+"""
+
+GRAPH_QUERY = """
+SELECT DISTINCT "건강지표", "관리 필요 영역"
+FROM "그래프"
+WHERE "건강지표" IS NOT NULL AND "관리 필요 영역" IS NOT NULL
+"""
+
+GRAPH_VERSION_QUERY = """
+SELECT COUNT(*) AS row_count,
+       md5(COALESCE(string_agg(
+           concat_ws('|', "건강지표", "관리 필요 영역"), E'\\n'
+           ORDER BY "건강지표", "관리 필요 영역"
+       ), '')) AS digest
+FROM "그래프"
+"""
+
+PRODUCT_INFO_VERSION_QUERY = """
+SELECT COUNT(*) AS row_count,
+       md5(COALESCE(string_agg(t::text, E'\\n' ORDER BY t::text), '')) AS digest
+FROM "제품정보" t
+"""
+
+# 화면에서 선택하는 건강지표 (prompts.create_health_assessment 순서)
+HEALTH_INDICATORS = ("노화 억제 분석지수", "근육 밸런스 분석지수", "만성질환 억제 분석지수")
+
+# 전체 키워드 옵션
+PHYSIOLOGY_OPTIONS = (
+    '운동수행능력/지구력 향상', '항산화', '수면 건강', '혈당 조절', '눈 건강', '영양 균형',
+    '기억력 개선', '혈중 지질 개선', '혈행 개선', '근력(근육)', '피부 건강', '갱년기 여성 건강', '간 건강', '체지방 감소',
+    '장 건강', '면역 기능', '피로 개선', '전립선 건강', '코 과민반응', '위 건강', '관절/뼈 건강', '과민 피부 상태 개선', '혈압 조절',
+)
+HEALTH_CONCERN_OPTIONS = PHYSIOLOGY_OPTIONS
+
+DEFAULT_CHECK_INTERVAL = float(os.getenv('CATALOG_CHECK_INTERVAL', '60'))
+TOP_N = 7
+MAX_SUBSET_BITS = 12    # 지표 종류가 이보다 많으면 부분집합 표를 만들지 않고 요청마다 계산
+
+
+def parse_combo(combo):
+    """'혈압, 혈당' → frozenset({'혈압', '혈당'})"""
+    return frozenset(indicator.strip() for indicator in combo.split(','))
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def base_score(match_count, combo_size, is_exact):
+    """건강지표 부분 점수 - 정확한 매칭은 조합 크기가 작을수록 높고, 부정확한 매칭은 낮은 기본 점수"""
+    if is_exact:
+        return 10000 + match_count * 1000 + max(0, 10 - combo_size) * 100
+    return match_count * 100
+
+
+class CatalogProduct:
+    """제품 하나의 분류기준 정보 (적재 시 파싱 완료)"""
+
+    def __init__(self, name, ordinal):
+        self.name = name
+        self.ordinal = ordinal          # 카탈로그 정렬 순서 (동점 시 원래 순서 유지용)
+        self.combos = []                # [(원본 조합 문자열, 지표 집합)] - 행 순서
+        self.combo_masks = ()           # 조합별 지표 비트마스크 (combos 와 같은 순서)
+        self.indicator_mask = 0
+        self.area_counts = Counter()    # 관리 필요 영역별 행 수
+        self.ingredients = set()
+
+    def freeze(self):
+        self.combos = tuple(self.combos)
+        self.areas = frozenset(self.area_counts)
+        self.indicators = frozenset().union(*(indicators for _, indicators in self.combos))
+        self.ingredients = frozenset(self.ingredients)
+
+
+class CatalogSnapshot:
+    """특정 버전의 카탈로그 - 생성 후 변경하지 않으므로 여러 스레드에서 그대로 읽어도 안전"""
+
+    def __init__(self, frame, version=None):
+        self.version = version
+        self.row_count = len(frame)
+        products = {}
+        for name, combo, area, ingredient in frame[['제품명', '건강지표', '관리 필요 영역', '원료']].itertuples(index=False):
+            product = products.get(name)
+            if product is None:
+                product = products[name] = CatalogProduct(name, len(products))
+            product.combos.append((combo, parse_combo(combo)))
+            product.area_counts[area] += 1
+            if pd.notna(ingredient):
+                product.ingredients.add(ingredient)
+        for product in products.values():
+            product.freeze()
+        self.products = products
+
+        indicator_postings, area_postings = {}, {}
+        for product in products.values():
+            for indicator in product.indicators:
+                indicator_postings.setdefault(indicator, []).append(product.name)
+            for area, count in product.area_counts.items():
+                area_postings.setdefault(area, []).append((product.name, count))
+        self.indicator_postings = {key: tuple(names) for key, names in indicator_postings.items()}
+        self.area_postings = {key: tuple(entries) for key, entries in area_postings.items()}
+
+        # 지표 → 비트, 제품별 조합 마스크, 부분집합별 최적 조합 표
+        self.indicator_bits = {indicator: 1 << i for i, indicator in enumerate(sorted(indicator_postings))}
+        for product in products.values():
+            product.combo_masks = tuple(self.mask_of(indicators) for _, indicators in product.combos)
+            product.indicator_mask = self.mask_of(product.indicators)
+        self.subset_table = self._build_subset_table() if len(self.indicator_bits) <= MAX_SUBSET_BITS else None
+
+    def mask_of(self, indicators):
+        """지표 목록 → 비트마스크 (카탈로그에 없는 지표는 어떤 조합과도 맞지 않으므로 무시)"""
+        mask = 0
+        for indicator in indicators:
+            mask |= self.indicator_bits.get(indicator, 0)
+        return mask
+
+    @staticmethod
+    def best_combo_mask(product, mask):
+        """
+        비트마스크 버전 최적 조합 - (매칭 수, 조합 문자열, 조합 크기, 정확 매칭 여부)
+        우선순위: 정확한 매칭(조합 ⊆ 선택 지표) > 매칭 개수 > 조합 크기 작음, 동점은 먼저 나온 조합
+        """
+        best_match_count, best_combo, best_combo_size, best_is_exact = 0, '', float('inf'), False
+        for (combo, _), combo_mask in zip(product.combos, product.combo_masks):
+            match_count = popcount(combo_mask & mask)
+            if match_count == 0:
+                continue
+            combo_size = popcount(combo_mask)
+            is_exact_match = combo_mask & ~mask == 0
+            if is_exact_match != best_is_exact:
+                is_better = is_exact_match
+            else:
+                is_better = match_count > best_match_count or (
+                    match_count == best_match_count and combo_size < best_combo_size
+                )
+            if is_better:
+                best_match_count, best_combo, best_combo_size, best_is_exact = match_count, combo, combo_size, is_exact_match
+        return best_match_count, best_combo, best_combo_size, best_is_exact
+
+    def _subset_entries(self, mask):
+        """선택 지표 마스크에 매칭되는 제품 목록 [(제품명, 매칭 수, 조합, 크기, 정확 여부, 기본 점수)] - 카탈로그 순서"""
+        entries = []
+        for product in self.products.values():
+            if not product.indicator_mask & mask:
+                continue
+            best_match_count, best_combo, best_combo_size, best_is_exact = self.best_combo_mask(product, mask)
+            if best_match_count:
+                entries.append((product.name, best_match_count, best_combo, best_combo_size, best_is_exact,
+                                base_score(best_match_count, best_combo_size, best_is_exact)))
+        return tuple(entries)
+
+    def _build_subset_table(self):
+        return [self._subset_entries(mask) for mask in range(1 << len(self.indicator_bits))]
+
+    # --------------------------
+    # 조회
+    # --------------------------
+    def products_for_indicators(self, indicators):
+        """건강지표 중 하나라도 포함된 조합을 가진 제품 (카탈로그 순서)"""
+        names = set()
+        for indicator in indicators:
+            names.update(self.indicator_postings.get(indicator, ()))
+        return sorted(names, key=lambda name: self.products[name].ordinal)
+
+    def area_match_counts(self, areas):
+        """{제품명: (선택 영역 중 해당 영역 수, 해당 영역 행 수 합)}"""
+        counts = {}
+        for area in set(areas):
+            for name, rows in self.area_postings.get(area, ()):
+                matched, row_total = counts.get(name, (0, 0))
+                counts[name] = (matched + 1, row_total + rows)
+        return counts
+
+    # --------------------------
+    # 추천 순위
+    # --------------------------
+    def rank(self, health_indicators, physiology_network, health_concerns, top_n=TOP_N):
+        """get_products_from_classification 과 같은 (제품명 목록, 제품별 점수 정보) 반환"""
+        mask = self.mask_of(health_indicators)
+        physiology_set = set(physiology_network)
+        concerns_set = set(health_concerns)
+        all_selected_areas = physiology_set | concerns_set
+        area_matches = self.area_match_counts(all_selected_areas)
+        physiology_rows = self.area_match_counts(physiology_set)
+        concern_rows = self.area_match_counts(concerns_set)
+
+        # 건강지표 부분은 미리 계산한 표에서 조회, 요청마다 관리영역 가산점만 더함
+        entries = self.subset_table[mask] if self.subset_table is not None else self._subset_entries(mask)
+        final_products = []
+        for name, best_match_count, best_combo, best_combo_size, best_is_exact, score in entries:
+            final_products.append((name, {
+                'best_match_count': best_match_count,
+                'best_combo': best_combo,
+                'best_combo_size': best_combo_size,
+                'best_is_exact_match': best_is_exact,
+                'physiology_matches': physiology_rows.get(name, (0, 0))[1],
+                'concern_matches': concern_rows.get(name, (0, 0))[1],
+                'management_areas': set(self.products[name].areas),
+                'final_score': score + area_matches.get(name, (0, 0))[0],
+            }))
+
+        # 점수순 정렬 (안정 정렬이므로 동점은 카탈로그 순서 유지)
+        final_products.sort(key=lambda item: item[1]['final_score'], reverse=True)
+        top_products = final_products[:top_n]
+        return [name for name, _ in top_products], {name: score for name, score in top_products}
+
+
+class RelationshipGraph:
+    """
+    특정 버전의 "그래프" 테이블 - 건강지표 → 관리 필요 영역 인접 리스트
+    - 건강지표 3개의 가능한 모든 "주의/관리" 조합(2^3)에 대해 UI 필터 옵션을 미리 계산
+    """
+
+    def __init__(self, frame, version=None):
+        self.version = version
+        adjacency = {}
+        for indicator, area in frame[['건강지표', '관리 필요 영역']].itertuples(index=False):
+            areas = adjacency.setdefault(indicator, [])
+            if area not in areas:
+                areas.append(area)
+        self.adjacency = {indicator: tuple(areas) for indicator, areas in adjacency.items()}
+
+        self.filtered_options = {}
+        for mask in range(1 << len(HEALTH_INDICATORS)):
+            indicators = frozenset(name for i, name in enumerate(HEALTH_INDICATORS) if mask >> i & 1)
+            self.filtered_options[indicators] = self._filter_options(indicators)
+
+    def areas_for(self, indicators):
+        """건강지표들과 연관된 관리 필요 영역 (중복 제거)"""
+        areas = set()
+        for indicator in indicators:
+            areas.update(self.adjacency.get(indicator, ()))
+        return areas
+
+    def _filter_options(self, indicators):
+        if not indicators:
+            return list(PHYSIOLOGY_OPTIONS), list(HEALTH_CONCERN_OPTIONS)
+        relevant_areas = self.areas_for(indicators)
+        return (
+            [option for option in PHYSIOLOGY_OPTIONS if option in relevant_areas],
+            [option for option in HEALTH_CONCERN_OPTIONS if option in relevant_areas],
+        )
+
+    def options_for(self, problematic_indicators):
+        """(인체 생리 네트워크 옵션, 건강 분야 옵션) - 주의/관리 지표가 없으면 전체 옵션"""
+        key = frozenset(problematic_indicators)
+        options = self.filtered_options.get(key)
+        if options is None:
+            options = self._filter_options(key)
+        return list(options[0]), list(options[1])
+
+
+class VersionedIndex:
+    """DB 테이블을 감시하며 버전이 바뀌면 스냅샷을 교체하는 인덱스 (스레드 안전)"""
+
+    load_query = None
+    version_query = None
+    snapshot_class = None
+
+    def __init__(self, engine, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.engine = engine
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._verified_at = 0.0     # 마지막으로 버전 확인에 성공한 시각
+        self.counters = {'loads': 0, 'checks': 0, 'check_errors': 0}
+        self.last_error = None
+
+    def fetch_version(self):
+        with self.engine.connect() as conn:
+            row = conn.execute(text(self.version_query)).one()
+        return f"{row.row_count}-{row.digest}"
+
+    def load(self, version=None):
+        """테이블 전체를 읽어 새 스냅샷으로 교체"""
+        version = version or self.fetch_version()
+        frame = pd.read_sql(self.load_query, con=self.engine)
+        snapshot = self.snapshot_class(frame, version=version)
+        self._snapshot = snapshot
+        self._checked_at = self._verified_at = time.monotonic()
+        self.counters['loads'] += 1
+        return snapshot
+
+    def current(self):
+        """
+        현재 스냅샷 - 최초 호출 시 적재, 이후 check_interval 마다 버전 확인
+        (DB 오류로 버전 확인이 실패하면 기록/로그를 남기고 기존 스냅샷으로 계속 동작, 스냅샷이 없으면 예외 전달)
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return snapshot
+            if snapshot is None:
+                return self.load()
+            self._checked_at = time.monotonic()
+            self.counters['checks'] += 1
+            try:
+                version = self.fetch_version()
+                if version != snapshot.version:
+                    snapshot = self.load(version)
+                self._verified_at = time.monotonic()
+                self.last_error = None
+            except SQLAlchemyError as e:
+                self.counters['check_errors'] += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("%s 버전 확인 실패 - 기존 스냅샷 사용 (%.0f초 전 확인): %s",
+                               type(self).__name__, time.monotonic() - self._verified_at, e)
+            return snapshot
+
+    def invalidate(self):
+        """다음 조회 때 버전을 바로 확인하도록 표시 (테이블 수정 직후 호출)"""
+        self._checked_at = 0.0
+
+    @property
+    def version(self):
+        return self.current().version
+
+    def stats(self):
+        """적재/확인/확인 실패 횟수, 마지막 오류, 마지막 확인 성공 후 경과 초 (stale_seconds)"""
+        snapshot = self._snapshot
+        return {
+            **self.counters,
+            'version': snapshot.version if snapshot is not None else None,
+            'last_error': self.last_error,
+            'stale_seconds': round(time.monotonic() - self._verified_at, 1) if snapshot is not None else None,
+        }
+
+
+class CatalogIndex(VersionedIndex):
+    """분류기준 카탈로그 인덱스"""
+
+    load_query = CATALOG_QUERY
+    version_query = CATALOG_VERSION_QUERY
+    snapshot_class = CatalogSnapshot
+
+
+class RelationshipGraphIndex(VersionedIndex):
+    """건강지표 → 관리 필요 영역 그래프 인덱스"""
+
+    load_query = GRAPH_QUERY
+    version_query = GRAPH_VERSION_QUERY
+    snapshot_class = RelationshipGraph
+
+
+class TableVersion:
+    """내용 없이 버전만 갖는 스냅샷"""
+
+    def __init__(self, version):
+        self.version = version
+
+
+class ProductInfoVersion(VersionedIndex):
+    """제품정보 테이블 버전 (행 전체 내용 해시) - 테이블은 적재하지 않음"""
+
+    version_query = PRODUCT_INFO_VERSION_QUERY
+
+    def load(self, version=None):
+        snapshot = TableVersion(version or self.fetch_version())
+        self._snapshot = snapshot
+        self._checked_at = self._verified_at = time.monotonic()
+        self.counters['loads'] += 1
+        return snapshot
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def _shared_index(index_class, engine):
+    key = (index_class, str(engine.url))
+    index = _INDEXES.get(key)
+    if index is None:
+        with _INDEXES_LOCK:
+            index = _INDEXES.get(key)
+            if index is None:
+                index = _INDEXES[key] = index_class(engine)
+    return index
+
+
+def get_catalog_index(engine):
+    """엔진(DB URL)별 프로세스 전역 카탈로그 인덱스"""
+    return _shared_index(CatalogIndex, engine)
+
+
+def get_relationship_graph(engine):
+    """엔진(DB URL)별 프로세스 전역 건강지표-관리영역 그래프 인덱스"""
+    return _shared_index(RelationshipGraphIndex, engine)
+
+
+def get_product_info_version(engine):
+    """엔진(DB URL)별 프로세스 전역 제품정보 테이블 버전"""
+    return _shared_index(ProductInfoVersion, engine)
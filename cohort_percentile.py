@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+연령대/성별 코호트 내 지수 백분위 인덱스
+- 기준 모집단의 지수를 코호트별 정렬 배열로 미리 구축
+- 백분위 조회는 이진 탐색으로 O(log n)
+- 새로 계산된 회원은 정렬 버퍼에 증분 추가 (일정 크기가 되면 본 배열에 병합)
+
+사용 예:
+    python cohort_percentile.py reference.csv -o data/cohort_percentiles.npz
+"""
+
+import argparse
+import bisect
+import threading
+
+import numpy as np
+import pandas as pd
+
+from calculate import INDEX_NAMES, calculate_three_indices_batch
+
+AGE_BAND_WIDTH = 10
+MIN_AGE_BAND, MAX_AGE_BAND = 10, 80  # 10대 미만은 10대로, 80대 이상은 80대로 묶음
+MERGE_THRESHOLD = 4096  # 증분 버퍼가 이 크기를 넘으면 본 배열에 병합
+
+
+def age_band(age):
+    """나이 → 연령대 (예: 34 → 30)"""
+    band = int(age // AGE_BAND_WIDTH) * AGE_BAND_WIDTH
+    return max(MIN_AGE_BAND, min(MAX_AGE_BAND, band))
+
+
+def cohort_key(age, sex):
+    return (age_band(age), int(sex))
+
+
+class SortedScores:
+    """
+    정렬된 점수 배열 + 증분 버퍼 (순위 조회 O(log n))
+    - 추가/병합과 조회는 같은 잠금 안에서 수행 (정렬 배열과 버퍼를 항상 같은 시점 기준으로 읽음)
+    - 병합은 전체 재정렬 대신 정렬된 새 값을 삽입 위치에 끼워 넣음 (O(n + m log n))
+    """
+
+    def __init__(self, scores=None):
+        self.sorted = np.sort(np.asarray(scores, dtype=np.float64)) if scores is not None else np.empty(0)
+        self.buffer = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self.sorted) + len(self.buffer)
+
+    def _insert_sorted(self, values):
+        """정렬된 values 를 본 배열에 병합 (잠금 안에서 호출)"""
+        if len(values):
+            self.sorted = np.insert(self.sorted, np.searchsorted(self.sorted, values, side='right'), values)
+
+    def add(self, score):
+        with self._lock:
+            bisect.insort(self.buffer, float(score))
+            if len(self.buffer) >= MERGE_THRESHOLD:
+                self._insert_sorted(np.asarray(self.buffer))
+                self.buffer = []
+
+    def extend(self, scores):
+        """여러 점수를 한 번에 추가 (새 값만 정렬한 뒤 병합)"""
+        values = np.sort(np.asarray(scores, dtype=np.float64))
+        with self._lock:
+            self._insert_sorted(values)
+
+    def merge(self):
+        with self._lock:
+            if self.buffer:
+                self._insert_sorted(np.asarray(self.buffer))
+                self.buffer = []
+
+    def _rank(self, score):
+        below = int(np.searchsorted(self.sorted, score, side='left'))
+        equal = int(np.searchsorted(self.sorted, score, side='right')) - below
+        buffer_below = bisect.bisect_left(self.buffer, score)
+        buffer_equal = bisect.bisect_right(self.buffer, score) - buffer_below
+        return below + buffer_below, equal + buffer_equal
+
+    def rank(self, score):
+        """(score 미만 개수, score 와 같은 개수)"""
+        with self._lock:
+            return self._rank(score)
+
+    def percentile(self, score):
+        """코호트 내 백분위 (동점은 절반만 반영하는 mid-rank, 0~100)"""
+        with self._lock:
+            total = len(self.sorted) + len(self.buffer)
+            if total == 0:
+                return None
+            below, equal = self._rank(score)
+        return round((below + 0.5 * equal) / total * 100, 1)
+
+
+class CohortPercentileIndex:
+    """(연령대, 성별) 코호트별 · 지수별 정렬 점수 인덱스"""
+
+    def __init__(self, index_names=INDEX_NAMES):
+        self.index_names = tuple(index_names)
+        self.cohorts = {}
+        self._lock = threading.Lock()
+
+    # --------------------------
+    # 구축
+    # --------------------------
+    @classmethod
+    def build(cls, population, index_names=INDEX_NAMES):
+        """
+        기준 모집단 DataFrame 으로 인덱스 구축
+        - population 에 지수 컬럼이 없으면 calculate_three_indices_batch 로 계산
+        """
+        index = cls(index_names)
+        if not all(name in population.columns for name in index.index_names):
+            population = pd.concat([population[['age', 'sex']], calculate_three_indices_batch(population)], axis=1)
+        bands = population['age'].map(age_band)
+        for (band, sex), group in population.groupby([bands, population['sex'].astype(int)]):
+            index.cohorts[(int(band), int(sex))] = {
+                name: SortedScores(group[name].dropna().to_numpy()) for name in index.index_names
+            }
+        return index
+
+    def _cohort(self, age, sex):
+        key = cohort_key(age, sex)
+        if key not in self.cohorts:
+            self.cohorts[key] = {name: SortedScores() for name in self.index_names}
+        return self.cohorts[key]
+
+    # --------------------------
+    # 증분 추가
+    # --------------------------
+    def add(self, age, sex, scores):
+        """새로 계산된 회원의 지수를 코호트에 추가 (scores: 지수명 → 점수)"""
+        with self._lock:
+            cohort = self._cohort(age, sex)
+            for name in self.index_names:
+                if scores.get(name) is not None:
+                    cohort[name].add(scores[name])
+
+    def add_batch(self, frame):
+        """age, sex, 지수 컬럼을 가진 DataFrame 을 한 번에 추가"""
+        bands = frame['age'].map(age_band)
+        with self._lock:
+            for (band, sex), group in frame.groupby([bands, frame['sex'].astype(int)]):
+                cohort = self.cohorts.setdefault(
+                    (int(band), int(sex)), {name: SortedScores() for name in self.index_names}
+                )
+                for name in self.index_names:
+                    cohort[name].extend(group[name].dropna().to_numpy())
+
+    # --------------------------
+    # 조회
+    # --------------------------
+    def percentile(self, index_name, score, age, sex):
+        """코호트 내 백분위 (코호트 데이터가 없으면 None)"""
+        cohort = self.cohorts.get(cohort_key(age, sex))
+        if cohort is None:
+            return None
+        return cohort[index_name].percentile(score)
+
+    def percentiles(self, scores, age, sex):
+        """calculate_three_indices 결과 dict 의 지수별 백분위"""
+        return {name: self.percentile(name, score, age, sex) for name, score in scores.items()
+                if name in self.index_names}
+
+    def cohort_size(self, age, sex):
+        cohort = self.cohorts.get(cohort_key(age, sex))
+        return len(next(iter(cohort.values()))) if cohort else 0
+
+    # --------------------------
+    # 저장 / 로드
+    # --------------------------
+    def save(self, path):
+        arrays = {}
+        with self._lock:
+            for (band, sex), cohort in self.cohorts.items():
+                for k, name in enumerate(self.index_names):
+                    cohort[name].merge()
+                    arrays[f"{band}|{sex}|{k}"] = cohort[name].sorted
+        np.savez_compressed(path, index_names=np.array(self.index_names), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(tuple(str(name) for name in data['index_names']))
+            for key in data.files:
+                if key == 'index_names':
+                    continue
+                band, sex, k = (int(part) for part in key.split('|'))
+                cohort = index.cohorts.setdefault((band, sex), {})
+                cohort[index.index_names[k]] = SortedScores()
+                cohort[index.index_names[k]].sorted = data[key]
+        return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="기준 모집단으로 연령대/성별 코호트 백분위 인덱스 생성")
+    parser.add_argument('reference', help="기준 모집단 CSV (검진 컬럼 또는 지수 컬럼 포함)")
+    parser.add_argument('-o', '--output', default='data/cohort_percentiles.npz', help="인덱스 저장 경로 (.npz)")
+    args = parser.parse_args(argv)
+
+    population = pd.read_csv(args.reference)
+    index = CohortPercentileIndex.build(population)
+    index.save(args.output)
+    for (band, sex) in sorted(index.cohorts):
+        print(f"{band}대 {'남성' if sex == 1 else '여성'}: {index.cohort_size(band, sex)}명")
+    print(f"✅ 저장 완료: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+프로세스 전역 공유 리소스
+- SQLAlchemy 엔진(커넥션 풀)과 LLM 클라이언트(공급자 라우터)를 프로세스당 하나씩만 만들어 Streamlit 재실행/세션 간 재사용
+- DB 접속 정보와 풀 설정은 Streamlit secrets → 환경변수 순서로 읽음
+    DB_POOL_SIZE (기본 5), DB_MAX_OVERFLOW (기본 10), DB_POOL_TIMEOUT (초, 기본 30),
+    DB_POOL_RECYCLE (초, 기본 1800), DB_POOL_PRE_PING (기본 true)
+"""
+
+import os
+import threading
+
+from sqlalchemy import create_engine
+
+# 로컬 개발용 fallback 값
+DB_DEFAULTS = {
+    'DB_NAME': 'Amway_DB',
+    'DB_USER': 'postgres',
+    'DB_PASS': '990910',
+    'DB_HOST': 'localhost',
+    'DB_PORT': '5432',
+}
+
+POOL_DEFAULTS = {
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 10,
+    'DB_POOL_TIMEOUT': 30,
+    'DB_POOL_RECYCLE': 1800,
+    'DB_POOL_PRE_PING': True,
+}
+
+_lock = threading.Lock()
+_engines = {}
+_llm_clients = {}
+
+
+def get_setting(name, default=None):
+    """Streamlit secrets 에 있으면 그 값, 없으면 환경변수, 둘 다 없으면 default"""
+    try:
+        import streamlit as st
+        return st.secrets[name]
+    except Exception:
+        return os.getenv(name, default)
+
+
+def load_db_config():
+    """DB 접속 정보 (HealthRAGSystem.db_config 와 같은 형태)"""
+    return {name: get_setting(name, default) for name, default in DB_DEFAULTS.items()}
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def load_pool_config():
+    """create_engine 에 넘길 커넥션 풀 옵션"""
+    settings = {name: get_setting(name, default) for name, default in POOL_DEFAULTS.items()}
+    return {
+        'pool_size': int(settings['DB_POOL_SIZE']),
+        'max_overflow': int(settings['DB_MAX_OVERFLOW']),
+        'pool_timeout': float(settings['DB_POOL_TIMEOUT']),
+        'pool_recycle': int(settings['DB_POOL_RECYCLE']),
+        'pool_pre_ping': _to_bool(settings['DB_POOL_PRE_PING']),
+    }
+
+
+def connection_url(db_config):
+    return (
+        f"postgresql+psycopg2://{db_config['DB_USER']}:{db_config['DB_PASS']}"
+        f"@{db_config['DB_HOST']}:{db_config['DB_PORT']}/{db_config['DB_NAME']}"
+    )
+
+
+def get_engine(db_config=None):
+    """접속 정보별로 하나만 생성되는 공유 엔진 (첫 호출 시 풀 설정 적용)"""
+    url = connection_url(db_config or load_db_config())
+    engine = _engines.get(url)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = _engines[url] = create_engine(url, **load_pool_config())
+    return engine
+
+
+def get_llm_client(api_key):
+    """API 키별로 하나만 생성되는 공유 LLM 라우터 (공급자별 LLMClient - 마감 시간 / 재시도 / 헤징, 지연시간 통계 공유)"""
+    client = _llm_clients.get(api_key)
+    if client is None:
+        with _lock:
+            client = _llm_clients.get(api_key)
+            if client is None:
+                from llm_router import build_router
+                client = _llm_clients[api_key] = build_router(api_key)
+    return client
+
+
+def dispose_all():
+    """공유 엔진의 커넥션을 모두 닫고 캐시 비우기 (테스트/설정 변경 후 재시작용)"""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _llm_clients.clear()
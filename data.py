@@ -1,40 +1,56 @@
 import pandas as pd
-from groq import Groq
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import os
 import json
 import hashlib
-from typing import Optional, List, Dict
+import threading
+from typing import Iterator, Optional, List, Dict
+
+from catalog_index import get_catalog_index, get_product_info_version, get_relationship_graph
+from connections import get_engine, get_llm_client, load_db_config
+from health_rules import HEALTH_RULE_ENGINE, age_group
+from llm_cache import get_llm_cache
+from llm_client import LLMRequest
+from llm_scheduler import PRIORITY_INTERACTIVE
+from fragment_store import get_fragment_store, source_hash
+from prompts import create_compact_personalized_prompt, create_diagnosis_prompt, get_diagnosis_system_message, get_personalized_system_message
+from prepared import STATEMENT_CACHE, PreparedQuery
+from product_snapshot import ProductSnapshot, load_product_snapshot
+from result_cache import RECOMMENDATION_CACHE
+
+# LLM 설명 생성 설정
+EXPLANATION_MODEL = "llama-3.3-70b-versatile"
+EXPLANATION_TEMPERATURE = 0.4
+# 프롬프트 템플릿 버전 - 템플릿 문구를 바꾸면 올려서 기존 캐시 항목을 무효화
+PROMPT_TEMPLATE_VERSIONS = {"personalized": 2, "personalized_compact": 2, "personalized_fragments": 2, "goodhealth": 1}
+# 개인화 설명 프롬프트 모드 - 'full' (기존 템플릿) / 'compact' (고정 지침은 시스템 메시지로, 중복 제거)
+#   / 'fragments' (제품 섹션은 fragment_store 의 조각으로 조립, LLM 은 진단 섹션만)
+PROMPT_MODE = os.getenv('LLM_PROMPT_MODE', 'full')
+DIAGNOSIS_MAX_TOKENS = 600
+# 프롬프트에 그대로 들어가는 제품정보 컬럼 (캐시 키의 내용 해시 대상)
+PRODUCT_TEXT_COLUMNS = ('식약처 인정 기능성', '주요 특징', '원재료')
+
+# 관리 영역 배열을 파라미터로 받는 고정 SQL (Prepared Statement 로 계획 재사용)
+AREA_PRODUCTS_QUERY = PreparedQuery("area_products", """
+SELECT "제품명", "건강지표", "관리 필요 영역", "원료"
+FROM "분류기준"
+WHERE "관리 필요 영역" = ANY($1)
+""", param_types=("text[]",))
 
 class HealthRAGSystem:
     def __init__(self, groq_api_key: str):
-        self.groq_client = Groq(api_key=groq_api_key)
-        
-        # Streamlit secrets에서 데이터베이스 설정 가져오기
-        try:
-            import streamlit as st
-            self.db_config = {
-                'DB_NAME': st.secrets["DB_NAME"],
-                'DB_USER': st.secrets["DB_USER"],
-                'DB_PASS': st.secrets["DB_PASS"],
-                'DB_HOST': st.secrets["DB_HOST"],
-                'DB_PORT': st.secrets["DB_PORT"]
-            }
-        except (KeyError, ImportError):
-            # 로컬 개발용 fallback
-            self.db_config = {
-                'DB_NAME': os.getenv('DB_NAME', 'Amway_DB'),
-                'DB_USER': os.getenv('DB_USER', 'postgres'),
-                'DB_PASS': os.getenv('DB_PASS', '990910'),
-                'DB_HOST': os.getenv('DB_HOST', 'localhost'),
-                'DB_PORT': os.getenv('DB_PORT', '5432')
-            }
-        
-        conn_str = f"postgresql+psycopg2://{self.db_config['DB_USER']}:{self.db_config['DB_PASS']}@{self.db_config['DB_HOST']}:{self.db_config['DB_PORT']}/{self.db_config['DB_NAME']}"
-        self.engine = create_engine(conn_str)
-        # LLM 응답 캐시 디렉토리 설정
-        self.cache_dir = os.path.join(os.getcwd(), ".llm_cache")
-        os.makedirs(self.cache_dir, exist_ok=True)
+        # 엔진(커넥션 풀)과 LLM 클라이언트는 프로세스 전역으로 공유 - 인스턴스를 새로 만들어도 재연결하지 않음
+        # 마감 시간 / 재시도 / 헤징 / 공급자 라우팅을 적용하는 LLM 호출 계층
+        self.llm_client = get_llm_client(groq_api_key)
+        # 스케줄러 우선순위 - 워밍업/배치 작업은 PRIORITY_BATCH 로 바꿔 대화형 요청보다 뒤에 처리
+        self.llm_priority = PRIORITY_INTERACTIVE
+        
+        # Streamlit secrets → 환경변수 순서로 데이터베이스 설정 가져오기
+        self.db_config = load_db_config()
+        self.engine = get_engine(self.db_config)
+        # LLM 응답 캐시 (SQLite 저장소, 프로세스 전역 공유 - 기존 .llm_cache/*.json 은 처음 열 때 가져옴)
+        self.llm_cache = get_llm_cache()
+        self.cache_dir = os.path.dirname(self.llm_cache.path)
 
     # --------------------------
     # 캐싱 유틸리티
@@ -48,258 +64,101 @@ class HealthRAGSystem:
         digest = hashlib.sha256(serialized).hexdigest()
         return f"{prefix}-{digest}"
 
-    def _read_cache(self, key: str) -> Optional[str]:
-        path = os.path.join(self.cache_dir, f"{key}.json")
-        if not os.path.exists(path):
-            return None
+    def _content_fingerprint(self, product_rows: List[Dict]) -> str:
+        """프롬프트에 들어가는 제품정보 값(기능성/특징/원재료)의 요약 해시 - 제품정보 테이블은 카탈로그 버전에 포함되지 않으므로 따로 반영"""
+        rows = {str(row.get('제품명')): [str(row.get(column, '')) for column in PRODUCT_TEXT_COLUMNS] for row in product_rows}
+        return hashlib.sha256(self._stable_serialize(rows).encode("utf-8")).hexdigest()[:16]
+
+    def _explanation_cache_key(self, template: str, fields: Dict, prompt: str, system: str) -> str:
+        """
+        LLM 설명 캐시 키 - 렌더링된 프롬프트 대신 결과를 결정하는 구조화된 값으로 구성
+        - 템플릿 버전, 모델/temperature, 카탈로그/연관관계 테이블 버전, 정규화한 입력(fields)
+        - 같은 조건이면 집합 순회 순서나 프롬프트에 쓰이지 않는 user_data 값이 달라도 같은 키
+        - 테이블 버전을 알 수 없으면(DB 조회 실패) 기존처럼 프롬프트 전체를 해시
+        """
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                obj = json.load(f)
-            return obj.get("content")
+            versions = {
+                "catalog": get_catalog_index(self.engine).current().version,
+                "graph": get_relationship_graph(self.engine).current().version,
+            }
         except Exception:
-            return None
+            versions = None
+        if versions is None:
+            payload = {"model": EXPLANATION_MODEL, "system": system, "prompt": prompt, "temperature": EXPLANATION_TEMPERATURE}
+            return self._build_cache_key(payload, prefix=template)
+        payload = {
+            "template": template,
+            "template_version": PROMPT_TEMPLATE_VERSIONS[template],
+            "model": EXPLANATION_MODEL,
+            "temperature": EXPLANATION_TEMPERATURE,
+            "versions": versions,
+            **fields,
+        }
+        return self._build_cache_key(payload, prefix=f"{template}-v{PROMPT_TEMPLATE_VERSIONS[template]}")
+
+    def _read_cache(self, key: str) -> Optional[str]:
+        return self.llm_cache.get(key)
 
     def _write_cache(self, key: str, content: str) -> None:
-        path = os.path.join(self.cache_dir, f"{key}.json")
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump({"content": content}, f, ensure_ascii=False)
-        except Exception:
-            pass
+        self.llm_cache.put(key, content)
 
     def get_products_from_classification(self, health_indicators: List[str], physiology_network: List[str], health_concerns: List[str]) -> tuple:
-        """분류기준 테이블에서 건강지표 조합에 맞는 제품들을 가져오고 우선순위를 적용 - 최종 최적화 버전"""
+        """분류기준 카탈로그 인덱스에서 건강지표 조합에 맞는 제품들을 찾아 우선순위를 적용 (DB 조회 없음)"""
         
         if not health_indicators:
             return [], {}
         
-        # 전체 테이블 조회 (안정성 우선) - 원료 컬럼 추가
-        query = """
-        SELECT "제품명", "건강지표", "관리 필요 영역", "원료"
-        FROM "분류기준"
-        ORDER BY "제품명", "건강지표"
-        """
-        
+        # 프로세스 전역 카탈로그 인덱스 (최초 1회 적재, 버전 변경 시에만 재적재)
         try:
-            classification_df = pd.read_sql(query, con=self.engine)
+            catalog = get_catalog_index(self.engine).current()
         except Exception as e:
             return [], {}
         
-        if classification_df.empty:
-            return [], {}
-        
-        # 집합 연산 최적화
-        health_indicators_set = set(health_indicators)
-        physiology_set = set(physiology_network)
-        concerns_set = set(health_concerns)
-        all_selected_areas = physiology_set | concerns_set
-        
-        # 제품별 데이터 구조화
-        product_data = {}
-        
-        for _, row in classification_df.iterrows():
-            product_name = row['제품명']
-            health_indicator_combo = row['건강지표']
-            management_area = row['관리 필요 영역']
-            
-            if product_name not in product_data:
-                product_data[product_name] = {
-                    'combos': [],
-                    'areas': set(),
-                    'physiology_matches': 0,
-                    'concern_matches': 0
-                }
-            
-            product_data[product_name]['combos'].append(health_indicator_combo)
-            product_data[product_name]['areas'].add(management_area)
-            
-            # 관리영역 매칭 카운트
-            if management_area in physiology_set:
-                product_data[product_name]['physiology_matches'] += 1
-            if management_area in concerns_set:
-                product_data[product_name]['concern_matches'] += 1
-        
-        # 각 제품의 최적 조합 찾기
-        final_products = []
-        
-        for product_name, data in product_data.items():
-            best_match_count = 0
-            best_combo = ''
-            best_combo_size = float('inf')
-            best_is_exact = False
-            
-            for combo in data['combos']:
-                combo_indicators = [ind.strip() for ind in combo.split(',')]
-                combo_set = set(combo_indicators)
-                
-                # 매칭 계산
-                match_count = len(combo_set & health_indicators_set)
-                if match_count == 0:
-                    continue
-                
-                combo_size = len(combo_set)
-                is_exact_match = combo_set.issubset(health_indicators_set)
-                
-                # 우선순위 결정: 정확한 매칭 > 매칭 개수 > 조합 크기 작음
-                is_better = False
-                if is_exact_match and not best_is_exact:
-                    is_better = True
-                elif is_exact_match == best_is_exact:
-                    if match_count > best_match_count:
-                        is_better = True
-                    elif match_count == best_match_count and combo_size < best_combo_size:
-                        is_better = True
-                
-                if is_better:
-                    best_match_count = match_count
-                    best_combo = combo
-                    best_combo_size = combo_size
-                    best_is_exact = is_exact_match
-            
-            if best_match_count > 0:
-                # 관리영역 매칭 점수 (낮은 가중치)
-                area_matches = len(data['areas'] & all_selected_areas)
-                area_score = area_matches if all_selected_areas else 0
-                
-                # 최종 점수 계산 - 건강지표 정확성 절대 우선
-                if best_is_exact:
-                    # 정확한 매칭: 조합 크기가 작을수록 높은 점수
-                    combo_bonus = max(0, 10 - best_combo_size) * 100
-                    final_score = 10000 + best_match_count * 1000 + combo_bonus + area_score
-                else:
-                    # 부정확한 매칭: 낮은 기본 점수
-                    final_score = best_match_count * 100 + area_score
-                
-                final_products.append((
-                    product_name,
-                    {
-                        'best_match_count': best_match_count,
-                        'best_combo': best_combo,
-                        'best_combo_size': best_combo_size,
-                        'best_is_exact_match': best_is_exact,
-                        'physiology_matches': data['physiology_matches'],
-                        'concern_matches': data['concern_matches'],
-                        'management_areas': data['areas'],
-                        'final_score': final_score
-                    }
-                ))
-        
-        # 점수순 정렬 및 상위 7개 선택
-        final_products.sort(key=lambda x: x[1]['final_score'], reverse=True)
-        top_products = final_products[:7]
-        
-        selected_products = [p[0] for p in top_products]
-        product_scores = {p[0]: p[1] for p in top_products}
-        
-        return selected_products, product_scores
+        return catalog.rank(health_indicators, physiology_network, health_concerns)
+
+    def query_cache_stats(self) -> Dict[str, Dict]:
+        """Prepared Statement 재사용률과 서버 계획 통계, 테이블 인덱스 버전 확인 상태, 추천 결과 / LLM 응답 캐시 적중률, 공급자별 LLM 스케줄러 대기 시간과 라우팅 통계"""
+        providers = self.llm_client.stats()['providers']
+        return {
+            'prepared_statements': STATEMENT_CACHE.stats(),
+            'server_plans': STATEMENT_CACHE.plan_summary(self.engine),
+            'table_indexes': {
+                'catalog': get_catalog_index(self.engine).stats(),
+                'graph': get_relationship_graph(self.engine).stats(),
+                'product_info': get_product_info_version(self.engine).stats(),
+            },
+            'recommendations': RECOMMENDATION_CACHE.stats(),
+            'llm_responses': self.llm_cache.stats(),
+            'llm_scheduler': {name: stats['scheduler'] for name, stats in providers.items()},
+            'llm_routing': {name: stats['routing'] for name, stats in providers.items()},
+        }
+
+    def load_product_snapshot(self, product_names: List[str]) -> ProductSnapshot:
+        """제품정보, 알레르겐, 분류기준 정보를 한 번의 쿼리로 조회한 요청 단위 스냅샷"""
+        return load_product_snapshot(self.engine, product_names)
 
     def get_product_details(self, product_names: List[str]) -> pd.DataFrame:
         """제품정보와 분류기준 테이블에서 제품 상세 정보 조회"""
         if not product_names:
             return pd.DataFrame()
         
-        product_filter = ', '.join(f"'{name}'" for name in product_names)
-        
-        # 제품정보 테이블에서 기본 정보 조회 (제품명, 관리 필요 영역 제외)
-        query = f"""
-        SELECT DISTINCT
-            pi."식품유형",
-            pi."제품명",
-            pi."식약처 인정 기능성",
-            pi."주요 특징",
-            pi."섭취 방법",
-            pi."주의사항",
-            pi."원재료",
-            pi."영양성분",
-            pi."글로벌/로컬 제품구분(제조사)",
-            al."알레르겐_정보"
-        FROM "제품정보" pi
-        LEFT JOIN (
-            SELECT "제품명", STRING_AGG("카테고리" || ' - ' || "분류" || ' (' || "알레르기 유발물질" || ')', ', ') AS 알레르겐_정보
-            FROM "제품_알레르겐"
-            GROUP BY "제품명"
-        ) al ON pi."제품명" = al."제품명"
-        WHERE pi."제품명" IN ({product_filter})
-        """
-        
-        product_info_df = pd.read_sql(query, con=self.engine)
-        
-        # 분류기준 테이블에서 관리 필요 영역 조회
-        classification_query = f"""
-        SELECT "제품명", STRING_AGG(DISTINCT "관리 필요 영역", ', ') as "관리 필요 영역"
-        FROM "분류기준"
-        WHERE "제품명" IN ({product_filter})
-        GROUP BY "제품명"
-        """
-        
-        classification_df = pd.read_sql(classification_query, con=self.engine)
-        
-        # 두 DataFrame을 제품명으로 병합
-        if not product_info_df.empty and not classification_df.empty:
-            result_df = pd.merge(product_info_df, classification_df, on='제품명', how='left')
-        else:
-            result_df = product_info_df
-        
-        return result_df
+        return self.load_product_snapshot(product_names).details_for(product_names)
 
     def get_product_classification_info(self, product_names: List[str]) -> Dict[str, Dict]:
         """분류기준 테이블에서 제품별 건강지표와 관리 필요 영역 정보 조회"""
         if not product_names:
             return {}
         
-        product_filter = ', '.join(f"'{name}'" for name in product_names)
-        
-        query = f"""
-        SELECT "제품명", "건강지표", "관리 필요 영역", "원료"
-        FROM "분류기준"
-        WHERE "제품명" IN ({product_filter})
-        """
-        
-        classification_df = pd.read_sql(query, con=self.engine)
-        
-        # 제품별로 건강지표, 관리 필요 영역, 원료 그룹화
-        product_classification = {}
-        for _, row in classification_df.iterrows():
-            product_name = row['제품명']
-            if product_name not in product_classification:
-                product_classification[product_name] = {
-                    'health_indicators': set(),
-                    'management_areas': set(),
-                    'ingredients': set()
-                }
-            
-            product_classification[product_name]['health_indicators'].add(row['건강지표'])
-            product_classification[product_name]['management_areas'].add(row['관리 필요 영역'])
-            
-            # 원료 정보 추가 (null이 아닌 경우에만)
-            if pd.notna(row.get('원료')):
-                product_classification[product_name]['ingredients'].add(row['원료'])
-        
-        return product_classification
+        return self.load_product_snapshot(product_names).classification_for(product_names)
 
     def get_health_indicator_relationships(self) -> Dict[str, List[str]]:
-        """그래프 테이블에서 건강지표와 관리 필요 영역의 연관 관계 조회"""
-        query = """
-        SELECT DISTINCT "건강지표", "관리 필요 영역"
-        FROM "그래프"
-        WHERE "건강지표" IS NOT NULL AND "관리 필요 영역" IS NOT NULL
-        """
-        
-        graph_df = pd.read_sql(query, con=self.engine)
-        
-        # 건강지표별로 관리 필요 영역들을 그룹화
-        health_relationships = {}
-        for _, row in graph_df.iterrows():
-            health_indicator = row['건강지표']
-            management_area = row['관리 필요 영역']
-            
-            if health_indicator not in health_relationships:
-                health_relationships[health_indicator] = []
-            
-            if management_area not in health_relationships[health_indicator]:
-                health_relationships[health_indicator].append(management_area)
-        
-        return health_relationships
+        """그래프 테이블에서 건강지표와 관리 필요 영역의 연관 관계 조회 (테이블 버전이 바뀔 때만 DB 재조회)"""
+        graph = get_relationship_graph(self.engine).current()
+        return {indicator: list(areas) for indicator, areas in graph.adjacency.items()}
+
+    def get_filtered_options(self, problematic_indicators: List[str]) -> tuple:
+        """주의/관리 건강지표에 연관된 (인체 생리 네트워크 옵션, 건강 분야 옵션) - 미리 계산된 표에서 조회"""
+        return get_relationship_graph(self.engine).current().options_for(problematic_indicators)
 
     def create_health_status_explanation(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], recommended_products_df: pd.DataFrame = None) -> str:
         """사용자의 건강 상태에 대한 설명 텍스트 생성"""
@@ -424,8 +283,73 @@ class HealthRAGSystem:
         
         return '\n'.join(explanation_parts)
 
+    def _recommendation_cache_key(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], user_data: Dict = None) -> Optional[tuple]:
+        """추천 결과 캐시 키 - 결과에 영향을 주는 값만 정규화 (분류기준/그래프/제품정보 테이블 버전을 알 수 없으면 None)"""
+        try:
+            versions = (
+                get_catalog_index(self.engine).current().version,
+                get_relationship_graph(self.engine).current().version,
+                get_product_info_version(self.engine).current().version,
+            )
+        except Exception:
+            return None
+        
+        problematic = tuple(sorted((k, v) for k, v in assessments.items() if v in ["주의", "관리"]))
+        
+        # 사용자 데이터는 프롬프트에 들어가는 값(건강 구간, 연령대, 성별)으로만 구분 - 걸린 구간이 없으면 프롬프트에 쓰이지 않음
+        user_bucket = None
+        if problematic and user_data:
+            flags = self.summarize_user_health_flags(user_data)
+            if flags:
+                sex = "남성" if user_data.get('sex', 1) == 1 else "여성"
+                user_bucket = (tuple(flags.items()), age_group(user_data.get('age', 0)), sex)
+        
+        return (versions, problematic, tuple(sorted(set(physiology_network))), tuple(sorted(set(health_concerns))), user_bucket)
+
     def recommend_products(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], user_input: str = "", user_data: Dict = None) -> tuple:
-        """새로운 추천 로직의 메인 함수 - DataFrame과 LLM 설명을 함께 반환"""
+        """새로운 추천 로직의 메인 함수 - DataFrame과 LLM 설명을 함께 반환 (같은 조건의 결과는 캐시에서 반환)"""
+        cache_key = self._recommendation_cache_key(assessments, physiology_network, health_concerns, user_data)
+        if cache_key is not None:
+            cached = RECOMMENDATION_CACHE.get(cache_key)
+            if cached is not None:
+                final_products, llm_explanation = cached
+                return final_products.copy(), llm_explanation
+        
+        final_products, llm_explanation = self._recommend_products_uncached(assessments, physiology_network, health_concerns, user_data)
+        
+        # 빈 결과나 LLM 오류 메시지는 일시적일 수 있으므로 캐시하지 않음
+        if cache_key is not None and not final_products.empty and "오류가 발생했습니다" not in llm_explanation:
+            RECOMMENDATION_CACHE.put(cache_key, (final_products.copy(), llm_explanation))
+        return final_products, llm_explanation
+
+    def recommend_products_stream(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], user_input: str = "", user_data: Dict = None) -> tuple:
+        """
+        recommend_products 의 스트리밍 버전 - (DataFrame, LLM 설명 조각 iterator) 반환
+        - 제품 선정은 바로 끝나고, 설명은 토큰이 도착하는 대로 화면에 그릴 수 있음
+        - 결과 캐시에 있으면 전체 설명을 한 조각으로 내보내고, 없으면 스트림이 끝난 뒤 결과 캐시에 저장
+        """
+        cache_key = self._recommendation_cache_key(assessments, physiology_network, health_concerns, user_data)
+        if cache_key is not None:
+            cached = RECOMMENDATION_CACHE.get(cache_key)
+            if cached is not None:
+                final_products, llm_explanation = cached
+                return final_products.copy(), iter([llm_explanation] if llm_explanation else [])
+
+        final_products, chunks = self._recommend_products_uncached(assessments, physiology_network, health_concerns, user_data, stream=True)
+
+        def explanation():
+            parts = []
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+            llm_explanation = "".join(parts)
+            if cache_key is not None and not final_products.empty and "오류가 발생했습니다" not in llm_explanation:
+                RECOMMENDATION_CACHE.put(cache_key, (final_products.copy(), llm_explanation))
+
+        return final_products, explanation()
+
+    def _recommend_products_uncached(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], user_data: Dict = None, stream: bool = False) -> tuple:
+        """DB 조회, 순위 계산, LLM 설명 생성을 모두 수행하는 추천 (stream=True 면 설명 대신 설명 조각 iterator 반환)"""
         
         # '좋음'이 아닌 건강지표만 필터링
         active_health_indicators = [k for k, v in assessments.items() if v in ["주의", "관리"]]
@@ -435,6 +359,8 @@ class HealthRAGSystem:
             # 건강 지표는 고려하지 않고 인체 생리 네트워크와 건강 분야만으로 추천
             final_products = self._recommend_for_all_good_health(physiology_network, health_concerns)
             # 모든 건강지표가 좋음인 경우의 LLM 설명 생성
+            if stream:
+                return final_products, self._stream_explanation_for_good_health(physiology_network, health_concerns, final_products)
             llm_explanation = self._generate_explanation_for_good_health(physiology_network, health_concerns, final_products)
             return final_products, llm_explanation
         
@@ -443,11 +369,10 @@ class HealthRAGSystem:
             active_health_indicators, physiology_network, health_concerns
         )
         
-        # 제품 상세 정보 조회
-        product_details = self.get_product_details(selected_products)
-        
-        # 분류기준 정보 조회
-        product_classification = self.get_product_classification_info(selected_products)
+        # 제품 상세 정보와 분류기준 정보를 한 번에 조회 (LLM 설명 생성에서도 재사용)
+        product_snapshot = self.load_product_snapshot(selected_products)
+        product_details = product_snapshot.details_for(selected_products)
+        product_classification = product_snapshot.classification_for(selected_products)
         
         # 최종 제품 리스트 (최대 7개 제한)
         final_products = pd.DataFrame()
@@ -489,11 +414,13 @@ class HealthRAGSystem:
                     break
         
         # LLM을 활용한 개인화된 추천 근거 생성
-        llm_explanation = ""
+        llm_explanation = iter(()) if stream else ""
         if not final_products.empty:
             recommended_product_names = final_products['제품명'].tolist()
-            llm_explanation = self.generate_personalized_recommendation_explanation(
-                assessments, physiology_network, health_concerns, recommended_product_names, product_scores, user_data
+            explain = self.stream_personalized_recommendation_explanation if stream else self.generate_personalized_recommendation_explanation
+            llm_explanation = explain(
+                assessments, physiology_network, health_concerns, recommended_product_names, product_scores, user_data,
+                product_snapshot=product_snapshot
             )
         
         return final_products, llm_explanation
@@ -563,16 +490,8 @@ class HealthRAGSystem:
         if not all_selected_areas:
             return pd.DataFrame()
         
-        # 분류기준 테이블에서 선택된 관리 영역에 해당하는 제품들 조회 (건강지표 포함)
-        areas_filter = ', '.join(f"'{area}'" for area in all_selected_areas)
-        
-        query = f"""
-        SELECT "제품명", "건강지표", "관리 필요 영역", "원료"
-        FROM "분류기준"
-        WHERE "관리 필요 영역" IN ({areas_filter})
-        """
-        
-        classification_df = pd.read_sql(query, con=self.engine)
+        # 분류기준 테이블에서 선택된 관리 영역에 해당하는 제품들 조회 (건강지표 포함, 영역 배열은 바인딩 파라미터)
+        classification_df = STATEMENT_CACHE.read_frame(self.engine, AREA_PRODUCTS_QUERY, sorted(all_selected_areas))
         
         if classification_df.empty:
             return pd.DataFrame()
@@ -634,11 +553,10 @@ class HealthRAGSystem:
         top_products = sorted_products[:7]
         selected_product_names = [product[0] for product in top_products]
         
-        # 제품 상세 정보 조회
-        product_details = self.get_product_details(selected_product_names)
-        
-        # 분류기준 정보 조회
-        product_classification = self.get_product_classification_info(selected_product_names)
+        # 제품 상세 정보와 분류기준 정보를 한 번에 조회
+        product_snapshot = self.load_product_snapshot(selected_product_names)
+        product_details = product_snapshot.details_for(selected_product_names)
+        product_classification = product_snapshot.classification_for(selected_product_names)
         
         if not product_details.empty:
             # 점수 정보를 DataFrame에 추가
@@ -686,118 +604,107 @@ class HealthRAGSystem:
 
 
     def analyze_user_health_data(self, user_data: Dict) -> Dict[str, str]:
-        """사용자의 실제 건강 데이터를 분석하여 구체적인 건강 상태 설명 생성"""
-        analysis = {}
-        
-        # 기본 정보
-        age = user_data.get('age', 0)
-        sex = user_data.get('sex', 1)  # 1: 남성, 2: 여성
-        bmi = user_data.get('he_bmi', 0)
-        
-        # 혈압 분석
-        sbp = user_data.get('sbp', 0)  # 수축기 혈압
-        dbp = user_data.get('dbp', 0)  # 이완기 혈압
-        
-        if sbp >= 140 or dbp >= 90:
-            analysis['혈압'] = f"수축기 혈압 {sbp}mmHg, 이완기 혈압 {dbp}mmHg로 고혈압 범위에 해당하여 혈압 조절이 필요합니다."
-        elif sbp >= 130 or dbp >= 80:
-            analysis['혈압'] = f"수축기 혈압 {sbp}mmHg, 이완기 혈압 {dbp}mmHg로 고혈압 전단계로 혈압 관리가 권장됩니다."
-        
-        # 간 기능 분석
-        gpt = user_data.get('gpt', 0)  # ALT
-        got = user_data.get('got', 0)  # AST
-        
-        if gpt > 40 or got > 40:
-            analysis['간건강'] = f"ALT {gpt}U/L, AST {got}U/L로 정상 범위를 초과하여 간 기능 개선이 필요합니다."
-        elif gpt > 30 or got > 30:
-            analysis['간건강'] = f"ALT {gpt}U/L, AST {got}U/L로 정상 상한에 근접하여 간 건강 관리가 권장됩니다."
-        
-        # 혈중 지질 분석
-        tc = user_data.get('tc', 0)  # 총 콜레스테롤
-        ldl = user_data.get('ldl', 0)  # LDL 콜레스테롤
-        hdl = user_data.get('hdl', 0)  # HDL 콜레스테롤
-        tg = user_data.get('tg', 0)  # 중성지방
-        
-        lipid_issues = []
-        if tc >= 240:
-            lipid_issues.append(f"총 콜레스테롤 {tc}mg/dL (고위험)")
-        elif tc >= 200:
-            lipid_issues.append(f"총 콜레스테롤 {tc}mg/dL (경계)")
-            
-        if ldl >= 160:
-            lipid_issues.append(f"LDL 콜레스테롤 {ldl}mg/dL (고위험)")
-        elif ldl >= 130:
-            lipid_issues.append(f"LDL 콜레스테롤 {ldl}mg/dL (경계)")
-            
-        if (sex == 1 and hdl < 40) or (sex == 2 and hdl < 50):
-            lipid_issues.append(f"HDL 콜레스테롤 {hdl}mg/dL (낮음)")
-            
-        if tg >= 200:
-            lipid_issues.append(f"중성지방 {tg}mg/dL (높음)")
-        elif tg >= 150:
-            lipid_issues.append(f"중성지방 {tg}mg/dL (경계)")
-        
-        if lipid_issues:
-            analysis['혈중지질'] = "혈중 지질 개선이 필요합니다: " + ", ".join(lipid_issues)
-        
-        # 혈당 분석
-        glu = user_data.get('glu', 0)
-        if glu >= 126:
-            analysis['혈당'] = f"공복혈당 {glu}mg/dL로 당뇨병 범위에 해당하여 혈당 조절이 시급합니다."
-        elif glu >= 100:
-            analysis['혈당'] = f"공복혈당 {glu}mg/dL로 당뇨병 전단계로 혈당 관리가 필요합니다."
-        
-        # 체중 및 체성분 분석
-        if bmi >= 30:
-            analysis['체중'] = f"BMI {bmi}로 비만 상태로 체지방 감소가 필요합니다."
-        elif bmi >= 25:
-            analysis['체중'] = f"BMI {bmi}로 과체중 상태로 체중 관리가 권장됩니다."
-        elif bmi < 18.5:
-            analysis['체중'] = f"BMI {bmi}로 저체중 상태로 영양 균형과 근력 증진이 필요합니다."
-        
-        # 근육량 분석
-        skeletal_muscle = user_data.get('skeletal_muscle_mass', 0)
-        per_bodyfat = user_data.get('per_bodyfat', 0)
-        
-        if per_bodyfat > 25 and sex == 1:  # 남성
-            analysis['근육'] = f"체지방률 {per_bodyfat}%로 높아 근력 증진과 체지방 감소가 필요합니다."
-        elif per_bodyfat > 30 and sex == 2:  # 여성
-            analysis['근육'] = f"체지방률 {per_bodyfat}%로 높아 근력 증진과 체지방 감소가 필요합니다."
-        
-        # 생활습관 분석
-        smok_dur = user_data.get('smok_dur', 0)
-        sleep_time = user_data.get('sleep_time', 0)
-        
-        lifestyle_issues = []
-        if smok_dur > 0:
-            lifestyle_issues.append(f"{smok_dur}년간의 흡연으로 항산화 및 혈행 개선이 중요합니다")
-        
-        if sleep_time < 7:
-            lifestyle_issues.append(f"수면시간 {sleep_time}시간으로 부족하여 수면 건강 관리가 필요합니다")
-        
-        if lifestyle_issues:
-            analysis['생활습관'] = ". ".join(lifestyle_issues)
-        
-        return analysis
+        """사용자의 실제 건강 데이터를 분석하여 구체적인 건강 상태 설명 생성 (health_rules 규칙 테이블 기준)"""
+        return HEALTH_RULE_ENGINE.analyze(user_data)
 
-    def generate_personalized_recommendation_explanation(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], recommended_products: List[str], product_scores: Dict, user_data: Dict = None) -> str:
-        """LLM을 활용하여 개인화된 제품 추천 근거 생성 - 사용자 데이터 기반 개인화"""
+    def summarize_user_health_flags(self, user_data: Dict) -> Dict[str, str]:
+        """
+        건강 데이터를 규칙 구간으로 요약 ({항목: '고혈압 전단계, LDL 경계'}) - 개인화 설명 프롬프트와 캐시 키용
+        - 측정값을 넣지 않으므로 같은 구간에 속한 사용자끼리 설명 캐시를 공유
+        """
+        return {category: ", ".join(labels) for category, labels in HEALTH_RULE_ENGINE.flags(user_data).items()}
+
+    def _run_llm_request(self, request: LLMRequest) -> str:
+        """캐시 조회 → LLM 호출 → 캐시 저장 (오류는 사용자용 문구로 반환, 미리 만든 suffix 는 캐시하지 않고 뒤에 붙임)"""
+        try:
+            cached = self._read_cache(request.cache_key)
+            if cached:
+                return self._with_suffix(cached.strip(), request)
+
+            content = self.llm_client.complete(**request.params, priority=self.llm_priority, route=request.route)
+            self._write_cache(request.cache_key, content)
+            return self._with_suffix(content, request)
+
+        except Exception as e:
+            return f"{request.error_message}: {str(e)}"
+
+    @staticmethod
+    def _with_suffix(content: str, request: LLMRequest) -> str:
+        return f"{content.rstrip()}\n\n{request.suffix}" if request.suffix else content
+
+    def _stream_llm_request(self, request: LLMRequest) -> Iterator[str]:
+        """_run_llm_request 의 스트리밍 버전 - 토큰을 받는 대로 내보내고, 스트림이 끝까지 성공한 경우에만 캐시 저장"""
+        cached = self._read_cache(request.cache_key)
+        if cached:
+            yield self._with_suffix(cached.strip(), request)
+            return
+
+        parts = []
+        try:
+            for delta in self.llm_client.stream(**request.params, priority=self.llm_priority, route=request.route):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            yield ("\n\n" if parts else "") + f"{request.error_message}: {str(e)}"
+            return
+        self._write_cache(request.cache_key, "".join(parts))
+        if request.suffix:
+            yield f"\n\n{request.suffix}"
+
+    def generate_personalized_recommendation_explanation(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], recommended_products: List[str], product_scores: Dict, user_data: Dict = None, product_snapshot: Optional[ProductSnapshot] = None) -> str:
+        """LLM을 활용하여 개인화된 제품 추천 근거 생성 - 사용자 데이터 기반 개인화 (product_snapshot 이 있으면 DB 재조회 없음)"""
+        return self._run_llm_request(self._personalized_explanation_request(assessments, physiology_network, health_concerns, recommended_products, product_scores, user_data, product_snapshot))
+
+    def stream_personalized_recommendation_explanation(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], recommended_products: List[str], product_scores: Dict, user_data: Dict = None, product_snapshot: Optional[ProductSnapshot] = None) -> Iterator[str]:
+        """generate_personalized_recommendation_explanation 의 스트리밍 버전"""
+        return self._stream_llm_request(self._personalized_explanation_request(assessments, physiology_network, health_concerns, recommended_products, product_scores, user_data, product_snapshot))
+
+    def _personalized_explanation_request(self, assessments: Dict[str, str], physiology_network: List[str], health_concerns: List[str], recommended_products: List[str], product_scores: Dict, user_data: Dict = None, product_snapshot: Optional[ProductSnapshot] = None, prompt_mode: Optional[str] = None) -> LLMRequest:
+        """개인화된 추천 근거 프롬프트 구성 (prompt_mode: 'full' 기존 템플릿 / 'compact' 압축 템플릿, 기본값은 LLM_PROMPT_MODE)"""
         
         # 문제가 있는 건강지표만 추출
         problematic_indicators = {k: v for k, v in assessments.items() if v in ["주의", "관리"]}
         
-        # 사용자 데이터 분석 (있는 경우)
+        # 사용자 데이터 분석 (있는 경우) - 측정값 대신 규칙 구간 (캐시 키와 같은 값)
         user_health_analysis = {}
         if user_data:
-            user_health_analysis = self.analyze_user_health_data(user_data)
+            user_health_analysis = self.summarize_user_health_flags(user_data)
         
-        # 제품별 상세 정보 조회
-        product_details = self.get_product_details(recommended_products)
-        product_classification = self.get_product_classification_info(recommended_products)
+        # 제품별 상세 정보 조회 (추천 단계에서 만든 스냅샷 재사용)
+        if product_snapshot is None or not product_snapshot.covers(recommended_products):
+            product_snapshot = self.load_product_snapshot(recommended_products)
+        product_details = product_snapshot.details_for(recommended_products)
+        product_classification = product_snapshot.classification_for(recommended_products)
         
         # 건강지표와 관리영역 연관관계 조회
         health_relationships = self.get_health_indicator_relationships()
         
+        # 제품을 기본 베이스(1-3위)와 추가 보강(4-7위)으로 구분
+        base_products = recommended_products[:3]
+        additional_products = recommended_products[3:7] if len(recommended_products) > 3 else []
+        
+        cache_fields = self._personalized_cache_fields(
+            problematic_indicators, physiology_network, health_concerns, base_products, additional_products,
+            product_scores, user_data, user_health_analysis, product_details
+        )
+        prompt_mode = prompt_mode or PROMPT_MODE
+        if prompt_mode == "fragments":
+            request = self._fragment_personalized_request(
+                problematic_indicators, physiology_network, health_concerns, base_products, additional_products,
+                product_scores, user_data, user_health_analysis, product_details, product_classification,
+                health_relationships, cache_fields
+            )
+            if request is not None:
+                return request
+            # 조각이 없거나 원본이 바뀐 제품이 있으면 압축 템플릿으로 전체 생성
+            prompt_mode = "compact"
+        if prompt_mode == "compact":
+            return self._compact_personalized_request(
+                problematic_indicators, physiology_network, health_concerns, base_products, additional_products,
+                product_scores, user_data, user_health_analysis, product_details, product_classification,
+                health_relationships, cache_fields
+            )
+        
         # 프롬프트 생성
         prompt = f"""
 사용자의 건강 상태 분석:
@@ -812,9 +719,8 @@ class HealthRAGSystem:
 사용자의 실제 건강 데이터 분석:
 """
             if user_data:
-                age = user_data.get('age', 0)
                 sex = "남성" if user_data.get('sex', 1) == 1 else "여성"
-                prompt += f"- 기본정보: {age}세 {sex}\n"
+                prompt += f"- 기본정보: {age_group(user_data.get('age', 0))} {sex}\n"
             
             for category, analysis in user_health_analysis.items():
                 prompt += f"- {category}: {analysis}\n"
@@ -834,10 +740,6 @@ class HealthRAGSystem:
 추천된 제품들과 상세 정보:
 """
         
-        # 제품을 기본 베이스(1-3위)와 추가 보강(4-7위)으로 구분
-        base_products = recommended_products[:3]
-        additional_products = recommended_products[3:7] if len(recommended_products) > 3 else []
-        
         prompt += "기본 베이스 제품 (1-3위):\n"
         for i, product_name in enumerate(base_products, 1):
             if product_name in product_scores:
@@ -997,23 +899,12 @@ class HealthRAGSystem:
 - 각 제품 설명에는 '식약처 인정 기능성', '주요 특징', '원재료'(제품정보), '원료'(분류기준)를 반드시 포함
 """
 
-        try:
-            # 캐시 조회
-            cache_payload = {
-                "model": "llama-3.3-70b-versatile",
-                "system": "당신은 개인 맞춤형 건강 제품 추천 전문가입니다.",
-                "prompt": prompt,
-                "temperature": 0.4,
-            }
-            cache_key = self._build_cache_key(cache_payload, prefix="personalized")
-            cached = self._read_cache(cache_key)
-            if cached:
-                return cached.strip()
-
-            chat_completion = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",  # 더 정교한 분석을 위해 큰 모델 사용
-                messages=[
-                    {"role": "system", "content": """당신은 개인 맞춤형 건강 제품 추천 전문가입니다.
+        cache_key = self._explanation_cache_key("personalized", cache_fields, prompt, system="당신은 개인 맞춤형 건강 제품 추천 전문가입니다.")
+        return LLMRequest(
+            cache_key=cache_key,
+            model=EXPLANATION_MODEL,  # 더 정교한 분석을 위해 큰 모델 사용
+            messages=[
+                {"role": "system", "content": """당신은 개인 맞춤형 건강 제품 추천 전문가입니다.
 
 핵심 원칙:
 - 사용자 개인 데이터에 기반한 맞춤형 추천 로직 설명
@@ -1066,24 +957,157 @@ class HealthRAGSystem:
 - 모든 섹션을 빠짐없이 작성해야 함
 - 자연스럽고 읽기 쉬운 한국어 사용
 - 불필요한 군더더기 제거, 간결하고 밀도 있게 작성"""},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1600,  # 토큰 절감(내용 유지에 충분)
-                temperature=0.4   # 자연스러운 표현을 위해 적절히 조정
-            )
-            
-            content = chat_completion.choices[0].message.content.strip()
-            self._write_cache(cache_key, content)
-            return content
-            
-        except Exception as e:
-            return f"개인화된 추천 근거 생성 중 오류가 발생했습니다: {str(e)}"
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=1600,  # 토큰 절감(내용 유지에 충분)
+            temperature=EXPLANATION_TEMPERATURE,   # 자연스러운 표현을 위해 적절히 조정
+            error_message="개인화된 추천 근거 생성 중 오류가 발생했습니다",
+            route="explanation",
+        )
+
+    def _personalized_cache_fields(self, problematic_indicators: Dict[str, str], physiology_network: List[str], health_concerns: List[str], base_products: List[str], additional_products: List[str], product_scores: Dict, user_data: Optional[Dict], user_health_analysis: Dict[str, str], product_details: pd.DataFrame) -> Dict:
+        """개인화 설명 캐시 키 값 - 프롬프트를 결정하는 값만 정규화 (제품은 기본/보강 구간별로 정렬, 건강 데이터는 규칙 구간과 연령대 단위)"""
+        user_profile = None
+        if user_health_analysis:
+            user_profile = {
+                "analysis": sorted(user_health_analysis.items()),
+                "age": age_group(user_data.get('age', 0)),
+                "sex": user_data.get('sex', 1) == 1,
+            }
+        return {
+            "indicators": sorted(problematic_indicators.items()),
+            "physiology": sorted(set(physiology_network)),
+            "concerns": sorted(set(health_concerns)),
+            "products": [sorted(base_products), sorted(additional_products)],
+            "scores": sorted(
+                (name, [int(product_scores[name].get(field, 0)) for field in ('best_match_count', 'physiology_matches', 'concern_matches')])
+                for name in base_products + additional_products if name in product_scores
+            ),
+            "user": user_profile,
+            "content": self._content_fingerprint(product_details.to_dict('records') if not product_details.empty else []),
+        }
+
+    def _compact_personalized_request(self, problematic_indicators: Dict[str, str], physiology_network: List[str], health_concerns: List[str], base_products: List[str], additional_products: List[str], product_scores: Dict, user_data: Optional[Dict], user_health_analysis: Dict[str, str], product_details: pd.DataFrame, product_classification: Dict[str, Dict], health_relationships: Dict[str, List[str]], cache_fields: Dict) -> LLMRequest:
+        """
+        압축 모드 개인화 설명 요청
+        - 고정 지침은 모두 시스템 메시지(요청 간 동일한 앞부분)로, 사용자 메시지에는 요청별 데이터만 한 번씩
+        - 제품 정보는 한 줄씩, 보강 제품의 고유 원료/추가 관리영역은 같은 줄에 붙여 중복 나열 제거
+        - 추천 로직 개수 요약과 점수 분석 블록은 제품 줄의 매칭 수로 대체
+        """
+        base_ingredients, base_areas = set(), set()
+        for name in base_products:
+            base_ingredients.update(product_classification.get(name, {}).get('ingredients', set()))
+            base_areas.update(product_classification.get(name, {}).get('management_areas', set()))
+
+        def entry(name, additional):
+            info = product_details[product_details['제품명'] == name] if not product_details.empty else product_details
+            info = info.iloc[0] if not info.empty else None
+            classification_info = product_classification.get(name, {})
+            score_data = product_scores[name]
+            product = {
+                'name': name,
+                'indicators': classification_info.get('health_indicators', set()),
+                'areas': classification_info.get('management_areas', set()),
+                'ingredients': classification_info.get('ingredients', set()),
+                'functionality': info['식약처 인정 기능성'] if info is not None else '정보 없음',
+                'features': info['주요 특징'] if info is not None else '정보 없음',
+                'raw_materials': info['원재료'] if info is not None else '정보 없음',
+                'indicator_matches': score_data.get('best_match_count', 0),
+                'interest_matches': score_data.get('physiology_matches', 0) + score_data.get('concern_matches', 0),
+            }
+            if additional:
+                product['unique_ingredients'] = product['ingredients'] - base_ingredients
+                product['unique_areas'] = product['areas'] - base_areas
+            return product
+
+        user_profile = None
+        if user_health_analysis and user_data:
+            user_profile = (age_group(user_data.get('age', 0)), "남성" if user_data.get('sex', 1) == 1 else "여성")
+        prompt = create_compact_personalized_prompt(
+            problematic_indicators, physiology_network, health_concerns, user_profile, user_health_analysis,
+            {indicator: health_relationships[indicator] for indicator in problematic_indicators if indicator in health_relationships},
+            [entry(name, False) for name in base_products if name in product_scores],
+            [entry(name, True) for name in additional_products if name in product_scores],
+        )
+        system = get_personalized_system_message()
+        return LLMRequest(
+            cache_key=self._explanation_cache_key("personalized_compact", cache_fields, prompt, system=system),
+            model=EXPLANATION_MODEL,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=1600,
+            temperature=EXPLANATION_TEMPERATURE,
+            error_message="개인화된 추천 근거 생성 중 오류가 발생했습니다",
+            route="explanation",
+        )
+
+    def _fragment_personalized_request(self, problematic_indicators: Dict[str, str], physiology_network: List[str], health_concerns: List[str], base_products: List[str], additional_products: List[str], product_scores: Dict, user_data: Optional[Dict], user_health_analysis: Dict[str, str], product_details: pd.DataFrame, product_classification: Dict[str, Dict], health_relationships: Dict[str, List[str]], cache_fields: Dict) -> Optional[LLMRequest]:
+        """
+        fragments 모드 개인화 설명 요청 - 제품 섹션은 fragment_store 의 미리 만든 조각으로 조립하고 LLM 은 진단 섹션만 작성
+        - 제품마다 사용자의 문제 건강지표 중 해당하는 지표의 조각을 우선 사용, 없으면 제품별 조각
+        - 하나라도 쓸 수 있는 조각이 없으면 None (호출한 쪽에서 전체 생성으로 대체)
+        """
+        store = get_fragment_store()
+        rows = {row['제품명']: row for row in product_details.to_dict('records')} if not product_details.empty else {}
+
+        tiers = []
+        listed = []
+        for title, names, first_rank in (("## 💊 기본 베이스 제품", base_products, 1), ("## 💪🏻 보강 제품", additional_products, 4)):
+            paragraphs = []
+            for rank, name in enumerate([n for n in names if n in product_scores], first_rank):
+                classification_info = product_classification.get(name, {})
+                indicators = classification_info.get('health_indicators', set())
+                areas = classification_info.get('management_areas', set())
+                if name not in rows:
+                    return None
+                source = source_hash(rows[name], indicators, areas, classification_info.get('ingredients', set()))
+                text = store.fragment_for(name, [i for i in problematic_indicators if i in indicators], source)
+                if not text:
+                    return None
+                paragraphs.append(f"### {name}\n{text}")
+                listed.append((rank, name, indicators, areas))
+            if paragraphs:
+                tiers.append(title + "\n\n" + "\n\n".join(paragraphs))
+
+        user_profile = None
+        if user_health_analysis and user_data:
+            user_profile = (age_group(user_data.get('age', 0)), "남성" if user_data.get('sex', 1) == 1 else "여성")
+        prompt = create_diagnosis_prompt(
+            problematic_indicators, physiology_network, health_concerns, user_profile, user_health_analysis,
+            {indicator: health_relationships[indicator] for indicator in problematic_indicators if indicator in health_relationships},
+            listed,
+        )
+        system = get_diagnosis_system_message()
+        return LLMRequest(
+            cache_key=self._explanation_cache_key("personalized_fragments", cache_fields, prompt, system=system),
+            model=EXPLANATION_MODEL,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=DIAGNOSIS_MAX_TOKENS,
+            temperature=EXPLANATION_TEMPERATURE,
+            error_message="개인화된 추천 근거 생성 중 오류가 발생했습니다",
+            suffix="\n\n".join(tiers),
+            route="diagnosis",
+        )
 
     def _generate_explanation_for_good_health(self, physiology_network: List[str], health_concerns: List[str], final_products: pd.DataFrame) -> str:
         """모든 건강지표가 좋음인 경우의 LLM 설명 생성"""
-        
         if final_products.empty:
             return "추천할 제품이 없습니다."
+        return self._run_llm_request(self._good_health_explanation_request(physiology_network, health_concerns, final_products))
+
+    def _stream_explanation_for_good_health(self, physiology_network: List[str], health_concerns: List[str], final_products: pd.DataFrame) -> Iterator[str]:
+        """_generate_explanation_for_good_health 의 스트리밍 버전"""
+        if final_products.empty:
+            return iter(["추천할 제품이 없습니다."])
+        return self._stream_llm_request(self._good_health_explanation_request(physiology_network, health_concerns, final_products))
+
+    def _good_health_explanation_request(self, physiology_network: List[str], health_concerns: List[str], final_products: pd.DataFrame) -> LLMRequest:
+        """모든 건강지표가 좋음인 경우의 프롬프트 구성"""
         
         prompt = f"""
 사용자의 건강 상태:
@@ -1127,35 +1151,25 @@ class HealthRAGSystem:
 설명은 예방 의학적 관점에서 전문적이면서도 이해하기 쉽게 작성해주세요.
 """
 
-        try:
-            # 캐시 조회
-            cache_payload = {
-                "model": "llama-3.3-70b-versatile",
-                "system": "당신은 예방 의학 전문가입니다.",
-                "prompt": prompt,
-                "temperature": 0.4,
-            }
-            cache_key = self._build_cache_key(cache_payload, prefix="goodhealth")
-            cached = self._read_cache(cache_key)
-            if cached:
-                return cached.strip()
-
-            chat_completion = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "당신은 예방 의학 전문가입니다. 건강한 사용자에게 건강 유지 및 예방을 위한 제품 추천 근거를 논리적으로 설명해주세요."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1200,  # 토큰 절감(내용 유지)
-                temperature=0.4   # 자연스러운 표현
-            )
-            
-            content = chat_completion.choices[0].message.content.strip()
-            self._write_cache(cache_key, content)
-            return content
-            
-        except Exception as e:
-            return f"건강 유지 추천 근거 생성 중 오류가 발생했습니다: {str(e)}"
+        # 캐시 키 (관심 영역과 추천 제품 기준 - 관리영역/원료 문자열의 순서는 카탈로그 버전으로 대신함)
+        cache_key = self._explanation_cache_key("goodhealth", {
+            "physiology": sorted(set(physiology_network)),
+            "concerns": sorted(set(health_concerns)),
+            "products": sorted(final_products['제품명'].tolist()),
+            "content": self._content_fingerprint(final_products.to_dict('records')),
+        }, prompt, system="당신은 예방 의학 전문가입니다.")
+        return LLMRequest(
+            cache_key=cache_key,
+            model=EXPLANATION_MODEL,
+            messages=[
+                {"role": "system", "content": "당신은 예방 의학 전문가입니다. 건강한 사용자에게 건강 유지 및 예방을 위한 제품 추천 근거를 논리적으로 설명해주세요."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=1200,  # 토큰 절감(내용 유지)
+            temperature=EXPLANATION_TEMPERATURE,   # 자연스러운 표현
+            error_message="건강 유지 추천 근거 생성 중 오류가 발생했습니다",
+            route="explanation",
+        )
 
 
 
@@ -1172,4 +1186,19 @@ class HealthRAGSystem:
         if llm_explanation:
             formatted_output += f"{llm_explanation}\n\n"
         
-        return formatted_output
\ No newline at end of file
+        return formatted_output
+
+
+_health_systems = {}
+_health_systems_lock = threading.Lock()
+
+
+def get_health_system(groq_api_key: str) -> HealthRAGSystem:
+    """API 키별로 하나만 생성되는 HealthRAGSystem (Streamlit 재실행마다 새로 만들지 않음)"""
+    system = _health_systems.get(groq_api_key)
+    if system is None:
+        with _health_systems_lock:
+            system = _health_systems.get(groq_api_key)
+            if system is None:
+                system = _health_systems[groq_api_key] = HealthRAGSystem(groq_api_key)
+    return system
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+제품 설명 조각 저장소 (오프라인 생성)
+- 제품별 설명과 제품 × 건강지표별 설명을 배치 작업으로 미리 만들어 JSON 파일 하나에 보관 (검토 후 커밋 가능)
+- 요청 시에는 저장된 조각을 그대로 이어 붙이고, LLM 은 짧은 개인화 진단 섹션만 작성 (data.py 의 fragments 모드)
+- 조각마다 원본 제품 정보의 해시(source_hash)를 기록 - 제품정보/분류기준이 바뀌면 그 조각은 쓰지 않고 다음 배치에서 재생성
+- status: 'auto' (자동 검사 통과) / 'approved' (검토 완료, 원본이 같으면 재생성하지 않음) / 'rejected' (사용 안 함)
+- 설정 (환경변수) FRAGMENT_STORE_PATH (기본 product_fragments.json)
+
+배치 작업:
+    python fragment_store.py build               # 없는 조각과 원본이 바뀐 조각만 생성 (중단 후 다시 실행하면 이어서)
+    python fragment_store.py build --force       # approved 를 제외한 전부 재생성
+    python fragment_store.py stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from llm_scheduler import PRIORITY_BATCH
+
+DEFAULT_PATH = os.getenv('FRAGMENT_STORE_PATH', os.path.join(os.getcwd(), 'product_fragments.json'))
+FRAGMENT_MODEL = "llama-3.3-70b-versatile"
+FRAGMENT_TEMPERATURE = 0.3
+FRAGMENT_MAX_TOKENS = 400
+# 제품별 조각 키에서 건강지표 자리에 쓰는 값
+PRODUCT_SCOPE = "*"
+
+# 자동 검사 - 금지 용어, 한자/일본어, 오류 문구, 길이
+FORBIDDEN_TERMS = ("건강 기능 보조제", "오류가 발생했습니다")
+_FOREIGN_SCRIPT = re.compile(r'[぀-ヿ一-鿿]')
+MIN_LENGTH = 60
+MAX_LENGTH = 1200
+
+
+def source_hash(row, indicators, areas, ingredients):
+    """조각의 원본이 되는 제품 정보 해시 (이 값이 달라지면 조각을 다시 만들어야 함)"""
+    payload = {
+        'functionality': str(row.get('식약처 인정 기능성', '')),
+        'features': str(row.get('주요 특징', '')),
+        'raw_materials': str(row.get('원재료', '')),
+        'indicators': sorted(indicators),
+        'areas': sorted(areas),
+        'ingredients': sorted(ingredients),
+    }
+    serialized = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(serialized).hexdigest()[:16]
+
+
+def vet_fragment(text):
+    """자동 검사 - 통과하면 None, 아니면 사유"""
+    text = (text or '').strip()
+    if len(text) < MIN_LENGTH:
+        return "too_short"
+    if len(text) > MAX_LENGTH:
+        return "too_long"
+    for term in FORBIDDEN_TERMS:
+        if term in text:
+            return f"forbidden:{term}"
+    if _FOREIGN_SCRIPT.search(text):
+        return "foreign_script"
+    return None
+
+
+class FragmentStore:
+    """(제품명, 건강지표) → 설명 조각 (프로세스 안에서 스레드 안전, 저장은 임시 파일 교체로 원자적)"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.fragments = {}
+        self.meta = {}
+        self.load()
+
+    @staticmethod
+    def _key(product, indicator=None):
+        return f"{product}\t{indicator or PRODUCT_SCOPE}"
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        with self._lock:
+            self.meta = data.get('meta', {})
+            self.fragments = {
+                self._key(entry['product'], entry.get('indicator')): entry
+                for entry in data.get('fragments', [])
+            }
+
+    def save(self):
+        with self._lock:
+            data = {
+                'meta': {**self.meta, 'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S')},
+                'fragments': sorted(self.fragments.values(), key=lambda e: (e['product'], e.get('indicator') or '')),
+            }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.fragments-', suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def entry(self, product, indicator=None):
+        return self.fragments.get(self._key(product, indicator))
+
+    def put(self, product, indicator, text, source, model=FRAGMENT_MODEL):
+        entry = {
+            'product': product,
+            'indicator': indicator,
+            'text': text.strip(),
+            'source_hash': source,
+            'model': model,
+            'status': 'auto',
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with self._lock:
+            self.fragments[self._key(product, indicator)] = entry
+        return entry
+
+    def usable(self, product, indicator, source):
+        """원본이 같고 거절되지 않은 조각의 텍스트 또는 None"""
+        entry = self.entry(product, indicator)
+        if entry is None or entry.get('status') == 'rejected' or entry.get('source_hash') != source:
+            return None
+        return entry['text']
+
+    def fragment_for(self, product, indicators, source):
+        """제품 × 건강지표 조각 (indicators 순서대로 먼저 있는 것) → 없으면 제품별 조각 → 없으면 None"""
+        for indicator in indicators:
+            text = self.usable(product, indicator, source)
+            if text:
+                return text
+        return self.usable(product, None, source)
+
+    def stats(self):
+        with self._lock:
+            entries = list(self.fragments.values())
+        statuses = {}
+        for entry in entries:
+            statuses[entry.get('status', 'auto')] = statuses.get(entry.get('status', 'auto'), 0) + 1
+        return {
+            'path': self.path,
+            'fragments': len(entries),
+            'products': len({entry['product'] for entry in entries}),
+            'by_status': statuses,
+            'meta': dict(self.meta),
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_fragment_store(path=None):
+    """경로별로 하나만 적재되는 조각 저장소"""
+    path = path or DEFAULT_PATH
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = FragmentStore(path)
+    return store
+
+
+# --------------------------
+# 배치 생성
+# --------------------------
+def catalog_tasks(system, store, force=False):
+    """
+    생성할 (제품명, 건강지표 또는 None, 프롬프트, source_hash) 목록
+    - 카탈로그의 모든 제품에 대해 제품별 1개 + 해당 건강지표별 1개
+    """
+    from catalog_index import get_catalog_index
+    from prompts import get_product_explanation_prompt, get_product_tip_prompt
+
+    catalog = get_catalog_index(system.engine).current()
+    names = sorted(catalog.products)
+    snapshot = system.load_product_snapshot(names)
+    details = {row['제품명']: row for row in snapshot.details_for(names).to_dict('records')}
+
+    tasks, skipped = [], 0
+    for name in names:
+        row = details.get(name)
+        if row is None:
+            continue
+        classification = snapshot.classification_for([name]).get(name, {})
+        indicators = classification.get('health_indicators', set())
+        areas = classification.get('management_areas', set())
+        ingredients = classification.get('ingredients', set())
+        source = source_hash(row, indicators, areas, ingredients)
+        row = {**row, '해당_원료': ', '.join(sorted(ingredients)) or '정보 없음'}
+
+        candidates = [(None, get_product_explanation_prompt(row))]
+        candidates += [
+            (indicator, get_product_tip_prompt(row, indicator, ', '.join(sorted(areas))))
+            for indicator in sorted(indicators)
+        ]
+        for indicator, prompt in candidates:
+            entry = store.entry(name, indicator)
+            up_to_date = entry is not None and entry.get('source_hash') == source
+            if up_to_date and (entry.get('status') == 'approved' or not force):
+                skipped += 1
+                continue
+            tasks.append((name, indicator, prompt, source))
+    store.meta['catalog_version'] = catalog.version
+    return tasks, skipped
+
+
+def generate_fragment(llm_client, prompt):
+    from prompts import get_system_message
+    return llm_client.complete(
+        model=FRAGMENT_MODEL,
+        messages=[
+            {"role": "system", "content": get_system_message()},
+            {"role": "user", "content": prompt},
+        ],
+        max_tokens=FRAGMENT_MAX_TOKENS,
+        temperature=FRAGMENT_TEMPERATURE,
+        priority=PRIORITY_BATCH,
+        route="fragments",
+    )
+
+
+def build(system, store, force=False, workers=4, limit=None, save_every=20, out=sys.stdout):
+    """카탈로그 전체 조각 생성 - 진행 상황 출력, save_every 개마다 저장 (중단 후 재실행 시 이어서)"""
+    tasks, skipped = catalog_tasks(system, store, force=force)
+    if limit is not None:
+        tasks = tasks[:limit]
+    print(f"생성 {len(tasks)}개 / 최신 상태로 건너뜀 {skipped}개", file=out)
+
+    counts = {'stored': 0, 'rejected': 0, 'failed': 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate_fragment, system.llm_client, prompt): (name, indicator, source)
+                   for name, indicator, prompt, source in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            name, indicator, source = futures[future]
+            try:
+                text = future.result()
+            except Exception as e:
+                counts['failed'] += 1
+                print(f"  실패 {name} / {indicator or PRODUCT_SCOPE}: {e}", file=out)
+                continue
+            reason = vet_fragment(text)
+            if reason:
+                counts['rejected'] += 1
+                print(f"  검사 불통과 {name} / {indicator or PRODUCT_SCOPE}: {reason}", file=out)
+                continue
+            store.put(name, indicator, text, source)
+            counts['stored'] += 1
+            if done % save_every == 0:
+                store.save()
+            print(f"  [{done}/{len(tasks)}] {name} / {indicator or PRODUCT_SCOPE}", file=out)
+    store.save()
+    print(f"완료: 저장 {counts['stored']}, 검사 불통과 {counts['rejected']}, 실패 {counts['failed']}", file=out)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="제품 설명 조각 배치 생성")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_parser = sub.add_parser('build')
+    build_parser.add_argument('--force', action='store_true', help="approved 를 제외하고 최신 조각도 재생성")
+    build_parser.add_argument('--workers', type=int, default=4)
+    build_parser.add_argument('--limit', type=int, default=None)
+    build_parser.add_argument('--path', default=None)
+    stats_parser = sub.add_parser('stats')
+    stats_parser.add_argument('--path', default=None)
+    args = parser.parse_args(argv)
+
+    store = get_fragment_store(args.path)
+    if args.command == 'stats':
+        print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+        return 0
+
+    from connections import get_setting
+    from data import HealthRAGSystem
+    system = HealthRAGSystem(get_setting('GROQ_API_KEY', ''))
+    counts = build(system, store, force=args.force, workers=args.workers, limit=args.limit)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
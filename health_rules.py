@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+검진 수치 기반 건강 상태 규칙 엔진
+- HealthRAGSystem.analyze_user_health_data 의 혈압 / 간 / 지질 / 혈당 / BMI / 체지방 / 생활습관 기준을 규칙 테이블로 정의
+- 조건식은 스칼라와 numpy 배열 모두에서 동작하도록 비교 연산과 | / & 만 사용
+- 단건(dict) 평가는 기존과 같은 분석 문구를, DataFrame 평가는 회원별로 걸린 항목을 벡터 연산으로 반환
+"""
+
+import string
+
+import numpy as np
+import pandas as pd
+
+# user_data 에 값이 없을 때 사용하는 값 (기존 user_data.get(..., 0) 규칙)
+FIELD_DEFAULTS = {'sex': 1}
+
+
+def age_group(age):
+    """나이 → 연령대 문구 (예: 34 → '30대') - 개인화 설명 프롬프트/캐시 키용"""
+    return f"{int(age) // 10 * 10}대"
+
+
+class HealthRule:
+    """
+    단일 규칙
+    - label: 선별(screening) 결과에 표시할 짧은 이름
+    - condition: 필드 조회 함수를 받아 bool (또는 bool 배열) 을 반환
+    - message: str.format 템플릿 (필드명 자리표시자)
+    """
+
+    def __init__(self, label, condition, message):
+        self.label = label
+        self.condition = condition
+        self.message = message
+
+
+class RuleCategory:
+    """
+    분석 항목 - checks 는 규칙 묶음 목록이며 묶음 안에서는 처음 맞는 규칙 하나만 적용 (if / elif)
+    - 여러 묶음에서 나온 문구는 joiner 로 이어 prefix 뒤에 붙임
+    """
+
+    def __init__(self, name, checks, prefix="", joiner=", "):
+        self.name = name
+        self.checks = tuple(tuple(check) for check in checks)
+        self.prefix = prefix
+        self.joiner = joiner
+        # 문구 템플릿에 쓰이는 필드
+        self.fields = {
+            name
+            for check in self.checks for rule in check
+            for _, name, _, _ in string.Formatter().parse(rule.message) if name
+        }
+
+
+_BODYFAT_MESSAGE = "체지방률 {per_bodyfat}%로 높아 근력 증진과 체지방 감소가 필요합니다."
+
+RULES = (
+    RuleCategory('혈압', [[
+        HealthRule('고혈압', lambda v: (v('sbp') >= 140) | (v('dbp') >= 90),
+                   "수축기 혈압 {sbp}mmHg, 이완기 혈압 {dbp}mmHg로 고혈압 범위에 해당하여 혈압 조절이 필요합니다."),
+        HealthRule('고혈압 전단계', lambda v: (v('sbp') >= 130) | (v('dbp') >= 80),
+                   "수축기 혈압 {sbp}mmHg, 이완기 혈압 {dbp}mmHg로 고혈압 전단계로 혈압 관리가 권장됩니다."),
+    ]]),
+    RuleCategory('간건강', [[
+        HealthRule('간수치 초과', lambda v: (v('gpt') > 40) | (v('got') > 40),
+                   "ALT {gpt}U/L, AST {got}U/L로 정상 범위를 초과하여 간 기능 개선이 필요합니다."),
+        HealthRule('간수치 경계', lambda v: (v('gpt') > 30) | (v('got') > 30),
+                   "ALT {gpt}U/L, AST {got}U/L로 정상 상한에 근접하여 간 건강 관리가 권장됩니다."),
+    ]]),
+    RuleCategory('혈중지질', [
+        [
+            HealthRule('총콜레스테롤 고위험', lambda v: v('tc') >= 240, "총 콜레스테롤 {tc}mg/dL (고위험)"),
+            HealthRule('총콜레스테롤 경계', lambda v: v('tc') >= 200, "총 콜레스테롤 {tc}mg/dL (경계)"),
+        ],
+        [
+            HealthRule('LDL 고위험', lambda v: v('ldl') >= 160, "LDL 콜레스테롤 {ldl}mg/dL (고위험)"),
+            HealthRule('LDL 경계', lambda v: v('ldl') >= 130, "LDL 콜레스테롤 {ldl}mg/dL (경계)"),
+        ],
+        [
+            HealthRule('HDL 낮음', lambda v: ((v('sex') == 1) & (v('hdl') < 40)) | ((v('sex') == 2) & (v('hdl') < 50)),
+                       "HDL 콜레스테롤 {hdl}mg/dL (낮음)"),
+        ],
+        [
+            HealthRule('중성지방 높음', lambda v: v('tg') >= 200, "중성지방 {tg}mg/dL (높음)"),
+            HealthRule('중성지방 경계', lambda v: v('tg') >= 150, "중성지방 {tg}mg/dL (경계)"),
+        ],
+    ], prefix="혈중 지질 개선이 필요합니다: ", joiner=", "),
+    RuleCategory('혈당', [[
+        HealthRule('당뇨병', lambda v: v('glu') >= 126, "공복혈당 {glu}mg/dL로 당뇨병 범위에 해당하여 혈당 조절이 시급합니다."),
+        HealthRule('당뇨병 전단계', lambda v: v('glu') >= 100, "공복혈당 {glu}mg/dL로 당뇨병 전단계로 혈당 관리가 필요합니다."),
+    ]]),
+    RuleCategory('체중', [[
+        HealthRule('비만', lambda v: v('he_bmi') >= 30, "BMI {he_bmi}로 비만 상태로 체지방 감소가 필요합니다."),
+        HealthRule('과체중', lambda v: v('he_bmi') >= 25, "BMI {he_bmi}로 과체중 상태로 체중 관리가 권장됩니다."),
+        HealthRule('저체중', lambda v: v('he_bmi') < 18.5, "BMI {he_bmi}로 저체중 상태로 영양 균형과 근력 증진이 필요합니다."),
+    ]]),
+    RuleCategory('근육', [[
+        HealthRule('체지방률 높음(남)', lambda v: (v('per_bodyfat') > 25) & (v('sex') == 1), _BODYFAT_MESSAGE),
+        HealthRule('체지방률 높음(여)', lambda v: (v('per_bodyfat') > 30) & (v('sex') == 2), _BODYFAT_MESSAGE),
+    ]]),
+    RuleCategory('생활습관', [
+        [HealthRule('흡연', lambda v: v('smok_dur') > 0, "{smok_dur}년간의 흡연으로 항산화 및 혈행 개선이 중요합니다")],
+        [HealthRule('수면 부족', lambda v: v('sleep_time') < 7, "수면시간 {sleep_time}시간으로 부족하여 수면 건강 관리가 필요합니다")],
+    ], joiner=". "),
+)
+
+
+class HealthRuleEngine:
+    """규칙 테이블 평가기 - 단건은 분석 문구 dict, DataFrame 은 회원별 항목 선별 결과"""
+
+    def __init__(self, rules=RULES, defaults=None):
+        self.rules = tuple(rules)
+        self.defaults = dict(FIELD_DEFAULTS if defaults is None else defaults)
+        self.categories = tuple(category.name for category in self.rules)
+
+    def _default(self, name):
+        return self.defaults.get(name, 0)
+
+    # --------------------------
+    # 단건
+    # --------------------------
+    def _single_getter(self, user_data):
+        return lambda name: user_data.get(name, self._default(name))
+
+    def matched_rules(self, user_data):
+        """[(항목, [걸린 규칙, ...])] - 걸린 규칙이 없는 항목은 제외"""
+        get = self._single_getter(user_data)
+        matched = []
+        for category in self.rules:
+            hits = [next((rule for rule in check if rule.condition(get)), None) for check in category.checks]
+            hits = [rule for rule in hits if rule is not None]
+            if hits:
+                matched.append((category, hits))
+        return matched
+
+    def flags(self, user_data):
+        """{항목: [걸린 규칙 label, ...]} - 측정값 없이 구간만 (개인화 설명 프롬프트/캐시 키용)"""
+        return {category.name: [rule.label for rule in hits] for category, hits in self.matched_rules(user_data)}
+
+    def _render(self, category, hits, get):
+        values = {name: get(name) for name in category.fields}
+        return category.prefix + category.joiner.join(rule.message.format(**values) for rule in hits)
+
+    def analyze(self, user_data):
+        """analyze_user_health_data 와 같은 {항목: 분석 문구} dict"""
+        get = self._single_getter(user_data)
+        return {
+            category.name: self._render(category, hits, get)
+            for category, hits in self.matched_rules(user_data)
+        }
+
+    # --------------------------
+    # DataFrame (벡터 연산)
+    # --------------------------
+    def _frame_getter(self, frame):
+        cache = {}
+        n = len(frame)
+
+        def get(name):
+            if name not in cache:
+                # DataFrame 에서는 빈 칸(NaN)도 값이 없는 것으로 보고 기본값 적용
+                if name in frame.columns:
+                    values = pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+                    cache[name] = np.where(np.isnan(values), float(self._default(name)), values)
+                else:
+                    cache[name] = np.full(n, float(self._default(name)))
+            return cache[name]
+
+        return get
+
+    def _levels(self, frame):
+        """{항목: [묶음별 걸린 규칙 번호 배열 (-1 은 해당 없음)]}"""
+        get = self._frame_getter(frame)
+        n = len(frame)
+        levels = {}
+        for category in self.rules:
+            per_check = []
+            for check in category.checks:
+                conditions = [np.broadcast_to(np.asarray(rule.condition(get), dtype=bool), (n,)) for rule in check]
+                per_check.append(np.select(conditions, np.arange(len(check)), default=-1))
+            levels[category.name] = per_check
+        return levels
+
+    def screen(self, frame):
+        """
+        회원별 선별 결과 DataFrame (입력과 같은 index)
+        - 항목 컬럼: 걸린 규칙 label (여러 개면 ', ' 로 연결, 없으면 빈 문자열)
+        - 'flagged': 걸린 항목 목록
+        """
+        levels = self._levels(frame)
+        result = pd.DataFrame(index=frame.index)
+        flags = np.zeros((len(frame), len(self.rules)), dtype=bool)
+        for j, category in enumerate(self.rules):
+            labels = np.full(len(frame), "", dtype=object)
+            for check, level in zip(category.checks, levels[category.name]):
+                names = np.array([""] + [rule.label for rule in check], dtype=object)
+                current = names[level + 1]
+                labels = np.where(
+                    (labels != "") & (current != ""), labels + ", " + current,
+                    np.where(current != "", current, labels)
+                )
+                flags[:, j] |= level >= 0
+            result[category.name] = labels
+        result['flagged'] = [
+            [self.rules[j].name for j in np.flatnonzero(row)] for row in flags
+        ]
+        return result
+
+    def flag_matrix(self, frame):
+        """회원 × 항목 bool DataFrame (모집단 유병률 집계용)"""
+        levels = self._levels(frame)
+        return pd.DataFrame(
+            {name: np.logical_or.reduce([level >= 0 for level in per_check]) for name, per_check in levels.items()},
+            index=frame.index,
+        )
+
+    def analyze_frame(self, frame):
+        """회원별 분석 문구 dict 목록 (걸린 회원의 문구만 렌더링) - 코호트 단위 사전 계산용"""
+        levels = self._levels(frame)
+        # DataFrame 에서는 빈 값(NaN)이나 정수/실수가 섞인 컬럼이 float 로 바뀌어 원래 정수였는지 알 수 없으므로
+        # 정수인 실수는 정수로 되돌려 단건 analyze 에 원래 레코드를 넣은 것과 같은 문구 ("175.0mmHg" 가 아닌 "175mmHg")
+        records = [
+            {
+                name: int(value) if isinstance(value, float) and value.is_integer() else value
+                for name, value in record.items() if not (isinstance(value, float) and np.isnan(value))
+            }
+            for record in frame.to_dict('records')
+        ]
+        results = [{} for _ in records]
+        for category in self.rules:
+            per_check = levels[category.name]
+            for i in np.flatnonzero(np.logical_or.reduce([level >= 0 for level in per_check])):
+                record = records[i]
+                hits = [check[level[i]] for check, level in zip(category.checks, per_check) if level[i] >= 0]
+                results[i][category.name] = self._render(category, hits, self._single_getter(record))
+        return pd.Series(results, index=frame.index, dtype=object)
+
+
+HEALTH_RULE_ENGINE = HealthRuleEngine()
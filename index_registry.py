@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+VitalLOG 지수 모델 레지스트리
+- data/index_models.json 의 계수(β, mean, std, Type 보정, 정규화 범위)를 로드
+- 로드 시점에 지수별 (x - mean) / std * β → 보정 → 100점 환산을 하나의 아핀 변환(가중치 벡터 + 오프셋)으로 컴파일
+- 파일이 바뀌면 재시작 없이 새 버전으로 교체 (hot-swap)
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "index_models.json")
+
+# 원본 입력 컬럼 (배치 ndarray 입력 시 이 순서를 따름)
+INPUT_COLUMNS = (
+    'age', 'sex', 'he_bmi', 'he_wc', 'sbp', 'dbp', 'glu', 'tc', 'ldl', 'hdl', 'tg',
+    'got', 'gpt', 'crea', 'hb', 'smok_dur', 'pack_year', 'drink_amt', 'met', 'sleep_time',
+    'eq5d', 'rfs', 'per_bodyfat', 'weight',
+    'r_arm_muscle', 'l_arm_muscle', 'r_leg_muscle', 'l_leg_muscle', 'asm',
+)
+
+# 체중 대비 % 로 환산되는 파생 변수 (파생 변수명, 원본 kg 필드)
+MUSCLE_PERCENT_FIELDS = (
+    ('r_arm_per', 'r_arm_muscle'),
+    ('l_arm_per', 'l_arm_muscle'),
+    ('r_leg_per', 'r_leg_muscle'),
+    ('l_leg_per', 'l_leg_muscle'),
+    ('wasm', 'asm'),
+)
+
+# 모델 가중치 벡터의 고정 레이아웃 (원본 입력 + 파생 변수)
+FEATURES = INPUT_COLUMNS + tuple(var for var, _ in MUSCLE_PERCENT_FIELDS)
+FEATURE_INDEX = {var: i for i, var in enumerate(FEATURES)}
+
+
+def clip_score(score_100):
+    """소수 첫째 자리 반올림 후 0~100으로 클리핑"""
+    return max(0, min(100, round(score_100, 1)))
+
+
+class CompiledIndexModel:
+    """아핀 변환으로 컴파일된 단일 지수 모델 (score_100 = features · weights + offset)"""
+
+    def __init__(self, spec):
+        self.key = spec['key']
+        self.name = spec['name']
+        self.base = float(spec['base'])
+        self.correction_type = spec['correction'].get('type', '')
+        self.intercept = float(spec['correction']['intercept'])
+        self.slope = float(spec['correction']['slope'])
+        self.min_val, self.max_val = (float(v) for v in spec['bounds'])
+        if self.max_val <= self.min_val:
+            raise ValueError(f"{self.key}: 정규화 범위가 올바르지 않습니다: {spec['bounds']}")
+        self.terms = tuple(
+            (term['var'], float(term['mean']), float(term['std']), float(term['beta']))
+            for term in spec['terms']
+        )
+
+        unknown = [var for var, *_ in self.terms if var not in FEATURE_INDEX]
+        if unknown:
+            raise ValueError(f"{self.key}: 알 수 없는 변수입니다: {', '.join(unknown)}")
+
+        # (x - mean) / std * β → intercept + raw * slope → (corrected - min) / (max - min) * 100
+        scale = self.slope * 100 / (self.max_val - self.min_val)
+        self.weights = np.zeros(len(FEATURES))
+        self.centers = np.zeros(len(FEATURES))
+        raw_offset = self.base
+        for var, mean, std, beta in self.terms:
+            self.weights[FEATURE_INDEX[var]] += beta / std * scale
+            self.centers[FEATURE_INDEX[var]] = mean
+            raw_offset -= mean / std * beta
+        self.offset = (self.intercept + raw_offset * self.slope - self.min_val) * 100 / (self.max_val - self.min_val)
+
+        # 단건 계산용 (변수명, 가중치) / (FEATURES 위치, 가중치) 목록 - 사용되는 변수만
+        self.used = tuple(
+            (var, float(self.weights[FEATURE_INDEX[var]]))
+            for var in FEATURES if self.weights[FEATURE_INDEX[var]] != 0
+        )
+        self.used_index = tuple((FEATURE_INDEX[var], weight) for var, weight in self.used)
+
+    def score_vector(self, features):
+        """FEATURES 순서로 디코딩된 단건 배열의 최종 지수 (0~100)"""
+        score = self.offset
+        for i, weight in self.used_index:
+            score += features[i] * weight
+        return clip_score(float(score))
+
+
+class IndexModelSet:
+    """한 버전의 모델 묶음 (불변) - 배치용 가중치 행렬을 함께 보관"""
+
+    def __init__(self, spec, source=None):
+        self.version = str(spec['version'])
+        self.description = spec.get('description', '')
+        self.source = source
+        self.models = {}
+        for model_spec in spec['models']:
+            model = CompiledIndexModel(model_spec)
+            self.models[model.key] = model
+        self.keys = tuple(self.models)
+        self.names = tuple(model.name for model in self.models.values())
+        self.weights = np.column_stack([model.weights for model in self.models.values()])
+        self.offsets = np.array([model.offset for model in self.models.values()])
+
+    def __getitem__(self, key):
+        return self.models[key]
+
+
+class ModelRegistry:
+    """모델 파일을 감시하며 변경 시 새 버전으로 교체하는 레지스트리 (스레드 안전)"""
+
+    def __init__(self, path=None, check_interval=1.0):
+        self.path = path or os.getenv('VITALLOG_MODEL_PATH', DEFAULT_MODEL_PATH)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._models = None
+        self._mtime = None
+        self._failed_mtime = None
+        self._checked_at = 0.0
+        self.load(self.path)
+
+    def load(self, path):
+        """모델 파일을 읽어 컴파일한 뒤 교체 (실패 시 기존 버전 유지)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+        models = IndexModelSet(spec, source=path)
+        with self._lock:
+            self.path = path
+            self._models = models
+            self._mtime = os.path.getmtime(path)
+            self._checked_at = time.monotonic()
+        return models
+
+    def load_spec(self, spec):
+        """dict 형태의 모델 정의(예: DB 테이블에서 읽은 값)로 교체"""
+        models = IndexModelSet(spec)
+        with self._lock:
+            self._models = models
+            self._mtime = None
+        return models
+
+    def current(self):
+        """현재 모델 묶음 반환 - check_interval 마다 파일 변경 여부 확인"""
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = self._mtime
+            if mtime not in (self._mtime, self._failed_mtime):
+                try:
+                    self.load(self.path)
+                except (OSError, ValueError, KeyError):
+                    # 잘못된 파일이 배포되어도 기존 버전으로 계속 계산
+                    self._failed_mtime = mtime
+        return self._models
+
+    @property
+    def version(self):
+        return self.current().version
+
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_registry():
+    """프로세스 전역 레지스트리"""
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                _REGISTRY = ModelRegistry()
+    return _REGISTRY
+
+
+def current_models():
+    return get_registry().current()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DB 내 지수 계산용 SQL 생성기
+- index_registry 에서 컴파일된 가중치/오프셋과 record_schema 의 기본값·검증 규칙으로
+  OXI / MET / MUS 를 계산하는 SQL 식, SELECT 문, VIEW 를 생성
+- 수백만 건이 저장된 검진 테이블을 Python 으로 가져오지 않고 한 번의 집합 연산으로 계산
+- 결과는 calculate_three_indices_batch(errors='coerce') 와 부동소수점 오차 범위 내에서 일치
+  (Postgres ROUND 는 0.5 를 0 에서 먼 쪽으로 반올림하므로 경계값에서 0.1 차이가 날 수 있음)
+- 기본은 PostgreSQL 문법 (LATERAL, ::float8), dialect 가 다른 DB (sqlite 등) 면 CAST / 중첩 서브쿼리로 생성
+
+사용 예:
+    python index_sql.py --table inp_ehr --key-columns user_id --view vitallog_scores > scores_view.sql
+"""
+
+import argparse
+import string
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from calculate import calculate_three_indices_batch
+from index_registry import FEATURES, MUSCLE_PERCENT_FIELDS, current_models
+from record_schema import RECORD_SCHEMA
+
+DEFAULT_VIEW_NAME = "vitallog_scores"
+
+
+def quote_ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class IndexSQLBuilder:
+    """현재 모델 버전 기준으로 SQL 을 생성 (테이블에 없는 컬럼은 NULL 로 취급)"""
+
+    def __init__(self, table, available_columns=None, column_map=None, models=None, dialect='postgresql'):
+        self.table = table
+        self.available_columns = set(available_columns) if available_columns is not None else None
+        self.column_map = dict(column_map or {})
+        self.models = models or current_models()
+        self.dialect = dialect
+
+    @property
+    def postgres(self):
+        return self.dialect == 'postgresql'
+
+    def _float(self, expr):
+        return f"{expr}::float8" if self.postgres else f"CAST({expr} AS REAL)"
+
+    def _literal(self, value):
+        return self._float(repr(float(value))) if self.postgres else repr(float(value))
+
+    def column(self, name):
+        """입력 필드 → 원본 테이블 컬럼 참조 (없으면 NULL)"""
+        column = self.column_map.get(name, name)
+        if self.available_columns is not None and column not in self.available_columns:
+            return self._float("NULL") if self.postgres else "NULL"
+        return self._float(f"t.{quote_ident(column)}")
+
+    def input_expressions(self):
+        """입력 필드별 (기본값이 적용된) SQL 식"""
+        expressions = {}
+        for spec in RECORD_SCHEMA.fields:
+            expr = self.column(spec.name)
+            if spec.default is not None:
+                if callable(spec.default):
+                    placeholders = {
+                        name: self.column(name)
+                        for _, name, _, _ in string.Formatter().parse(spec.sql_default) if name
+                    }
+                    default_expr = spec.sql_default.format(**placeholders)
+                else:
+                    default_expr = self._literal(spec.default)
+                expr = f"COALESCE({expr}, {default_expr})"
+            expressions[spec.name] = expr
+        return expressions
+
+    def validity_expression(self):
+        """record_schema 허용 범위 검사식 (NULL 이거나 범위를 벗어나면 FALSE)"""
+        checks = [
+            f"d.{quote_ident(spec.name)} BETWEEN {self._literal(spec.min_val)} AND {self._literal(spec.max_val)}"
+            for spec in RECORD_SCHEMA.fields
+        ]
+        return "COALESCE(" + "\n        AND ".join(checks) + ", FALSE)"
+
+    def score_expression(self, key, validate=True):
+        """단일 지수 SQL 식 - offset + Σ weight * feature 후 반올림·클리핑"""
+        model = self.models[key]
+        terms = [self._literal(model.offset)]
+        for i, weight in model.used_index:
+            terms.append(f"{self._literal(weight)} * f.{quote_ident(FEATURES[i])}")
+        affine = " + ".join(terms)
+        if self.postgres:
+            score = f"GREATEST(0, LEAST(100, ROUND(({affine})::numeric, 1)))"
+        else:
+            score = f"MAX(0, MIN(100, ROUND({affine}, 1)))"
+        if validate:
+            score = f"CASE WHEN f._valid THEN {score} END"
+        return score
+
+    def select_sql(self, key_columns=None, validate=True):
+        """원본 테이블에 세 지수 컬럼을 붙인 SELECT 문"""
+        inputs = self.input_expressions()
+        input_select = ",\n        ".join(f"{expr} AS {quote_ident(name)}" for name, expr in inputs.items())
+        derived_select = ",\n        ".join(
+            f"(i.{quote_ident(source)} / NULLIF(i.{quote_ident('weight')}, 0)) * 100 AS {quote_ident(var)}"
+            for var, source in MUSCLE_PERCENT_FIELDS
+        )
+        scores = ",\n    ".join(
+            f"{self.score_expression(key, validate)} AS {quote_ident(model.name)}"
+            for key, model in self.models.models.items()
+        )
+        if not self.postgres:
+            return self._nested_select_sql(key_columns, input_select, derived_select, scores)
+        if key_columns:
+            selected = ", ".join(f"t.{quote_ident(col)}" for col in key_columns)
+        else:
+            selected = "t.*"
+        return f"""SELECT
+    {selected},
+    {scores}
+FROM {self.table} t
+CROSS JOIN LATERAL (
+    SELECT
+        {input_select}
+) i
+CROSS JOIN LATERAL (
+    SELECT i.*,
+        {derived_select}
+) d
+CROSS JOIN LATERAL (
+    SELECT d.*,
+        {self.validity_expression()} AS _valid
+) f"""
+
+    def _nested_select_sql(self, key_columns, input_select, derived_select, scores):
+        """LATERAL 이 없는 DB 용 - 같은 단계를 중첩 서브쿼리로 (원본 컬럼은 입력 필드와 이름이 겹치지 않게 별칭으로 전달)"""
+        if key_columns is None:
+            if self.available_columns is None:
+                raise ValueError("PostgreSQL 이 아닌 DB 에서는 key_columns 또는 available_columns 가 필요합니다.")
+            key_columns = sorted(self.available_columns)
+        aliases = [quote_ident(f"_key_{i}") for i in range(len(key_columns))]
+        keys = ",\n        ".join(f"t.{quote_ident(col)} AS {alias}" for col, alias in zip(key_columns, aliases))
+        selected = ", ".join(f"f.{alias} AS {quote_ident(col)}" for col, alias in zip(key_columns, aliases))
+        return f"""SELECT
+    {selected},
+    {scores}
+FROM (
+    SELECT d.*,
+        {self.validity_expression()} AS _valid
+    FROM (
+        SELECT i.*,
+        {derived_select}
+        FROM (
+            SELECT {keys},
+        {input_select}
+            FROM {self.table} t
+        ) i
+    ) d
+) f"""
+
+    def view_sql(self, view_name=DEFAULT_VIEW_NAME, key_columns=None, validate=True):
+        return (
+            f"-- VitalLOG 모델 버전: {self.models.version}\n"
+            f"CREATE OR REPLACE VIEW {quote_ident(view_name)} AS\n"
+            f"{self.select_sql(key_columns, validate)};"
+        )
+
+
+def table_columns(engine, table, schema=None):
+    return [col['name'] for col in inspect(engine).get_columns(table, schema=schema)]
+
+
+def score_table(engine, table, key_columns=None, column_map=None, limit=None, schema=None):
+    """DB 에서 지수를 계산해 DataFrame 으로 반환 (행 데이터를 Python 으로 가져오지 않음)"""
+    table_ref = quote_ident(table) if schema is None else f"{quote_ident(schema)}.{quote_ident(table)}"
+    builder = IndexSQLBuilder(table_ref, table_columns(engine, table, schema), column_map, dialect=engine.dialect.name)
+    query = builder.select_sql(key_columns)
+    if limit:
+        query += f"\nLIMIT {int(limit)}"
+    return pd.read_sql(text(query), con=engine)
+
+
+def verify_against_python(engine, table, sample_size=10000, column_map=None, schema=None):
+    """
+    샘플 행을 DB 와 Python 양쪽에서 계산해 지수별 최대 절대 오차를 반환
+    (반올림 경계값 차이를 고려하면 0.1 이하여야 정상)
+    """
+    table_ref = quote_ident(table) if schema is None else f"{quote_ident(schema)}.{quote_ident(table)}"
+    builder = IndexSQLBuilder(table_ref, table_columns(engine, table, schema), column_map, dialect=engine.dialect.name)
+    scored = pd.read_sql(text(builder.select_sql() + f"\nLIMIT {int(sample_size)}"), con=engine)
+
+    raw = scored.rename(columns={v: k for k, v in (column_map or {}).items()})
+    expected = calculate_three_indices_batch(raw, errors='coerce')
+    differences = {}
+    for name in expected.columns:
+        diff = np.abs(scored[name].astype(float).to_numpy() - expected[name].to_numpy())
+        differences[name] = float(np.nanmax(diff)) if np.isfinite(diff).any() else 0.0
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OXI/MET/MUS 계산 SQL(VIEW) 생성")
+    parser.add_argument('--table', required=True, help="검진 데이터 테이블명")
+    parser.add_argument('--view', default=DEFAULT_VIEW_NAME, help="생성할 VIEW 이름")
+    parser.add_argument('--key-columns', help="결과에 포함할 원본 컬럼 (쉼표 구분, 기본: 전체)")
+    parser.add_argument('--columns', help="테이블에 실제로 있는 컬럼 목록 (쉼표 구분, 없는 필드는 기본값 사용)")
+    parser.add_argument('--no-validate', action='store_true', help="허용 범위 검증 없이 계산")
+    args = parser.parse_args(argv)
+
+    split = lambda value: [item.strip() for item in value.split(',') if item.strip()] if value else None
+    builder = IndexSQLBuilder(quote_ident(args.table), split(args.columns))
+    print(builder.view_sql(args.view, split(args.key_columns), validate=not args.no_validate))
+
+
+if __name__ == "__main__":
+    main()
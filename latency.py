@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+최근 지연시간 분위수 추적
+- LLM 호출 지연시간(llm_client), 스케줄러 대기 시간(llm_scheduler), 공급자 순위(llm_router) 에서 함께 사용
+"""
+
+import threading
+from collections import deque
+
+LATENCY_WINDOW = 200    # 분위수 계산에 쓰는 최근 표본 수
+
+
+class LatencyTracker:
+    """최근 성공 호출 지연시간 (p50 / p90)"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def __len__(self):
+        return len(self._samples)
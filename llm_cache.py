@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 응답 캐시 저장소 (SQLite, WAL 모드)
+- 기존 .llm_cache/<키>.json 파일 캐시를 대체: 키 하나를 한 행으로 두고 INSERT ... ON CONFLICT 로 원자적으로 기록
+  (여러 세션/프로세스가 같은 키를 동시에 써도 파일이 깨지지 않음)
+- 항목 수 / 전체 크기 상한을 넘으면 마지막 사용 시각이 오래된 것부터 제거 (LRU)
+- 선택적 TTL, 일정 크기 이상의 설명은 zlib 압축
+- 적중/미적중/제거/만료 횟수 기록
+- 설정 (환경변수)
+    LLM_CACHE_PATH (기본 .llm_cache/llm_cache.sqlite3), LLM_CACHE_MAX_ENTRIES (기본 5000),
+    LLM_CACHE_MAX_MB (기본 200), LLM_CACHE_TTL (초, 기본 0 = 만료 없음),
+    LLM_CACHE_COMPRESS_MIN_BYTES (기본 1024)
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_PATH = os.getenv('LLM_CACHE_PATH', os.path.join(os.getcwd(), '.llm_cache', 'llm_cache.sqlite3'))
+DEFAULT_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+DEFAULT_MAX_BYTES = int(float(os.getenv('LLM_CACHE_MAX_MB', '200')) * 1024 * 1024)
+DEFAULT_TTL = float(os.getenv('LLM_CACHE_TTL', '0'))
+COMPRESS_MIN_BYTES = int(os.getenv('LLM_CACHE_COMPRESS_MIN_BYTES', '1024'))
+# 읽을 때마다 쓰기가 생기지 않도록 마지막 사용 시각은 이 간격(초)보다 오래됐을 때만 갱신
+TOUCH_INTERVAL = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,
+    value       BLOB NOT NULL,
+    compressed  INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    expires_at  REAL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+"""
+
+
+class LLMCacheStore:
+    """키 → 텍스트 캐시 (스레드별 SQLite 커넥션, 프로세스 간 공유 가능)"""
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 ttl=DEFAULT_TTL, compress_min_bytes=COMPRESS_MIN_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compress_min_bytes = compress_min_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'expirations': 0, 'errors': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        with conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _encode(self, content):
+        raw = content.encode('utf-8')
+        if len(raw) >= self.compress_min_bytes:
+            return zlib.compress(raw, 6), 1
+        return raw, 0
+
+    @staticmethod
+    def _decode(value, compressed):
+        raw = zlib.decompress(value) if compressed else value
+        return raw.decode('utf-8')
+
+    def get(self, key):
+        """저장된 텍스트 또는 None (만료된 항목은 삭제)"""
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, compressed, accessed_at, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count('misses')
+                return None
+            value, compressed, accessed_at, expires_at = row
+            now = time.time()
+            if expires_at is not None and expires_at <= now:
+                conn.execute("DELETE FROM entries WHERE key = ? AND expires_at <= ?", (key, now))
+                self._count('expirations')
+                self._count('misses')
+                return None
+            if now - accessed_at >= TOUCH_INTERVAL:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._count('hits')
+            return self._decode(value, compressed)
+        except Exception:
+            self._count('errors')
+            return None
+
+    def put(self, key, content, ttl=None):
+        """원자적으로 기록하고 상한을 넘는 항목 제거"""
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            value, compressed = self._encode(content)
+            now = time.time()
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """
+                    INSERT INTO entries (key, value, compressed, size, created_at, accessed_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = excluded.value, compressed = excluded.compressed, size = excluded.size,
+                        created_at = excluded.created_at, accessed_at = excluded.accessed_at,
+                        expires_at = excluded.expires_at
+                    """,
+                    (key, value, compressed, len(value), now, now, now + ttl if ttl else None),
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._count('writes')
+        except Exception:
+            self._count('errors')
+
+    def _evict(self, conn, now):
+        expired = conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+        if expired:
+            self._count('expirations', expired)
+
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if entries <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            if entries <= self.max_entries and total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            entries -= 1
+            total -= size
+            evicted += 1
+        self._count('evictions', evicted)
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
+
+    def import_json_dir(self, directory):
+        """기존 .llm_cache/<키>.json 파일들을 가져오기 (이미 있는 키는 건너뜀) - 가져온 개수 반환"""
+        imported = 0
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            key = os.path.splitext(os.path.basename(path))[0]
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = json.load(f).get('content')
+            except Exception:
+                continue
+            if not content or self._connection().execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone():
+                continue
+            self.put(key, content)
+            imported += 1
+        return imported
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        try:
+            entries, total = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except Exception:
+            entries, total = None, None
+        return {
+            'path': self.path,
+            'entries': entries,
+            'bytes': total,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            **counters,
+            'hit_rate': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_llm_cache(path=None):
+    """경로별로 하나만 생성되는 캐시 저장소 (처음 만들 때 같은 폴더의 기존 JSON 캐시를 가져옴)"""
+    path = path or DEFAULT_PATH
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                is_new = not os.path.exists(path)
+                store = LLMCacheStore(path)
+                if is_new:
+                    store.import_json_dir(os.path.dirname(path) or '.')
+                _stores[path] = store
+    return store
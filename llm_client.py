@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio 기반 LLM 호출 계층
+- 호출마다 전체 마감 시간(deadline) 안에서 시도별 타임아웃, 지터를 넣은 지수 백오프 재시도
+- 헤징: 첫 요청이 최근 지연시간 p90 안에 끝나지 않으면 같은 요청을 한 번 더 보내 먼저 끝난 응답 사용
+- 이벤트 루프는 전용 백그라운드 스레드 하나에서 돌리고, Streamlit 등 동기 코드는 complete() / stream() 으로 호출
+- stream(): 토큰이 도착하는 대로 내보냄 (첫 토큰 전까지만 재시도, 첫 토큰 대기는 시도별 타임아웃, 전체는 마감 시간으로 제한)
+- 모든 시도는 llm_scheduler 의 요청/토큰 버킷을 통과한 뒤에 보냄 (대기 시간도 마감 시간에 포함, 헤징은 여유가 있을 때만)
+- 설정 (환경변수): LLM_TIMEOUT (전체 마감, 초), LLM_ATTEMPT_TIMEOUT (시도별, 초), LLM_MAX_RETRIES, LLM_HEDGE (true/false)
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import queue
+import random
+import threading
+import time
+
+from latency import LatencyTracker
+from llm_scheduler import PRIORITY_INTERACTIVE, LLMScheduler, request_cost
+from prompt_budget import estimate_tokens
+
+DEFAULT_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '60'))
+DEFAULT_ATTEMPT_TIMEOUT = float(os.getenv('LLM_ATTEMPT_TIMEOUT', '30'))
+DEFAULT_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+DEFAULT_HEDGE = os.getenv('LLM_HEDGE', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+
+BACKOFF_BASE = 0.5      # 첫 재시도 대기 상한 (초)
+BACKOFF_MAX = 8.0       # 재시도 대기 최대값 (초)
+HEDGE_MIN_SAMPLES = 20  # p90 을 믿을 수 있을 만큼 지연시간 표본이 쌓인 뒤에만 헤징
+STREAM_CLOSE_TIMEOUT = 2.0  # 스트리밍 소비 중단 시 스트림 정리를 기다리는 최대 시간 (초)
+
+# 재시도할 HTTP 상태 코드 (타임아웃, 충돌, 요청 한도, 서버 오류)
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """마감 시간 안에 응답을 받지 못함"""
+
+
+class LLMRequest:
+    """
+    캐시 키까지 정해진 LLM 호출 하나
+    - 같은 요청을 한 번에 받을 수도(complete), 스트리밍으로 받을 수도(stream) 있도록 프롬프트 구성과 실행을 분리
+    - error_message: 실패 시 사용자에게 보여줄 문구 앞부분
+    - suffix: LLM 응답 뒤에 붙일 미리 만든 텍스트 (캐시에는 LLM 응답만 저장)
+    - route: 호출 위치 이름 - llm_router 가 이 이름으로 사용할 공급자 목록을 고름
+    """
+
+    def __init__(self, cache_key, model, messages, max_tokens, temperature, error_message, suffix="", route="default"):
+        self.cache_key = cache_key
+        self.model = model
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.error_message = error_message
+        self.suffix = suffix
+        self.route = route
+
+    @property
+    def params(self):
+        return {'model': self.model, 'messages': self.messages, 'max_tokens': self.max_tokens, 'temperature': self.temperature}
+
+
+def is_retryable(exc):
+    """일시적인 오류인지 - 네트워크/타임아웃/요청 한도/5xx"""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, 'status_code', None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return type(exc).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+
+def failed_attempt_usage(exc):
+    """
+    실패한 시도의 토큰 사용량 (예약 정산용)
+    - 공급자가 오류 응답(429, 5xx 등)을 돌려준 요청은 생성하지 않았으므로 0 (예약 전부 반환)
+    - 타임아웃/연결 오류는 서버가 처리했을 수 있으므로 None (예약 유지)
+    """
+    return 0 if getattr(exc, 'status_code', None) is not None else None
+
+
+def stream_usage(chunk):
+    """스트리밍 청크의 실제 사용 토큰 수 (openai: chunk.usage, groq: chunk.x_groq.usage), 없으면 None"""
+    usage = getattr(chunk, 'usage', None) or getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+    return getattr(usage, 'total_tokens', None)
+
+
+async def _close_stream(stream):
+    """SDK 스트림 닫기 (AsyncStream.close() / aclose(), 닫기 실패는 무시)"""
+    close = getattr(stream, 'close', None) or getattr(stream, 'aclose', None)
+    if close is None:
+        return
+    try:
+        result = close()
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception:
+        pass
+
+
+class LLMClient:
+    """
+    마감 시간 / 재시도 / 헤징을 적용하는 chat completion 클라이언트
+    - provider: 'groq' (AsyncGroq) / 'openai' (AsyncOpenAI) - 두 SDK 의 chat.completions 인터페이스가 같음
+    - base_url: 공급자 주소 재정의 (로컬 스텁 서버 등), None 이면 SDK 기본값
+    """
+
+    def __init__(self, api_key, timeout=DEFAULT_TIMEOUT, attempt_timeout=DEFAULT_ATTEMPT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, hedge=DEFAULT_HEDGE, scheduler=None, provider='groq', base_url=None):
+        self.api_key = api_key
+        self.provider = provider
+        self.base_url = base_url
+        self.scheduler = scheduler or LLMScheduler()
+        self.timeout = timeout
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.latency = {}       # 모델별 LatencyTracker
+        self.first_token = {}   # 모델별 스트리밍 첫 토큰 지연시간
+        self.counters = {'calls': 0, 'attempts': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'timeouts': 0, 'failures': 0, 'streams': 0, 'hedges_skipped': 0, 'rate_limited': 0}
+        self._counter_lock = threading.Lock()
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._client = None
+
+    # --------------------------
+    # 이벤트 루프 / SDK 클라이언트
+    # --------------------------
+    def _ensure_loop(self):
+        if self._loop is None:
+            with self._loop_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True)
+                    thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def _async_client(self):
+        # 루프 스레드 안에서만 생성/사용 (httpx AsyncClient 는 루프에 묶임), 재시도는 이 계층에서 처리
+        if self._client is None:
+            if self.provider == 'openai':
+                from openai import AsyncOpenAI as client_cls
+            else:
+                from groq import AsyncGroq as client_cls
+            self._client = client_cls(api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.attempt_timeout)
+        return self._client
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    # --------------------------
+    # 호출
+    # --------------------------
+    async def _request(self, model, messages, max_tokens, temperature):
+        """(응답 본문, 실제 사용 토큰 수 또는 None)"""
+        self._count('attempts')
+        started = time.monotonic()
+        completion = await self._async_client().chat.completions.create(
+            model=model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+        )
+        self.latency.setdefault(model, LatencyTracker()).add(time.monotonic() - started)
+        usage = getattr(completion, 'usage', None)
+        return completion.choices[0].message.content.strip(), getattr(usage, 'total_tokens', None)
+
+    async def _admit(self, cost, priority, deadline, timeout):
+        """스케줄러 입장 대기 (마감 시간 안에서만)"""
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            await asyncio.wait_for(self.scheduler.acquire(cost, priority), remaining)
+        except asyncio.TimeoutError:
+            self._count('timeouts')
+            self._count('failures')
+            raise LLMDeadlineExceeded(f"LLM 요청 대기 중 마감 시간({timeout or self.timeout:.0f}초) 초과") from None
+
+    def _on_error(self, exc):
+        """요청 한도 초과(429) 면 Retry-After 만큼(없으면 백오프 상한) 스케줄러 입장 중지"""
+        if getattr(exc, 'status_code', None) != 429:
+            return
+        self._count('rate_limited')
+        headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+        try:
+            retry_after = float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            retry_after = BACKOFF_MAX
+        self.scheduler.pause(retry_after)
+
+    async def _hedged(self, make_request, hedge_after, hedge_cost):
+        """
+        첫 요청이 hedge_after 초 안에 끝나지 않으면 (스케줄러에 여유가 있을 때) 두 번째 요청을 보내 먼저 성공한 결과 사용
+        - 헤징 요청의 토큰 예약은 끝날 때 정산 (응답을 받았으면 실제 사용량, 실패/취소되면 전부 반환)
+        """
+        tasks = [asyncio.ensure_future(make_request())]
+        hedged = False
+        try:
+            if hedge_after is None:
+                return await tasks[0]
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if done:
+                return tasks[0].result()
+            if not self.scheduler.try_acquire(hedge_cost):
+                # 한도에 가까우면 헤징으로 부하를 늘리지 않음
+                self._count('hedges_skipped')
+                return await tasks[0]
+
+            self._count('hedges')
+            hedged = True
+            tasks.append(asyncio.ensure_future(make_request()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self._count('hedge_wins')
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            if hedged:
+                hedge = tasks[1]
+                finished = hedge.done() and not hedge.cancelled() and hedge.exception() is None
+                self.scheduler.settle(hedge_cost, hedge.result()[1] if finished else 0)
+            # 마감 시간 초과로 취소되거나 한쪽이 먼저 끝나면 남은 요청 취소
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def acomplete(self, model, messages, max_tokens, temperature, timeout=None, priority=PRIORITY_INTERACTIVE):
+        """마감 시간 안에서 (스케줄러 입장 → 재시도/헤징) 응답 본문 반환 (실패 시 마지막 예외 전달)"""
+        self._count('calls')
+        deadline = time.monotonic() + (timeout or self.timeout)
+        tracker = self.latency.setdefault(model, LatencyTracker())
+        cost = request_cost(messages, max_tokens)
+
+        async def make_request():
+            return await self._request(model, messages, max_tokens, temperature)
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count('timeouts')
+                raise LLMDeadlineExceeded(f"LLM 응답 마감 시간({timeout or self.timeout:.0f}초) 초과")
+            await self._admit(cost, priority, deadline, timeout)
+            remaining = deadline - time.monotonic()
+            hedge_after = tracker.quantile(0.9) if self.hedge and len(tracker) >= HEDGE_MIN_SAMPLES else None
+            try:
+                content, used = await asyncio.wait_for(self._hedged(make_request, hedge_after, cost), max(0.0, min(remaining, self.attempt_timeout)))
+                self.scheduler.settle(cost, used)
+                return content
+            except Exception as exc:
+                self._on_error(exc)
+                self.scheduler.settle(cost, failed_attempt_usage(exc))
+                if isinstance(exc, asyncio.TimeoutError):
+                    self._count('timeouts')
+                if attempt >= self.max_retries or not is_retryable(exc):
+                    self._count('failures')
+                    raise
+            attempt += 1
+            self._count('retries')
+            # full jitter 백오프 (마감 시간을 넘기지 않도록)
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            await asyncio.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+
+    def complete(self, model, messages, max_tokens, temperature, timeout=None, priority=PRIORITY_INTERACTIVE):
+        """동기 코드용 - 백그라운드 루프에서 acomplete 실행"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.acomplete(model, messages, max_tokens, temperature, timeout, priority), self._ensure_loop()
+        )
+        return future.result()
+
+    async def astream(self, model, messages, max_tokens, temperature, timeout=None, priority=PRIORITY_INTERACTIVE):
+        """토큰(문자열 조각)을 도착 순서대로 내보내는 async generator - 첫 토큰을 받은 뒤에는 재시도하지 않음"""
+        self._count('streams')
+        deadline = time.monotonic() + (timeout or self.timeout)
+        cost = request_cost(messages, max_tokens)
+        prompt_cost = cost - max_tokens
+        attempt = 0
+        while True:
+            received = False
+            stream = None
+            parts, used = [], None
+            await self._admit(cost, priority, deadline, timeout)
+            try:
+                self._count('attempts')
+                started = time.monotonic()
+                budget = min(deadline - started, self.attempt_timeout)
+                if budget <= 0:
+                    raise LLMDeadlineExceeded(f"LLM 응답 마감 시간({timeout or self.timeout:.0f}초) 초과")
+                stream = await asyncio.wait_for(self._async_client().chat.completions.create(
+                    model=model, messages=messages, max_tokens=max_tokens, temperature=temperature, stream=True,
+                ), budget)
+                chunks = stream.__aiter__()
+                while True:
+                    # 첫 토큰은 시도별 타임아웃, 이후 토큰은 전체 마감 시간 안에서 대기
+                    remaining = deadline - time.monotonic()
+                    wait = remaining if received else min(remaining, self.attempt_timeout - (time.monotonic() - started))
+                    if wait <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), wait)
+                    except StopAsyncIteration:
+                        self.latency.setdefault(model, LatencyTracker()).add(time.monotonic() - started)
+                        return
+                    used = stream_usage(chunk) or used
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if not received:
+                            received = True
+                            self.first_token.setdefault(model, LatencyTracker()).add(time.monotonic() - started)
+                        parts.append(delta)
+                        yield delta
+            except Exception as exc:
+                self._on_error(exc)
+                if stream is None:
+                    used = failed_attempt_usage(exc)
+                if isinstance(exc, asyncio.TimeoutError):
+                    self._count('timeouts')
+                if received or attempt >= self.max_retries or not is_retryable(exc):
+                    self._count('failures')
+                    raise
+            finally:
+                # 타임아웃, 취소, 소비 중단을 포함해 어떻게 끝나든 HTTP 스트림을 닫아 서버 생성과 커넥션을 정리
+                if stream is not None:
+                    await _close_stream(stream)
+                    # 스트림의 usage 가 없으면 (공급자/옵션에 따라 생략) 입력 추정치 + 받은 출력으로 정산
+                    if used is None:
+                        used = prompt_cost + estimate_tokens("".join(parts))
+                self.scheduler.settle(cost, used)
+            attempt += 1
+            self._count('retries')
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            await asyncio.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+
+    def stream(self, model, messages, max_tokens, temperature, timeout=None, priority=PRIORITY_INTERACTIVE):
+        """동기 코드용 스트리밍 - 백그라운드 루프에서 받은 토큰을 큐로 넘겨 받는 generator"""
+        tokens = queue.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for delta in self.astream(model, messages, max_tokens, temperature, timeout, priority):
+                    tokens.put(delta)
+                tokens.put(done)
+            except Exception as exc:
+                tokens.put(exc)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self._ensure_loop())
+        try:
+            while True:
+                item = tokens.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 소비하는 쪽이 중간에 멈추면 생산 코루틴을 취소하고 (astream 이 HTTP 스트림을 닫을 때까지) 잠시 대기
+            if not future.done():
+                future.cancel()
+                concurrent.futures.wait([future], timeout=STREAM_CLOSE_TIMEOUT)
+
+    def stats(self):
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats['latency'] = {
+            model: {'samples': len(tracker), 'p50': tracker.quantile(0.5), 'p90': tracker.quantile(0.9)}
+            for model, tracker in self.latency.items()
+        }
+        stats['first_token'] = {
+            model: {'samples': len(tracker), 'p50': tracker.quantile(0.5), 'p90': tracker.quantile(0.9)}
+            for model, tracker in self.first_token.items()
+        }
+        stats['scheduler'] = self.scheduler.stats()
+        return stats
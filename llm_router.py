@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+지연시간 기반 LLM 공급자 라우팅
+- 공급자(groq / openai 호환)마다 LLMClient (재시도/헤징/스케줄러 포함) 를 하나씩 두고,
+  호출마다 최근 지연시간(p50)과 오류율로 순위를 매겨 가장 좋은 공급자부터 시도
+- 실패하면 다음 공급자로 넘김 (마지막 후보가 아니면 남은 마감 시간의 일부만 사용해 넘길 시간을 남김),
+  스트리밍은 첫 토큰 전까지만 넘김
+- 오류율이 기준을 넘은 공급자는 일정 시간 동안 후순위 (다른 공급자가 모두 실패할 때만 사용)
+  (로컬 대기열 초과나 라우터 전체 마감 시간 초과는 오류율에 넣지 않음)
+- 일부 요청(탐색 비율)은 임의의 공급자로 보내 지연시간 통계를 최신으로 유지
+- 호출 위치(route)별로 사용할 공급자 목록을 설정 - LLMClient 와 같은 complete() / stream() / stats() 인터페이스
+- 설정 (Streamlit secrets → 환경변수)
+    LLM_PROVIDERS: 공급자 목록 JSON - 예)
+        [{"name": "groq", "kind": "groq"},
+         {"name": "openai", "kind": "openai", "api_key_env": "OPENAI_API_KEY",
+          "models": {"llama-3.3-70b-versatile": "gpt-4o-mini"}},
+         {"name": "stub", "kind": "openai", "api_key": "stub", "base_url": "http://127.0.0.1:8001/v1"}]
+      항목: name, kind (groq/openai), api_key 또는 api_key_env, base_url, models (논리 모델명 → 공급자 모델명), rpm, tpm
+      없으면 groq 하나 + OPENAI_API_KEY 가 있으면 openai (모델 OPENAI_MODEL, 기본 gpt-4o-mini)
+    LLM_ROUTES: 호출 위치별 공급자 이름 목록 JSON - 예) {"explanation": ["groq", "openai"], "fragments": ["openai"]}
+      없는 호출 위치는 "default" 항목, 그것도 없으면 전체 공급자 (설정 순서)
+    LLM_ROUTER_MAX_ERROR_RATE (기본 0.5), LLM_ROUTER_COOLDOWN (초, 기본 30),
+    LLM_ROUTER_EXPLORE (기본 0.05), LLM_FAILOVER_SHARE (기본 0.6)
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from latency import LatencyTracker
+from llm_client import DEFAULT_TIMEOUT, LLMClient
+from llm_scheduler import DEFAULT_RPM, DEFAULT_TPM, PRIORITY_INTERACTIVE, LLMQueueFull, LLMScheduler
+
+MAX_ERROR_RATE = float(os.getenv('LLM_ROUTER_MAX_ERROR_RATE', '0.5'))
+COOLDOWN = float(os.getenv('LLM_ROUTER_COOLDOWN', '30'))
+EXPLORE_RATE = float(os.getenv('LLM_ROUTER_EXPLORE', '0.05'))
+FAILOVER_SHARE = float(os.getenv('LLM_FAILOVER_SHARE', '0.6'))
+MIN_SAMPLES = 5         # 지연시간/오류율로 순위를 매기기 전 최소 호출 수
+OUTCOME_WINDOW = 50     # 오류율 계산에 쓰는 최근 호출 수
+DEFAULT_OPENAI_MODEL = "gpt-4o-mini"
+
+
+def is_provider_error(exc, deadline):
+    """
+    공급자 상태(오류율)에 반영할 실패인지
+    - 로컬 대기열 초과(LLMQueueFull) 와 라우터 전체 마감 시간이 끝나서 난 시간 초과는 공급자 잘못이 아니므로
+      기록하지 않고 다음 공급자로만 넘김
+    - 마감 전에 난 시간 초과 (시도별 타임아웃, 장애 전환용으로 나눠 준 몫 초과) 는 응답이 느린 공급자의 실패로 기록
+    """
+    if isinstance(exc, LLMQueueFull):
+        return False
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+        return time.monotonic() < deadline
+    return True
+
+
+class Provider:
+    """공급자 하나 - LLMClient, 모델명 매핑, 최근 지연시간/성공 여부"""
+
+    def __init__(self, name, client, models=None):
+        self.name = name
+        self.client = client
+        self.models = dict(models or {})
+        self.latency = LatencyTracker()
+        self.outcomes = deque(maxlen=OUTCOME_WINDOW)
+        self.degraded_until = 0.0
+        self._lock = threading.Lock()
+
+    def model_for(self, model):
+        return self.models.get(model, model)
+
+    def record(self, ok, seconds=None):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok and seconds is not None:
+                self.latency.add(seconds)
+            if len(self.outcomes) >= MIN_SAMPLES and self.error_rate() > MAX_ERROR_RATE:
+                self.degraded_until = time.monotonic() + COOLDOWN
+                # 쿨다운이 끝나면 새 표본으로 다시 판단
+                self.outcomes.clear()
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def degraded(self):
+        return time.monotonic() < self.degraded_until
+
+    def score(self):
+        """낮을수록 좋음 - 표본이 부족하면 None"""
+        if len(self.latency) < MIN_SAMPLES:
+            return None
+        return self.latency.quantile(0.5) * (1.0 + 2.0 * self.error_rate())
+
+    def stats(self):
+        return {
+            'samples': len(self.latency),
+            'p50': self.latency.quantile(0.5),
+            'p90': self.latency.quantile(0.9),
+            'error_rate': round(self.error_rate(), 4),
+            'degraded': self.degraded,
+            'score': self.score(),
+        }
+
+
+class LLMRouter:
+    """호출 위치별 공급자 목록에서 지연시간/오류율 순으로 시도하고 실패 시 다음 공급자로 넘김"""
+
+    def __init__(self, providers, routes=None, timeout=DEFAULT_TIMEOUT, explore_rate=EXPLORE_RATE, failover_share=FAILOVER_SHARE):
+        if not providers:
+            raise ValueError("LLM 공급자가 하나 이상 필요합니다.")
+        self.providers = {provider.name: provider for provider in providers}
+        self.order = [provider.name for provider in providers]
+        self.routes = {route: [name for name in names if name in self.providers] for route, names in (routes or {}).items()}
+        self.timeout = timeout
+        self.explore_rate = explore_rate
+        self.failover_share = failover_share
+        self.counters = {'calls': 0, 'failovers': 0, 'explorations': 0, 'exhausted': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def candidates(self, route=None):
+        """이번 호출에서 시도할 공급자 순서"""
+        names = self.routes.get(route) or self.routes.get('default') or self.order
+        providers = [self.providers[name] for name in names]
+        healthy = [p for p in providers if not p.degraded]
+        degraded = [p for p in providers if p.degraded]
+
+        if len(healthy) > 1 and random.random() < self.explore_rate:
+            self._count('explorations')
+            # 표본이 부족한 공급자를 먼저 탐색
+            cold = [p for p in healthy if p.score() is None]
+            first = random.choice(cold or healthy)
+            return [first] + [p for p in healthy if p is not first] + degraded
+        if all(p.score() is not None for p in healthy):
+            healthy.sort(key=lambda p: p.score())
+        # 표본이 부족한 공급자가 있으면 설정 순서 유지 (탐색 요청으로 표본을 먼저 쌓음)
+        return healthy + degraded
+
+    def _budget(self, deadline, last):
+        remaining = deadline - time.monotonic()
+        return remaining if last else remaining * self.failover_share
+
+    def complete(self, model, messages, max_tokens, temperature, timeout=None, priority=PRIORITY_INTERACTIVE, route=None):
+        """순위대로 공급자 호출 - 모두 실패하면 마지막 예외 전달"""
+        self._count('calls')
+        deadline = time.monotonic() + (timeout or self.timeout)
+        candidates = self.candidates(route)
+        error = None
+        for index, provider in enumerate(candidates):
+            budget = self._budget(deadline, index == len(candidates) - 1)
+            if budget <= 0:
+                break
+            if index:
+                self._count('failovers')
+            started = time.monotonic()
+            try:
+                content = provider.client.complete(
+                    provider.model_for(model), messages, max_tokens, temperature, timeout=budget, priority=priority,
+                )
+            except Exception as exc:
+                if is_provider_error(exc, deadline):
+                    provider.record(False)
+                error = exc
+                continue
+            provider.record(True, time.monotonic() - started)
+            return content
+        self._count('exhausted')
+        raise error or TimeoutError("LLM 공급자 마감 시간 초과")
+
+    def stream(self, model, messages, max_tokens, temperature, timeout=None, priority=PRIORITY_INTERACTIVE, route=None):
+        """스트리밍 - 첫 토큰 전에 실패하면 다음 공급자로 넘김, 첫 토큰 이후 실패는 그대로 전달"""
+        self._count('calls')
+        deadline = time.monotonic() + (timeout or self.timeout)
+        candidates = self.candidates(route)
+        error = None
+        for index, provider in enumerate(candidates):
+            budget = self._budget(deadline, index == len(candidates) - 1)
+            if budget <= 0:
+                break
+            if index:
+                self._count('failovers')
+            started = time.monotonic()
+            received = False
+            try:
+                for delta in provider.client.stream(
+                    provider.model_for(model), messages, max_tokens, temperature, timeout=budget, priority=priority,
+                ):
+                    received = True
+                    yield delta
+            except Exception as exc:
+                if is_provider_error(exc, deadline):
+                    provider.record(False)
+                if received:
+                    raise
+                error = exc
+                continue
+            provider.record(True, time.monotonic() - started)
+            return
+        self._count('exhausted')
+        raise error or TimeoutError("LLM 공급자 마감 시간 초과")
+
+    def stats(self):
+        """공급자별 LLMClient 통계 합계 (LLMClient.stats() 와 같은 키) + 공급자별 상세 + 라우팅 횟수"""
+        with self._lock:
+            routing = dict(self.counters)
+        providers = {}
+        totals = {}
+        for name, provider in self.providers.items():
+            client_stats = provider.client.stats()
+            providers[name] = {**client_stats, 'routing': provider.stats()}
+            for key, value in client_stats.items():
+                if isinstance(value, (int, float)):
+                    totals[key] = totals.get(key, 0) + value
+        return {**totals, 'routing': routing, 'providers': providers}
+
+
+def _parse_json_setting(value, default):
+    if not value:
+        return default
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def load_provider_configs(groq_api_key):
+    """LLM_PROVIDERS 설정, 없으면 groq (+ OPENAI_API_KEY 가 있으면 openai)"""
+    from connections import get_setting
+
+    configs = _parse_json_setting(get_setting('LLM_PROVIDERS'), None)
+    if configs is None:
+        configs = [{'name': 'groq', 'kind': 'groq', 'base_url': get_setting('GROQ_BASE_URL')}]
+        if get_setting('OPENAI_API_KEY'):
+            configs.append({
+                'name': 'openai', 'kind': 'openai', 'api_key_env': 'OPENAI_API_KEY',
+                'base_url': get_setting('OPENAI_BASE_URL'),
+                'models': {'llama-3.3-70b-versatile': get_setting('OPENAI_MODEL', DEFAULT_OPENAI_MODEL)},
+            })
+
+    resolved = []
+    for config in configs:
+        config = dict(config)
+        config.setdefault('kind', 'groq')
+        if 'api_key' not in config:
+            if config.get('api_key_env'):
+                config['api_key'] = get_setting(config['api_key_env'])
+            elif config['kind'] == 'groq':
+                config['api_key'] = groq_api_key
+        resolved.append(config)
+    return resolved
+
+
+def build_router(groq_api_key):
+    """설정으로 공급자별 LLMClient(각자 스케줄러 포함) 와 라우터 생성"""
+    from connections import get_setting
+
+    providers = []
+    for config in load_provider_configs(groq_api_key):
+        scheduler = LLMScheduler(rpm=float(config.get('rpm', DEFAULT_RPM)), tpm=float(config.get('tpm', DEFAULT_TPM)))
+        client = LLMClient(config.get('api_key'), scheduler=scheduler, provider=config['kind'], base_url=config.get('base_url'))
+        providers.append(Provider(config['name'], client, config.get('models')))
+    routes = _parse_json_setting(get_setting('LLM_ROUTES'), {})
+    return LLMRouter(providers, routes)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 요청 스케줄러 (입장 제어)
+- 요청(분당 요청 수)과 토큰(분당 토큰 수) 두 개의 토큰 버킷으로 공급자 한도 안에서만 요청을 내보냄
+  (한도를 넘겨 429 → 재시도 폭주가 생기는 대신 큐에서 기다렸다가 한도 속도로 꾸준히 처리)
+- 대기열은 우선순위 순 (숫자가 작을수록 먼저): 대화형 요청이 워밍업/배치 작업보다 먼저
+- 대기열 길이 제한 (대기 중인 요청만 셈) - 가득 차면 LLMQueueFull, 배치 요청은 배치끼리 절반까지만 사용해 대화형 요청 자리를 남김
+- 429 응답을 받으면 pause() 로 잠시 전체 입장을 멈춤
+- 토큰 비용은 입력 토큰 추정치 + max_tokens 로 예약하고, 응답의 usage 를 받으면 차이를 되돌림
+- 우선순위별 대기 시간(p50 / p90 / 최대), 입장/거절 수, 현재/최대 대기열 길이 기록
+- 설정 (환경변수): LLM_RPM (기본 30), LLM_TPM (기본 0 = 제한 없음), LLM_MAX_QUEUE (기본 64)
+- LLMClient 의 이벤트 루프 스레드 안에서만 사용 (API 키별 LLMClient 마다 하나)
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from latency import LatencyTracker
+from prompt_budget import MESSAGE_OVERHEAD, estimate_tokens
+
+DEFAULT_RPM = float(os.getenv('LLM_RPM', '30'))
+DEFAULT_TPM = float(os.getenv('LLM_TPM', '0'))
+DEFAULT_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '64'))
+
+PRIORITY_INTERACTIVE = 0   # 채팅 화면 요청
+PRIORITY_BATCH = 10        # 워밍업, 설명 조각 생성 등
+
+
+class LLMQueueFull(RuntimeError):
+    """대기열이 가득 차 요청을 받을 수 없음"""
+
+
+def request_cost(messages, max_tokens):
+    """예약할 토큰 수 - 입력 추정치 + 최대 출력"""
+    return sum(estimate_tokens(m.get('content', '')) for m in messages) + MESSAGE_OVERHEAD * len(messages) + max_tokens
+
+
+class TokenBucket:
+    """분당 한도 per_minute 의 토큰 버킷 (최대 1분치까지 모아 둘 수 있음, 0 이하면 제한 없음)"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self):
+        return self.capacity <= 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount, now):
+        """amount 를 꺼낼 수 있을 때까지 남은 초"""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount, now):
+        if not self.unlimited:
+            self._refill(now)
+            self.tokens -= min(amount, self.capacity)
+
+    def give(self, amount):
+        if not self.unlimited:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        if not self.unlimited:
+            self.tokens = min(self.tokens, 0.0)
+
+
+class LLMScheduler:
+    """우선순위 대기열 + 요청/토큰 버킷"""
+
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_queue=DEFAULT_MAX_QUEUE):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_queue = max_queue
+        self.paused_until = 0.0
+        self._heap = []             # [priority, seq, cost, future]
+        self._seq = itertools.count()
+        self._wake = None
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self.waits = {}             # 우선순위별 대기 시간
+        self.counters = {'admitted': 0, 'queued': 0, 'rejected': 0, 'cancelled': 0, 'pauses': 0, 'max_depth': 0, 'refunded_tokens': 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _wait_for(self, cost, now):
+        return max(self.paused_until - now, self.requests.time_until(1, now), self.tokens.time_until(cost, now))
+
+    def _admit(self, cost, now):
+        self.requests.take(1, now)
+        self.tokens.take(cost, now)
+        self._count('admitted')
+
+    def _pending(self, batch_only=False):
+        """대기 중인 요청 수 - 취소되었거나 입장한 항목은 먼저 대기열에서 제거"""
+        if any(entry[3].done() for entry in self._heap):
+            self._heap = [entry for entry in self._heap if not entry[3].done()]
+            heapq.heapify(self._heap)
+        if batch_only:
+            return sum(1 for entry in self._heap if entry[0] > PRIORITY_INTERACTIVE)
+        return len(self._heap)
+
+    def _record_wait(self, priority, seconds):
+        self.waits.setdefault(priority, LatencyTracker()).add(seconds)
+
+    async def acquire(self, cost, priority=PRIORITY_INTERACTIVE):
+        """한도 안에서 요청을 보낼 수 있을 때까지 대기 - 대기한 초 반환 (취소되면 대기열에서 빠짐)"""
+        now = time.monotonic()
+        if not self._pending() and self._wait_for(cost, now) <= 0:
+            self._admit(cost, now)
+            self._record_wait(priority, 0.0)
+            return 0.0
+
+        # 대화형은 전체 대기열, 배치는 배치 대기 요청만 세어 절반까지 (대화형 요청 자리를 남김)
+        batch = priority > PRIORITY_INTERACTIVE
+        limit = self.max_queue // 2 if batch else self.max_queue
+        depth = self._pending(batch_only=batch)
+        if depth >= limit:
+            self._count('rejected')
+            raise LLMQueueFull(f"LLM 요청 대기열이 가득 찼습니다 ({depth}/{limit})")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, [priority, next(self._seq), cost, future])
+        self._count('queued')
+        depth = self._pending()
+        with self._lock:
+            self.counters['max_depth'] = max(self.counters['max_depth'], depth)
+        self._kick()
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._count('cancelled')
+            self._kick()
+            raise
+        waited = time.monotonic() - now
+        self._record_wait(priority, waited)
+        return waited
+
+    def try_acquire(self, cost):
+        """기다리지 않고 바로 보낼 수 있을 때만 입장 (헤징 요청용 - 대기열에 다른 요청이 있으면 거절)"""
+        now = time.monotonic()
+        if self._pending() or self._wait_for(cost, now) > 0:
+            return False
+        self._admit(cost, now)
+        return True
+
+    def settle(self, reserved, used):
+        """응답의 실제 토큰 사용량을 받으면 예약과의 차이를 되돌림"""
+        if used is not None and used < reserved:
+            self.tokens.give(reserved - used)
+            self._count('refunded_tokens', int(reserved - used))
+            self._kick()
+
+    def pause(self, seconds):
+        """요청 한도 초과(429) 응답 후 잠시 입장 중지"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.requests.drain()
+        self._count('pauses')
+
+    def _kick(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wake = asyncio.Event()
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        else:
+            self._wake.set()
+
+    async def _dispatch(self):
+        """대기열 맨 앞(가장 높은 우선순위, 먼저 온 순) 요청을 한도가 허락하는 시점에 입장"""
+        while self._heap:
+            head = self._heap[0]
+            if head[3].done():
+                heapq.heappop(self._heap)
+                continue
+            now = time.monotonic()
+            wait = self._wait_for(head[2], now)
+            if wait > 0:
+                # 더 높은 우선순위 요청이 들어오거나 토큰이 반환되면 다시 계산
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            self._admit(head[2], now)
+            head[3].set_result(None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['depth'] = sum(1 for entry in self._heap if not entry[3].done())
+        stats['rpm'] = self.requests.capacity
+        stats['tpm'] = self.tokens.capacity
+        stats['queue_wait'] = {
+            priority: {'samples': len(tracker), 'p50': tracker.quantile(0.5), 'p90': tracker.quantile(0.9), 'max': tracker.quantile(1.0)}
+            for priority, tracker in sorted(self.waits.items())
+        }
+        return stats
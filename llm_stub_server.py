@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로컬 LLM 스텁 서버 (OpenAI 호환 chat completions)
+- 라우터/장애 전환을 실제 공급자 없이 시험하기 위한 서버 - 지연시간, 지터, 오류율을 지정
+- /chat/completions 로 끝나는 모든 경로에 응답 (base_url 을 http://127.0.0.1:<port>/v1 또는 /openai/v1 로 지정하면
+  openai / groq SDK 모두 사용 가능)
+- stream=true 이면 SSE 청크, 아니면 JSON 한 번에 (둘 다 usage 포함)
+- 오류는 --error-status (기본 503) 로 응답, 429 이면 Retry-After 헤더 포함
+
+사용 예:
+    python llm_stub_server.py --port 8001 --latency 0.2
+    python llm_stub_server.py --port 8002 --latency 1.5 --jitter 0.5 --error-rate 0.3
+    LLM_PROVIDERS='[{"name": "fast", "kind": "openai", "api_key": "stub", "base_url": "http://127.0.0.1:8001/v1"},
+                    {"name": "slow", "kind": "openai", "api_key": "stub", "base_url": "http://127.0.0.1:8002/v1"}]' streamlit run app.py
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "스텁 서버 응답입니다. 추천 제품은 건강지표 관리에 도움이 될 수 있습니다."
+STREAM_CHUNK_CHARS = 8
+
+
+class StubConfig:
+    def __init__(self, latency=0.2, jitter=0.0, error_rate=0.0, error_status=503, reply=DEFAULT_REPLY):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.reply = reply
+        self.counters = {'requests': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = StubConfig()
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 응답 전에 연결을 끊음 (라우터 마감 시간 초과 등)
+            self.close_connection = True
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/stats'):
+            self._send_json(200, self.config.counters)
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'invalid json'}})
+            return
+
+        config = self.config
+        config.count('requests')
+        time.sleep(config.delay())
+        if random.random() < config.error_rate:
+            config.count('errors')
+            headers = {'Retry-After': '1'} if config.error_status == 429 else None
+            self._send_json(config.error_status, {'error': {'message': 'stub error', 'type': 'server_error'}}, headers)
+            return
+
+        model = request.get('model', 'stub')
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in request.get('messages', [])) // 2
+        reply = config.reply[:max(1, int(request.get('max_tokens') or len(config.reply)))]
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(reply), 'total_tokens': prompt_tokens + len(reply)}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not request.get('stream'):
+            self._send_json(200, {
+                'id': completion_id, 'object': 'chat.completion', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        chunks = [reply[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(reply), STREAM_CHUNK_CHARS)]
+        try:
+            for index, text in enumerate(chunks):
+                last = index == len(chunks) - 1
+                chunk = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': 'stop' if last else None}],
+                }
+                if last:
+                    chunk['usage'] = usage
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 스트림을 중간에 닫음 (소비 중단, 타임아웃)
+            self.close_connection = True
+
+
+def serve(port=8001, config=None, host='127.0.0.1'):
+    """스텁 서버 생성 (serve_forever 는 호출하는 쪽에서 - 테스트에서는 스레드로 실행)"""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config or StubConfig()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 LLM 스텁 서버 (OpenAI 호환)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.2, help="응답 지연 (초)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="지연 ± 범위 (초)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="오류 응답 비율 (0~1)")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--reply', default=DEFAULT_REPLY)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(args.latency, args.jitter, args.error_rate, args.error_status, args.reply)
+    server = serve(args.port, config, args.host)
+    print(f"스텁 서버 http://{args.host}:{args.port}/v1 (지연 {args.latency}±{args.jitter}초, 오류율 {args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+서버 측 Prepared Statement 캐시
+- 제품명/관리영역 목록을 IN ('a','b',...) 로 풀어 쓰면 목록이 바뀔 때마다 SQL 문이 달라져 Postgres 가 계획을 재사용하지 못함
+- 쿼리는 배열 파라미터(= ANY($1)) 로 고정하고, 커넥션별로 한 번만 PREPARE 한 뒤 EXECUTE 로 재사용
+- 커넥션 풀의 DBAPI 커넥션마다 준비된 문장을 기록 (Connection.info) 하고 개수 상한을 넘으면 오래된 것부터 DEALLOCATE
+- PREPARE(파싱/계획) 횟수 대비 재사용 횟수와 서버의 generic / custom plan 통계를 보고
+- PostgreSQL 이 아닌 DB 에서는 같은 쿼리를 일반 바인드 파라미터로 바꿔 pd.read_sql 로 실행 (= ANY($n) 는 IN 목록으로 확장)
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+
+MAX_STATEMENTS_PER_CONNECTION = int(os.getenv('DB_MAX_PREPARED_STATEMENTS', '32'))
+_INFO_KEY = 'prepared_statements'
+# PostgreSQL SQLSTATE
+INVALID_SQL_STATEMENT_NAME = '26000'        # EXECUTE 할 문장이 서버에 없음 (DISCARD ALL 등)
+DUPLICATE_PREPARED_STATEMENT = '42P05'      # 같은 이름의 문장이 서버에 이미 있음
+
+
+def sqlstate(error):
+    """DBAPIError 의 SQLSTATE (psycopg2: pgcode, psycopg 3: sqlstate)"""
+    orig = getattr(error, 'orig', error)
+    return getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+
+
+class PreparedQuery:
+    """
+    이름이 고정된 파라미터 쿼리
+    - sql: $1, $2 ... 위치 파라미터를 쓰는 Postgres 문장
+    - param_types: PREPARE 에 넘길 파라미터 타입 (예: ('text[]',))
+    """
+
+    def __init__(self, name, sql, param_types):
+        self.name = name
+        self.sql = sql
+        self.param_types = tuple(param_types)
+
+    def prepare_sql(self):
+        return f"PREPARE {self.name} ({', '.join(self.param_types)}) AS {self.sql}"
+
+    def execute_sql(self):
+        return f"EXECUTE {self.name} ({', '.join(['%s'] * len(self.param_types))})"
+
+    def portable_statement(self):
+        """PostgreSQL 외 DB 용 - $n 을 :pn 바인드 파라미터로, 배열 파라미터의 = ANY($n) 는 IN (확장 바인드) 로 변환"""
+        expanding = set()
+
+        def any_to_in(match):
+            expanding.add(int(match.group(1)))
+            return f"IN :p{match.group(1)}"
+
+        sql = re.sub(r'=\s*ANY\s*\(\s*\$(\d+)\s*\)', any_to_in, self.sql, flags=re.IGNORECASE)
+        sql = re.sub(r'\$(\d+)', r':p\1', sql)
+        return text(sql).bindparams(*(bindparam(f"p{n}", expanding=True) for n in sorted(expanding)))
+
+
+class StatementCache:
+    """커넥션별 Prepared Statement 관리 및 재사용 통계 (프로세스 전역, 스레드 안전)"""
+
+    def __init__(self, max_statements=MAX_STATEMENTS_PER_CONNECTION):
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self.prepares = 0
+        self.reuses = 0
+        self.deallocations = 0
+        self.fallbacks = 0
+        self.by_statement = {}
+
+    def _record(self, name, prepared):
+        with self._lock:
+            counts = self.by_statement.setdefault(name, {'prepares': 0, 'reuses': 0})
+            if prepared:
+                self.prepares += 1
+                counts['prepares'] += 1
+            else:
+                self.reuses += 1
+                counts['reuses'] += 1
+
+    def _ensure_prepared(self, conn, query):
+        statements = conn.info.setdefault(_INFO_KEY, OrderedDict())
+        if query.name in statements:
+            statements.move_to_end(query.name)
+            self._record(query.name, prepared=False)
+            return
+        while len(statements) >= self.max_statements:
+            oldest, _ = statements.popitem(last=False)
+            conn.exec_driver_sql(f"DEALLOCATE {oldest}")
+            with self._lock:
+                self.deallocations += 1
+        try:
+            conn.exec_driver_sql(query.prepare_sql())
+        except DBAPIError as e:
+            if sqlstate(e) != DUPLICATE_PREPARED_STATEMENT:
+                raise
+            # 기록에는 없지만 서버에 남아 있는 문장 (PREPARE 는 트랜잭션 롤백과 무관) - 지우고 다시 준비
+            conn.rollback()
+            conn.exec_driver_sql(f"DEALLOCATE {query.name}")
+            conn.exec_driver_sql(query.prepare_sql())
+        statements[query.name] = query.sql
+        self._record(query.name, prepared=True)
+
+    def read_frame(self, engine, query, *params):
+        """준비된 문장으로 실행해 DataFrame 반환 (PostgreSQL 이 아니면 일반 바인드 파라미터 쿼리로 실행)"""
+        if engine.dialect.name != 'postgresql':
+            with self._lock:
+                self.fallbacks += 1
+            values = {f"p{i}": list(value) if isinstance(value, (list, tuple, set)) else value
+                      for i, value in enumerate(params, 1)}
+            return pd.read_sql(query.portable_statement(), con=engine, params=values)
+        with engine.connect() as conn:
+            self._ensure_prepared(conn, query)
+            try:
+                result = conn.exec_driver_sql(query.execute_sql(), tuple(params))
+            except DBAPIError as e:
+                # 서버에서 문장이 사라진 경우만 (DISCARD ALL 등) 기록을 지워 다음 실행 때 다시 PREPARE
+                # (다른 오류면 문장은 서버에 그대로 남아 있으므로 기록 유지)
+                if sqlstate(e) == INVALID_SQL_STATEMENT_NAME:
+                    conn.info.get(_INFO_KEY, {}).pop(query.name, None)
+                raise
+            return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    def stats(self):
+        """PREPARE(파싱/계획) 대비 재사용 비율"""
+        with self._lock:
+            executions = self.prepares + self.reuses
+            return {
+                'executions': executions,
+                'prepares': self.prepares,
+                'reuses': self.reuses,
+                'deallocations': self.deallocations,
+                'fallbacks': self.fallbacks,
+                'reuse_rate': round(self.reuses / executions, 4) if executions else 0.0,
+                'by_statement': {name: dict(counts) for name, counts in self.by_statement.items()},
+            }
+
+    @staticmethod
+    def server_plan_stats(engine):
+        """
+        한 커넥션의 pg_prepared_statements (PostgreSQL 14+ 는 generic_plans / custom_plans 포함)
+        - generic_plans 가 늘면 계획까지 재사용되고 있다는 뜻
+        """
+        with engine.connect() as conn:
+            result = conn.exec_driver_sql("SELECT * FROM pg_prepared_statements")
+            return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    def plan_summary(self, engine):
+        """
+        문장별 서버 계획 통계 {이름: {'generic_plans', 'custom_plans'}} (query_cache_stats 용)
+        - PostgreSQL 이 아니면 None, 조회 실패 시 {'error': 메시지}
+        - 풀에서 꺼낸 커넥션 하나 기준 (PostgreSQL 13 이하는 계획 통계 컬럼이 없어 빈 값)
+        """
+        if engine.dialect.name != 'postgresql':
+            return None
+        try:
+            frame = self.server_plan_stats(engine)
+        except SQLAlchemyError as e:
+            return {'error': str(e)}
+        columns = [column for column in ('generic_plans', 'custom_plans') if column in frame.columns]
+        return {
+            row['name']: {column: int(row[column]) for column in columns}
+            for row in frame.to_dict('records')
+        }
+
+
+STATEMENT_CACHE = StatementCache()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+요청 단위 제품 스냅샷
+- 제품정보, 알레르겐 집계, 분류기준(관리 필요 영역 / 건강지표 / 원료)을 한 번의 쿼리로 조회
+- get_product_details / get_product_classification_info 와 같은 형태로 꺼내 쓸 수 있어
+  추천 순위 → 결과 DataFrame → LLM 프롬프트 단계가 같은 스냅샷을 재사용 (요청당 DB 왕복 1회)
+"""
+
+import pandas as pd
+
+from prepared import STATEMENT_CACHE, PreparedQuery
+
+# get_product_details 결과 컬럼 (제품정보 + 알레르겐 + 분류기준 관리 필요 영역)
+DETAIL_COLUMNS = [
+    "식품유형",
+    "제품명",
+    "식약처 인정 기능성",
+    "주요 특징",
+    "섭취 방법",
+    "주의사항",
+    "원재료",
+    "영양성분",
+    "글로벌/로컬 제품구분(제조사)",
+    "알레르겐_정보",
+    "관리 필요 영역",
+]
+
+# 제품명 배열을 파라미터로 받는 고정 SQL - 제품 조합이 달라도 같은 Prepared Statement 재사용
+SNAPSHOT_QUERY = PreparedQuery("product_snapshot", """
+WITH pi AS (
+    SELECT DISTINCT
+        p."식품유형",
+        p."제품명",
+        p."식약처 인정 기능성",
+        p."주요 특징",
+        p."섭취 방법",
+        p."주의사항",
+        p."원재료",
+        p."영양성분",
+        p."글로벌/로컬 제품구분(제조사)",
+        al."알레르겐_정보"
+    FROM "제품정보" p
+    LEFT JOIN (
+        SELECT "제품명", STRING_AGG("카테고리" || ' - ' || "분류" || ' (' || "알레르기 유발물질" || ')', ', ') AS 알레르겐_정보
+        FROM "제품_알레르겐"
+        WHERE "제품명" = ANY($1)
+        GROUP BY "제품명"
+    ) al ON p."제품명" = al."제품명"
+    WHERE p."제품명" = ANY($1)
+),
+cls AS (
+    SELECT
+        "제품명",
+        STRING_AGG(DISTINCT "관리 필요 영역", ', ') AS "관리 필요 영역",
+        ARRAY_AGG(DISTINCT "건강지표") AS _health_indicators,
+        ARRAY_AGG(DISTINCT "관리 필요 영역") AS _management_areas,
+        ARRAY_AGG(DISTINCT "원료") FILTER (WHERE "원료" IS NOT NULL) AS _ingredients
+    FROM "분류기준"
+    WHERE "제품명" = ANY($1)
+    GROUP BY "제품명"
+)
+SELECT
+    pi."식품유형",
+    COALESCE(pi."제품명", cls."제품명") AS "제품명",
+    pi."식약처 인정 기능성",
+    pi."주요 특징",
+    pi."섭취 방법",
+    pi."주의사항",
+    pi."원재료",
+    pi."영양성분",
+    pi."글로벌/로컬 제품구분(제조사)",
+    pi."알레르겐_정보",
+    cls."관리 필요 영역",
+    cls._health_indicators,
+    cls._management_areas,
+    cls._ingredients,
+    pi."제품명" IS NOT NULL AS _has_info,
+    cls."제품명" IS NOT NULL AS _has_classification
+FROM pi
+FULL OUTER JOIN cls ON pi."제품명" = cls."제품명"
+""", param_types=("text[]",))
+
+
+class ProductSnapshot:
+    """한 요청에서 다루는 제품들의 상세 정보와 분류기준 정보"""
+
+    def __init__(self, frame=None, requested=()):
+        self.requested = frozenset(requested)
+        frame = frame if frame is not None else pd.DataFrame(columns=DETAIL_COLUMNS)
+        if frame.empty:
+            self.details = pd.DataFrame()
+        else:
+            self.details = frame.loc[frame['_has_info'].astype(bool), DETAIL_COLUMNS].reset_index(drop=True)
+
+        self.classification = {}
+        if not frame.empty:
+            rows = frame[frame['_has_classification'].astype(bool)]
+            for name, indicators, areas, ingredients in rows[
+                ['제품명', '_health_indicators', '_management_areas', '_ingredients']
+            ].itertuples(index=False):
+                self.classification[name] = {
+                    'health_indicators': set(indicators or ()),
+                    'management_areas': set(areas or ()),
+                    'ingredients': set(ingredients or ()),
+                }
+
+    def covers(self, product_names):
+        """요청한 제품이 모두 이 스냅샷으로 조회된 것인지"""
+        return set(product_names) <= self.requested
+
+    def details_for(self, product_names):
+        """get_product_details 와 같은 DataFrame (요청한 제품만)"""
+        if self.details.empty:
+            return pd.DataFrame()
+        return self.details[self.details['제품명'].isin(product_names)].reset_index(drop=True)
+
+    def classification_for(self, product_names):
+        """get_product_classification_info 와 같은 dict (요청한 제품만)"""
+        return {name: self.classification[name] for name in product_names if name in self.classification}
+
+
+def load_product_snapshot(engine, product_names):
+    """제품 목록의 스냅샷을 한 번의 쿼리로 적재"""
+    product_names = list(dict.fromkeys(product_names))
+    if not product_names:
+        return ProductSnapshot()
+    frame = STATEMENT_CACHE.read_frame(engine, SNAPSHOT_QUERY, product_names)
+    return ProductSnapshot(frame, requested=product_names)
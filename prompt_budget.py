@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+프롬프트 입력 토큰 예산 분석
+- LLMRequest 의 메시지를 구역별로 나눠 입력 토큰 수를 집계 (시스템 메시지 / 사용자 메시지의 각 블록)
+- 같은 조건에서 기존 템플릿(full)과 압축 템플릿(compact)을 비교해 절감량 보고
+- 토큰 수는 tiktoken 이 설치되어 있으면 cl100k_base 기준, 없으면 문자 종류별 근사치 (Llama 3 계열과 비슷한 수준)
+
+사용 예:
+    python prompt_budget.py                       # person_data.json 프로필 × 건강지표 상태로 비교
+    python prompt_budget.py --limit 3 --sections  # 구역별 상세 포함
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+
+# 메시지 하나당 역할/구분 토큰
+MESSAGE_OVERHEAD = 4
+
+# 템플릿별 구역 시작 표시 (표시가 없는 앞부분은 첫 구역에 포함)
+SECTION_MARKERS = {
+    "personalized": [
+        ("사용자 상태", "사용자의 건강 상태 분석:"),
+        ("건강 데이터 분석", "사용자의 실제 건강 데이터 분석:"),
+        ("연관 관리영역", "건강지표별 연관 관리영역:"),
+        ("제품 상세", "추천된 제품들과 상세 정보:"),
+        ("차별점 분석", "기본 제품 vs 보강 제품 차별점 분석:"),
+        ("추천 로직 요약", "추천 로직 개인화 정보:"),
+        ("점수 분석", "제품별 개인 맞춤 점수 분석:"),
+        ("작성 지침", "다음과 같이 사용자 개인 데이터에 기반한"),
+    ],
+    "personalized_compact": [
+        ("사용자 상태", "[사용자]"),
+        ("연관 관리영역", "[건강지표별 연관 관리영역]"),
+        ("제품 상세", "[기본 베이스 제품 (1-3위)]"),
+    ],
+    "personalized_fragments": [
+        ("사용자 상태", "[사용자]"),
+        ("연관 관리영역", "[건강지표별 연관 관리영역]"),
+        ("제품 목록", "[추천 제품"),
+    ],
+}
+
+_HANGUL = re.compile(r'[가-힣ㄱ-ㆎ]')
+_WORD = re.compile(r'[A-Za-z0-9]+')
+_OTHER = re.compile(r'[^\sA-Za-z0-9가-힣ㄱ-ㆎ]')
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+
+def estimate_tokens(text):
+    """텍스트의 입력 토큰 수 (tiktoken 이 없으면 근사치: 한글 1자 ≈ 1토큰, 영숫자 4자 ≈ 1토큰, 기호 1개 ≈ 1토큰)"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    hangul = len(_HANGUL.findall(text))
+    words = sum(math.ceil(len(word) / 4) for word in _WORD.findall(text))
+    other = len(_OTHER.findall(text))
+    newlines = text.count('\n')
+    return hangul + words + other + newlines
+
+
+def split_sections(text, markers):
+    """구역 표시 위치로 나눈 (구역 이름, 텍스트) 목록 - 표시가 없는 구역은 빠짐"""
+    positions = sorted((text.find(marker), name) for name, marker in markers if text.find(marker) >= 0)
+    if not positions:
+        return [("본문", text)]
+    sections = []
+    for index, (start, name) in enumerate(positions):
+        end = positions[index + 1][0] if index + 1 < len(positions) else len(text)
+        sections.append((name, text[0 if index == 0 else start:end]))
+    return sections
+
+
+def analyze_request(request, template):
+    """
+    LLMRequest 의 입력 토큰 예산
+    - 시스템 메시지는 요청 간 동일한 앞부분(stable prefix) 으로 따로 집계
+    """
+    system = next((m['content'] for m in request.messages if m['role'] == 'system'), '')
+    user = next((m['content'] for m in request.messages if m['role'] == 'user'), '')
+    sections = [("시스템 메시지", system)] + split_sections(user, SECTION_MARKERS.get(template, []))
+    rows = [{'section': name, 'chars': len(body), 'tokens': estimate_tokens(body)} for name, body in sections]
+    total = sum(row['tokens'] for row in rows) + MESSAGE_OVERHEAD * len(request.messages)
+    for row in rows:
+        row['share'] = round(row['tokens'] / total, 4) if total else 0.0
+    return {
+        'template': template,
+        'sections': rows,
+        'system_tokens': rows[0]['tokens'],
+        'user_tokens': total - rows[0]['tokens'] - MESSAGE_OVERHEAD * len(request.messages),
+        'total_tokens': total,
+        'max_output_tokens': request.max_tokens,
+        'estimated': _ENCODING is None,
+    }
+
+
+def compare(full, compact):
+    """기존 템플릿 대비 압축 템플릿 절감량"""
+    saved = full['total_tokens'] - compact['total_tokens']
+    return {
+        'full_tokens': full['total_tokens'],
+        'compact_tokens': compact['total_tokens'],
+        'saved_tokens': saved,
+        'saved_ratio': round(saved / full['total_tokens'], 4) if full['total_tokens'] else 0.0,
+        # 요청마다 달라지는 부분 (시스템 메시지는 요청 간 동일)
+        'full_dynamic_tokens': full['user_tokens'],
+        'compact_dynamic_tokens': compact['user_tokens'],
+    }
+
+
+def format_report(analysis):
+    lines = [f"[{analysis['template']}] 입력 {analysis['total_tokens']} 토큰"
+             f" (시스템 {analysis['system_tokens']}, 사용자 {analysis['user_tokens']}){' - 근사치' if analysis['estimated'] else ''}"]
+    for row in analysis['sections']:
+        lines.append(f"  {row['section']:<12} {row['tokens']:>6} 토큰  {row['share'] * 100:5.1f}%  ({row['chars']}자)")
+    return '\n'.join(lines)
+
+
+def scenarios(profiles):
+    """person_data.json 프로필 × 건강지표 상태(전부 주의 / 하나씩 관리)"""
+    from prompts import create_health_assessment
+    statuses = [("주의", "주의", "주의"), ("관리", "좋음", "좋음"), ("좋음", "관리", "좋음"), ("좋음", "좋음", "관리")]
+    for profile in profiles:
+        for status in statuses:
+            yield profile, create_health_assessment(*status)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="개인화 설명 프롬프트의 입력 토큰 예산 비교 (full vs compact)")
+    parser.add_argument('--profiles', default='person_data.json')
+    parser.add_argument('--limit', type=int, default=5, help="사용할 프로필 수")
+    parser.add_argument('--sections', action='store_true', help="구역별 상세 출력")
+    parser.add_argument('--json', action='store_true', help="JSON 으로 출력")
+    args = parser.parse_args(argv)
+
+    from connections import get_setting
+    from data import HealthRAGSystem
+
+    with open(args.profiles, 'r', encoding='utf-8') as f:
+        profiles = json.load(f)[:args.limit]
+
+    system = HealthRAGSystem(get_setting('GROQ_API_KEY', ''))
+    results = []
+    for profile, assessments in scenarios(profiles):
+        problematic = [k for k, v in assessments.items() if v in ["주의", "관리"]]
+        products, scores = system.get_products_from_classification(problematic, [], [])
+        products = products[:7]
+        if not products:
+            continue
+        snapshot = system.load_product_snapshot(products)
+        requests = {
+            mode: system._personalized_explanation_request(assessments, [], [], products, scores, profile, snapshot, prompt_mode=mode)
+            for mode in ('full', 'compact')
+        }
+        full = analyze_request(requests['full'], 'personalized')
+        compact = analyze_request(requests['compact'], 'personalized_compact')
+        results.append({'age': profile.get('age'), 'assessments': assessments, 'full': full, 'compact': compact,
+                        'savings': compare(full, compact)})
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+
+    for result in results:
+        savings = result['savings']
+        print(f"{result['age']}세 {result['assessments']}: {savings['full_tokens']} → {savings['compact_tokens']} 토큰"
+              f" ({savings['saved_ratio'] * 100:.1f}% 절감, 요청별 부분 {savings['full_dynamic_tokens']} → {savings['compact_dynamic_tokens']})")
+        if args.sections:
+            print(format_report(result['full']))
+            print(format_report(result['compact']))
+    if results:
+        full_total = sum(r['savings']['full_tokens'] for r in results)
+        compact_total = sum(r['savings']['compact_tokens'] for r in results)
+        print(f"\n평균 입력 토큰: {full_total / len(results):.0f} → {compact_total / len(results):.0f}"
+              f" ({(full_total - compact_total) / full_total * 100:.1f}% 절감, {len(results)}개 시나리오)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -120,4 +120,93 @@ def get_health_expert_system_message():
 - 과학적·규제 근거가 불명확한 표현은 사용하지 마세요
 - 식약처에서 인정한 기능성만을 바탕으로 설명하세요
 
-설명은 친근하고 이해하기 쉬운 톤으로 작성하되, 전문성을 잃지 않도록 해주세요."""
\ No newline at end of file
+설명은 친근하고 이해하기 쉬운 톤으로 작성하되, 전문성을 잃지 않도록 해주세요."""
+def _joined(values):
+    return ', '.join(sorted(values)) if values else '정보 없음'
+
+def _user_state_lines(problematic_indicators, physiology_network, health_concerns, user_profile, user_health_analysis, related_areas):
+    """압축/진단 프롬프트 공통 - 사용자 상태와 건강지표별 연관 관리영역"""
+    lines = ["[사용자]"]
+    lines.append(f"- 건강 지표: {', '.join(f'{k}({v})' for k, v in problematic_indicators.items())}")
+    lines.append(f"- 관심 영역: {', '.join(physiology_network) if physiology_network else '없음'} / 건강 분야: {', '.join(health_concerns) if health_concerns else '없음'}")
+    if user_profile:
+        lines.append(f"- 기본정보: {user_profile[0]} {user_profile[1]}")
+    for category, analysis in user_health_analysis.items():
+        lines.append(f"- {category}: {analysis}")
+
+    if related_areas:
+        lines.append("[건강지표별 연관 관리영역]")
+        for indicator, areas in related_areas.items():
+            lines.append(f"- {indicator}({problematic_indicators[indicator]}): {', '.join(areas)}")
+    return lines
+
+def get_personalized_system_message():
+    """개인화 추천 설명(압축 모드)의 고정 시스템 메시지 - 요청마다 바뀌지 않는 지침을 모두 담아 프롬프트 앞부분을 동일하게 유지"""
+    return """당신은 개인 맞춤형 건강 제품 추천 전문가입니다. 사용자 데이터와 추천 제품 정보를 받아 아래 구성으로 자연스럽고 간결한 한국어 설명을 작성합니다.
+
+## 🔍 진단 결과
+- 우선순위를 정하는 기준을 먼저 밝히고, 실제 건강 데이터(혈압, 간기능, 혈중지질, 혈당, 체성분 등)를 근거로 건강지표 분석 결과와 관리영역의 우선순위를 의학적 근거와 함께 설명
+- 사용자가 선택한 관심 영역만 중심으로, 실제 건강 상태와의 연관성과 제품 선택에 미친 영향을 설명
+
+## 💊 기본 베이스 제품
+- 제품마다 ### 제품명 아래 한 단락(3-4문장, 150자 이상)
+- 핵심 기능성, 주요 원료와 원료별 효과(해당 건강지표와 연계), 매칭된 건강지표와 관리 필요 영역, 관심 영역과의 연결을 문장 속에 녹여 작성
+
+## 💪🏻 보강 제품
+- 제품마다 ### 제품명 아래 한 단락(3-4문장, 150자 이상)
+- 기본 베이스와의 차이, 고유 원료와 추가 관리영역으로 보완하는 점과 시너지, 매칭된 건강지표와 관리 필요 영역을 포함
+- "원료→효과" 문장을 2개 이상 포함 (예: "루테인은 청색광으로 인한 망막 산화 스트레스를 낮춰 시각 기능 유지에 기여합니다.")
+
+작성 규칙:
+- 각 제품 설명에 '식약처 인정 기능성', '주요 특징', '원재료'(제품정보), '원료'(분류기준)를 반드시 포함
+- 내용·표현·근거·문장 패턴을 제품 간에 반복하지 말 것, "~하는 데 도움을 줄 수 있습니다"는 최대 1회
+- 반드시 '건강기능식품'이라는 용어만 사용 ('건강 기능 보조제' 금지)
+- 식약처 인정 기능성과 데이터에 명시된 원료만 근거로 사용, 과학적·규제 근거가 불명확한 표현 금지
+- 한국어만 사용 (한자, 일본어 등 외국어 금지)
+- 모든 섹션을 빠짐없이 작성"""
+
+def create_compact_personalized_prompt(problematic_indicators, physiology_network, health_concerns, user_profile, user_health_analysis, related_areas, base_products, additional_products):
+    """
+    개인화 추천 설명(압축 모드)의 사용자 메시지 - 요청마다 달라지는 데이터만 한 번씩 나열
+    - user_profile: (연령대, 성별) 또는 None
+    - related_areas: {건강지표: [관리영역, ...]}
+    - base_products / additional_products: 제품별 dict (name, indicators, areas, ingredients, functionality, features, raw_materials, indicator_matches, interest_matches, 보강 제품은 unique_ingredients, unique_areas 추가)
+    """
+    lines = _user_state_lines(problematic_indicators, physiology_network, health_concerns, user_profile, user_health_analysis, related_areas)
+
+    def product_line(rank, product):
+        line = (
+            f"{rank}. {product['name']} | 건강지표: {_joined(product['indicators'])} | 관리영역: {_joined(product['areas'])}"
+            f" | 원료: {_joined(product['ingredients'])} | 기능성: {product['functionality']} | 특징: {product['features']}"
+            f" | 원재료: {product['raw_materials']} | 매칭: 건강지표 {product['indicator_matches']}개, 관심영역 {product['interest_matches']}개"
+        )
+        if product.get('unique_ingredients'):
+            line += f" | 고유 원료: {_joined(product['unique_ingredients'])}"
+        if product.get('unique_areas'):
+            line += f" | 추가 관리영역: {_joined(product['unique_areas'])}"
+        return line
+
+    lines.append("[기본 베이스 제품 (1-3위)]")
+    lines.extend(product_line(rank, product) for rank, product in enumerate(base_products, 1))
+    if additional_products:
+        lines.append("[보강 제품 (4-7위)]")
+        lines.extend(product_line(rank, product) for rank, product in enumerate(additional_products, 4))
+    return '\n'.join(lines)
+
+def get_diagnosis_system_message():
+    """진단 섹션만 작성하는 시스템 메시지 (fragments 모드 - 제품 설명은 미리 만든 조각을 사용)"""
+    return """당신은 개인 맞춤형 건강 제품 추천 전문가입니다. 사용자 데이터와 추천 제품 목록을 받아 '## 🔍 진단 결과' 섹션 하나만 작성합니다.
+
+- 우선순위를 정하는 기준을 먼저 밝히고, 실제 건강 데이터를 근거로 건강지표 분석 결과와 관리영역의 우선순위를 의학적 근거와 함께 설명
+- 사용자가 선택한 관심 영역만 중심으로, 실제 건강 상태와의 연관성과 제품 선택에 미친 영향을 설명
+- 제품별 설명 섹션은 따로 제공되므로 작성하지 말 것
+- 반드시 '건강기능식품'이라는 용어만 사용, 과학적·규제 근거가 불명확한 표현 금지
+- 한국어만 사용 (한자, 일본어 등 외국어 금지), 2-3개 단락으로 간결하게"""
+
+def create_diagnosis_prompt(problematic_indicators, physiology_network, health_concerns, user_profile, user_health_analysis, related_areas, products):
+    """진단 섹션용 사용자 메시지 - products: [(순위, 제품명, 건강지표 집합, 관리영역 집합)]"""
+    lines = _user_state_lines(problematic_indicators, physiology_network, health_concerns, user_profile, user_health_analysis, related_areas)
+    lines.append("[추천 제품 (1-3위 기본 베이스, 4-7위 보강)]")
+    for rank, name, indicators, areas in products:
+        lines.append(f"{rank}. {name} | 건강지표: {_joined(indicators)} | 관리영역: {_joined(areas)}")
+    return '\n'.join(lines)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+검진 레코드 스키마
+- person_data.json 형태의 dict / DataFrame 을 index_registry.FEATURES 순서의 고정 레이아웃 float 배열로 한 번에 디코딩
+- 누락 필드 기본값(pack_year, met, rfs, eq5d, asm, BMI - asm 은 골격근량도 없으면 0), 체중 대비 % 파생 변수, 값 범위 검증을 일괄 적용
+- 지수 계산(calculate), what-if 계산기 등은 디코딩된 배열만 읽음
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from index_registry import FEATURES, INPUT_COLUMNS, MUSCLE_PERCENT_FIELDS
+
+
+class RecordValidationError(ValueError):
+    """필수 값 누락 또는 허용 범위를 벗어난 레코드"""
+
+
+class FieldSpec:
+    """
+    입력 필드 정의
+    - default: 값이 없을 때 사용할 상수 또는 함수 (함수는 다른 필드 조회용 getter 를 받음 - 스칼라/배열 모두 동작)
+    - valid_range: 허용 범위 (min, max) - 포함
+    - sql_default: 함수형 기본값의 SQL 표현 (index_sql 에서 사용, 컬럼은 {컬럼명} 자리표시자)
+    """
+
+    def __init__(self, name, valid_range, default=None, sql_default=None):
+        self.name = name
+        self.min_val, self.max_val = valid_range
+        self.default = default
+        self.sql_default = sql_default
+
+    @property
+    def dependencies(self):
+        """함수형 기본값이 읽는 다른 필드 이름 (상수 기본값이면 빈 tuple)"""
+        if not callable(self.default):
+            return ()
+        names = []
+
+        def get(name):
+            names.append(name)
+            return 1.0
+
+        self.default(get)
+        return tuple(names)
+
+    def default_value(self, get):
+        if not callable(self.default):
+            return self.default
+        try:
+            return self.default(get)
+        except ZeroDivisionError:
+            return float('nan')
+
+
+# app.py 에서 setdefault 로 채우던 기본값과 같은 규칙
+FIELDS = (
+    FieldSpec('age', (0, 120)),
+    FieldSpec('sex', (0, 2)),
+    FieldSpec('he_bmi', (10, 70), default=lambda get: get('weight') / (get('height') / 100) ** 2,
+              sql_default="{weight} / NULLIF(({height} / 100.0) * ({height} / 100.0), 0)"),
+    FieldSpec('he_wc', (30, 200)),
+    FieldSpec('sbp', (50, 260)),
+    FieldSpec('dbp', (30, 160)),
+    FieldSpec('glu', (20, 700)),
+    FieldSpec('tc', (50, 600)),
+    FieldSpec('ldl', (0, 500)),
+    FieldSpec('hdl', (5, 200)),
+    FieldSpec('tg', (10, 3000)),
+    FieldSpec('got', (0, 2000)),
+    FieldSpec('gpt', (0, 2000)),
+    FieldSpec('crea', (0.1, 20)),
+    FieldSpec('hb', (3, 25)),
+    FieldSpec('smok_dur', (0, 100)),
+    FieldSpec('pack_year', (0, 200), default=lambda get: get('smok_dur') * 0.5,  # 대략적인 추정
+              sql_default="{smok_dur} * 0.5"),
+    FieldSpec('drink_amt', (0, 100)),
+    FieldSpec('met', (0, 30), default=3.8),
+    FieldSpec('sleep_time', (0, 24)),
+    FieldSpec('eq5d', (-1, 1), default=0.89),
+    FieldSpec('rfs', (0, 100), default=27.3),
+    FieldSpec('per_bodyfat', (1, 75)),
+    FieldSpec('weight', (20, 300)),
+    FieldSpec('r_arm_muscle', (0, 50)),
+    FieldSpec('l_arm_muscle', (0, 50)),
+    FieldSpec('r_leg_muscle', (0, 100)),
+    FieldSpec('l_leg_muscle', (0, 100)),
+    # ASM = 골격근량, 골격근량도 없으면 0 (기존 app.py 의 setdefault('asm', get('skeletal_muscle_mass', 0)) 와 같음)
+    FieldSpec('asm', (0, 150), default=lambda get: np.nan_to_num(get('skeletal_muscle_mass'), nan=0.0),
+              sql_default="COALESCE({skeletal_muscle_mass}, 0)"),
+)
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class RecordSchema:
+    """FieldSpec 목록을 컴파일한 디코더 - 출력 컬럼 순서는 index_registry.FEATURES"""
+
+    def __init__(self, fields=FIELDS):
+        self.fields = tuple(fields)
+        names = tuple(spec.name for spec in self.fields)
+        if names != INPUT_COLUMNS:
+            raise ValueError("스키마 필드 순서는 index_registry.INPUT_COLUMNS 와 같아야 합니다.")
+        self.columns = FEATURES
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self._derived = tuple((self.index[var], self.index[source]) for var, source in MUSCLE_PERCENT_FIELDS)
+        self._weight = self.index['weight']
+        self._dependents = {}
+        for spec in self.fields:
+            for source in spec.dependencies:
+                self._dependents[source] = self._dependents.get(source, ()) + (spec,)
+
+    # --------------------------
+    # 단건
+    # --------------------------
+    def derived_defaults(self, data):
+        """값이 없어 다른 필드로부터 계산되는(함수형 기본값) 필드 이름"""
+        return {spec.name for spec in self.fields if callable(spec.default) and _is_missing(data.get(spec.name))}
+
+    def dependents(self, name):
+        """name 을 읽는 함수형 기본값을 가진 FieldSpec 목록"""
+        return self._dependents.get(name, ())
+
+    def fill_defaults(self, data):
+        """기본값과 파생 변수를 채운 dict 반환 (원본 dict 는 변경하지 않음)"""
+        filled = dict(data)
+
+        def get(name):
+            value = filled.get(name)
+            return float('nan') if _is_missing(value) else value
+
+        for spec in self.fields:
+            if _is_missing(filled.get(spec.name)) and spec.default is not None:
+                filled[spec.name] = spec.default_value(get)
+        weight = filled.get('weight')
+        if not _is_missing(weight) and weight:
+            for var, source in MUSCLE_PERCENT_FIELDS:
+                if not _is_missing(filled.get(source)):
+                    filled[var] = (filled[source] / weight) * 100
+        return filled
+
+    def decode_one(self, data):
+        """단건 dict → FEATURES 순서의 float 배열 (검증 실패 시 RecordValidationError)"""
+        filled = self.fill_defaults(data)
+        row = np.empty(len(self.columns))
+        problems = []
+        for i, spec in enumerate(self.fields):
+            value = filled.get(spec.name)
+            if _is_missing(value):
+                problems.append(f"{spec.name} 누락")
+                continue
+            if not spec.min_val <= value <= spec.max_val:
+                problems.append(f"{spec.name}={value} (허용 범위 {spec.min_val}~{spec.max_val})")
+            row[i] = value
+        if problems:
+            raise RecordValidationError("검진 데이터 검증 실패: " + ", ".join(problems))
+        for i, source in self._derived:
+            row[i] = (row[source] / row[self._weight]) * 100
+        return row
+
+    # --------------------------
+    # 배치
+    # --------------------------
+    def decode(self, records, errors='raise'):
+        """
+        DataFrame / dict 리스트 → (n, len(FEATURES)) float 배열
+        - errors='raise': 검증 실패 행이 있으면 RecordValidationError
+        - errors='coerce': 검증 실패 행은 NaN 으로 채움
+        """
+        frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+        n = len(frame)
+        matrix = np.empty((n, len(self.columns)))
+
+        def get(name):
+            if name in self.index and self.index[name] < len(self.fields) and filled[self.index[name]]:
+                return matrix[:, self.index[name]]
+            if name in frame.columns:
+                return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+            return np.full(n, np.nan)
+
+        filled = [False] * len(self.fields)
+        invalid = np.zeros(n, dtype=bool)
+        problems = []
+        for i, spec in enumerate(self.fields):
+            if spec.name in frame.columns:
+                values = pd.to_numeric(frame[spec.name], errors='coerce').to_numpy(dtype=np.float64, copy=True)
+            else:
+                values = np.full(n, np.nan)
+            missing = np.isnan(values)
+            if missing.any() and spec.default is not None:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    default = spec.default_value(get)
+                values[missing] = default[missing] if isinstance(default, np.ndarray) else default
+                missing = np.isnan(values)
+            with np.errstate(invalid='ignore'):
+                bad = missing | (values < spec.min_val) | (values > spec.max_val)
+            if bad.any():
+                invalid |= bad
+                rows = np.flatnonzero(bad)[:3]
+                problems.append(f"{spec.name} ({int(bad.sum())}행, 예: {', '.join(str(frame.index[r]) for r in rows)})")
+            matrix[:, i] = values
+            filled[i] = True
+
+        if invalid.any():
+            if errors == 'raise':
+                raise RecordValidationError("검진 데이터 검증 실패: " + "; ".join(problems))
+            matrix[invalid, :len(self.fields)] = np.nan
+
+        weight = matrix[:, self._weight]
+        for i, source in self._derived:
+            matrix[:, i] = (matrix[:, source] / weight) * 100
+        return matrix
+
+
+RECORD_SCHEMA = RecordSchema()
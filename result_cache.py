@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+추천 결과 캐시
+- 분류기준 / 그래프 / 제품정보 테이블 버전이 같으면 recommend_products 결과는 (건강지표 상태, 관심 영역, 프롬프트에 쓰이는 사용자 데이터) 의 순수 함수
+- 정규화한 키로 최종 DataFrame 과 설명을 통째로 보관하는 크기 제한 LRU 캐시 (프로세스 전역, 스레드 안전)
+- 키에 테이블 버전이 들어가지만, 버전에 잡히지 않는 변경(알레르겐 등)에 대비해 항목마다 유효 시간(TTL)도 적용
+- 설정 (환경변수): RESULT_CACHE_SIZE (기본 256), RESULT_CACHE_TTL (초, 기본 3600, 0 이면 만료 없음)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_SIZE', '256'))
+DEFAULT_TTL = float(os.getenv('RESULT_CACHE_TTL', '3600'))
+
+
+class LRUResultCache:
+    """크기 제한 + 유효 시간 LRU 캐시 - 적중/미적중/제거/만료 횟수 기록"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key → (만료 시각, 값)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """저장된 값 또는 None (만료된 항목은 제거)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and time.monotonic() >= entry[0]:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl and self.ttl > 0 else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'ttl': self.ttl,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# recommend_products 결과 캐시 (HealthRAGSystem 인스턴스 간 공유)
+RECOMMENDATION_CACHE = LRUResultCache()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""calculate_three_indices_batch 가 단건 calculate_three_indices 와 같은 점수를 내는지 확인"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculate import INDEX_NAMES, calculate_three_indices, calculate_three_indices_batch
+from index_registry import INPUT_COLUMNS
+from record_schema import RecordValidationError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 두 경로 모두 소수 첫째 자리로 반올림하므로 반올림 경계에서 0.1 차이까지 허용
+TOLERANCE = 0.1 + 1e-9
+DEFAULTED_FIELDS = ('pack_year', 'met', 'rfs', 'eq5d', 'he_bmi', 'asm')
+
+
+def _person_data():
+    with open(os.path.join(ROOT, 'person_data.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _scalar_frame(records):
+    return pd.DataFrame([calculate_three_indices(record) for record in records], columns=list(INDEX_NAMES))
+
+
+def _random_cohort(n, seed):
+    """person_data.json 프로필 주변으로 흔든 코호트 (기본값 필드 일부는 비움)"""
+    rng = np.random.default_rng(seed)
+    base = pd.DataFrame(_person_data())
+    cohort = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    for column in ('sbp', 'dbp', 'glu', 'tc', 'ldl', 'hdl', 'tg', 'he_wc', 'weight', 'per_bodyfat', 'skeletal_muscle_mass'):
+        cohort[column] = cohort[column] * rng.uniform(0.9, 1.1, n)
+    cohort['smok_dur'] = rng.integers(0, 30, n).astype(float)
+    cohort['met'] = rng.uniform(0.5, 10, n)
+    cohort['sex'] = rng.integers(1, 3, n)
+    return cohort
+
+
+def _assert_matches(records, batch):
+    scalar = _scalar_frame(records)
+    assert list(batch.columns) == list(INDEX_NAMES)
+    np.testing.assert_allclose(batch.to_numpy(), scalar.to_numpy(), rtol=0, atol=TOLERANCE)
+
+
+def test_person_data_matches_scalar():
+    records = _person_data()
+    _assert_matches(records, calculate_three_indices_batch(records))
+    _assert_matches(records, calculate_three_indices_batch(pd.DataFrame(records)))
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_random_cohort_matches_scalar(seed):
+    cohort = _random_cohort(500, seed)
+    batch = calculate_three_indices_batch(cohort)
+    assert batch.index.equals(cohort.index)
+    _assert_matches(cohort.to_dict('records'), batch)
+
+
+def test_ndarray_input_matches_scalar():
+    cohort = _random_cohort(50, seed=3)
+    records = cohort.to_dict('records')
+    for record in records:
+        record['pack_year'] = record['smok_dur'] * 0.5
+        record['rfs'], record['eq5d'] = 27.3, 0.89
+        record['asm'] = record['skeletal_muscle_mass']
+    matrix = pd.DataFrame(records)[list(INPUT_COLUMNS)].to_numpy(dtype=float)
+    _assert_matches(records, calculate_three_indices_batch(matrix))
+
+
+def test_defaulted_fields_match_scalar():
+    cohort = _random_cohort(200, seed=4)
+    rng = np.random.default_rng(4)
+    for column in DEFAULTED_FIELDS:
+        if column not in cohort:
+            cohort[column] = np.nan
+        # 일부 행은 값을 직접 주고, 나머지는 기본값 규칙으로 채움
+        given = rng.random(len(cohort)) < 0.5
+        if column == 'pack_year':
+            cohort.loc[given, column] = cohort.loc[given, 'smok_dur'] * 0.7
+        elif column == 'he_bmi':
+            cohort.loc[given, column] = 24.0
+        elif column == 'asm':
+            cohort.loc[given, column] = cohort.loc[given, 'skeletal_muscle_mass'] * 0.8
+        else:
+            cohort.loc[given, column] = {'met': 5.0, 'rfs': 40.0, 'eq5d': 0.95}[column]
+        cohort.loc[~given, column] = np.nan
+
+    records = [{k: v for k, v in record.items() if not (isinstance(v, float) and np.isnan(v))}
+               for record in cohort.to_dict('records')]
+    _assert_matches(records, calculate_three_indices_batch(cohort))
+    _assert_matches(records, calculate_three_indices_batch(records))
+
+
+def test_missing_required_field():
+    records = _person_data()
+    del records[2]['sbp']
+    records[5]['glu'] = None
+
+    with pytest.raises(RecordValidationError):
+        calculate_three_indices(records[2])
+    with pytest.raises(RecordValidationError):
+        calculate_three_indices_batch(records)
+
+    batch = calculate_three_indices_batch(records, errors='coerce')
+    invalid = [2, 5]
+    assert batch.iloc[invalid].isna().all().all()
+    valid = [i for i in range(len(records)) if i not in invalid]
+    _assert_matches([records[i] for i in valid], batch.iloc[valid].reset_index(drop=True))
+
+
+def test_out_of_range_value_is_rejected():
+    record = dict(_person_data()[0], sbp=400)
+    with pytest.raises(RecordValidationError):
+        calculate_three_indices(record)
+    batch = calculate_three_indices_batch([record, _person_data()[1]], errors='coerce')
+    assert batch.iloc[0].isna().all()
+    assert batch.iloc[1].notna().all()
+
+
+def test_missing_muscle_mass_defaults_asm_to_zero():
+    records = _person_data()[:4]
+    for record in records:
+        record.pop('skeletal_muscle_mass')
+    expected = [calculate_three_indices(dict(record, asm=0)) for record in records]
+    assert [calculate_three_indices(record) for record in records] == expected
+    _assert_matches(records, calculate_three_indices_batch(records))
+
+
+# =========================
+# 기준 공식 (baseline calculate.py 의 항별 공식 그대로 - 레지스트리 가중치와 독립적으로 검증)
+# =========================
+_OXI_TERMS = (
+    ('age', 45.2, 12.8, 0.082), ('sex', 0.48, 0.50, -0.045), ('he_bmi', 23.7, 3.2, 0.156),
+    ('he_wc', 82.5, 9.4, 0.173), ('sbp', 122.3, 15.6, 0.198), ('dbp', 76.8, 10.2, 0.165),
+    ('glu', 98.7, 18.3, 0.224), ('tc', 196.5, 36.8, 0.142), ('ldl', 118.3, 32.4, 0.187),
+    ('hdl', 54.6, 13.7, -0.213), ('tg', 142.8, 78.5, 0.196), ('got', 25.8, 11.3, 0.089),
+    ('gpt', 26.4, 16.7, 0.094), ('crea', 0.92, 0.21, 0.078), ('hb', 14.2, 1.6, -0.056),
+    ('smok_dur', 8.3, 12.4, 0.312), ('pack_year', 6.8, 11.2, 0.298), ('drink_amt', 3.2, 4.8, 0.186),
+    ('met', 3.8, 2.4, -0.267), ('sleep_time', 6.8, 1.2, -0.145), ('eq5d', 0.89, 0.14, -0.193),
+    ('rfs', 27.3, 8.6, -0.178),
+)
+_MET_TERMS = (
+    ('age', 45.2, 12.8, 0.096), ('sex', 0.48, 0.50, -0.032), ('he_bmi', 23.7, 3.2, 0.218),
+    ('he_wc', 82.5, 9.4, 0.246), ('sbp', 122.3, 15.6, 0.178), ('dbp', 76.8, 10.2, 0.142),
+    ('glu', 98.7, 18.3, 0.348), ('tc', 196.5, 36.8, 0.186), ('ldl', 118.3, 32.4, 0.224),
+    ('hdl', 54.6, 13.7, -0.287), ('tg', 142.8, 78.5, 0.312), ('got', 25.8, 11.3, 0.124),
+    ('gpt', 26.4, 16.7, 0.156), ('crea', 0.92, 0.21, 0.098), ('pack_year', 6.8, 11.2, 0.234),
+    ('sleep_time', 6.8, 1.2, -0.112), ('met', 3.8, 2.4, -0.298), ('rfs', 27.3, 8.6, -0.256),
+)
+_MUS_TERMS = (
+    ('age', 45.2, 12.8, -0.156), ('sex', 0.48, 0.50, 0.324), ('he_bmi', 23.7, 3.2, 0.098),
+    ('glu', 98.7, 18.3, 0.112), ('hdl', 54.6, 13.7, -0.087), ('ldl', 118.3, 32.4, 0.064),
+    ('per_bodyfat', 22.3, 5.8, -0.298), ('r_arm_per', 5.8, 0.9, 0.256), ('l_arm_per', 5.7, 0.9, 0.248),
+    ('r_leg_per', 11.2, 1.8, 0.312), ('l_leg_per', 11.0, 1.8, 0.298), ('wasm', 33.7, 4.2, 0.387),
+    ('met', 3.8, 2.4, 0.234), ('rfs', 27.3, 8.6, 0.156),
+)
+
+
+def _reference_normalize(score, min_val, max_val):
+    score_100 = ((score - min_val) / (max_val - min_val)) * 100
+    return max(0, min(100, round(score_100, 1)))
+
+
+def _reference_score(data, terms, base, intercept, slope, min_val, max_val):
+    contrib = 0
+    for name, mean, std, beta in terms:
+        contrib += ((data[name] - mean) / std) * beta
+    return _reference_normalize(intercept + (base + contrib) * slope, min_val, max_val)
+
+
+def _reference_three_indices(data):
+    weight = data['weight']
+    mus_data = dict(data, **{
+        'r_arm_per': (data['r_arm_muscle'] / weight) * 100,
+        'l_arm_per': (data['l_arm_muscle'] / weight) * 100,
+        'r_leg_per': (data['r_leg_muscle'] / weight) * 100,
+        'l_leg_per': (data['l_leg_muscle'] / weight) * 100,
+        'wasm': (data['asm'] / weight) * 100,
+    })
+    return dict(zip(INDEX_NAMES, (
+        _reference_score(data, _OXI_TERMS, 26.426, -0.360239755820859, 1.19545123840064, -10, 50),
+        _reference_score(data, _MET_TERMS, 26.2, -0.107296360783776, 1.26848490326677, -8, 48),
+        _reference_score(mus_data, _MUS_TERMS, 24.8, -0.245123456789012, 1.15432109876543, -12, 52),
+    )))
+
+
+def _complete_records():
+    """기본값 규칙 없이 기준 공식에 바로 넣을 수 있도록 모든 입력을 채운 고정 레코드"""
+    records = _person_data() + _random_cohort(200, seed=5).to_dict('records')
+    for i, record in enumerate(records):
+        record['pack_year'] = record['smok_dur'] * 0.5
+        record['met'] = record.get('met', 1.5 + (i % 7))
+        record['rfs'], record['eq5d'] = 20.0 + i % 15, 0.7 + (i % 4) * 0.1
+        record['asm'] = record['skeletal_muscle_mass'] * 0.6
+    return records
+
+
+def test_scores_match_baseline_formulas_exactly():
+    records = _complete_records()
+    expected = pd.DataFrame([_reference_three_indices(record) for record in records], columns=list(INDEX_NAMES))
+    scalar = _scalar_frame(records)
+    batch = calculate_three_indices_batch(records)
+    np.testing.assert_array_equal(scalar.to_numpy(), expected.to_numpy())
+    np.testing.assert_array_equal(batch.to_numpy(), expected.to_numpy())
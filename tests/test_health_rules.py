@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""HealthRuleEngine 의 DataFrame 경로가 단건 analyze 와 같은 문구를 내는지 확인"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from health_rules import HEALTH_RULE_ENGINE, age_group
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _person_data():
+    with open(os.path.join(ROOT, 'person_data.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _assert_frame_matches_scalar(records):
+    frame = pd.DataFrame(records)
+    batch = HEALTH_RULE_ENGINE.analyze_frame(frame)
+    for record, result in zip(records, batch):
+        present = {k: v for k, v in record.items() if v is not None and not (isinstance(v, float) and np.isnan(v))}
+        assert result == HEALTH_RULE_ENGINE.analyze(present)
+
+
+def test_person_data_matches_scalar():
+    _assert_frame_matches_scalar(_person_data())
+
+
+def test_nan_rows_match_scalar():
+    records = _person_data()
+    # 정수 컬럼에 빈 값이 섞이면 DataFrame 에서는 float 로 바뀜 ("175.0mmHg" 가 되면 안 됨)
+    records[0].update(sbp=175, dbp=95, glu=130, tc=250, smok_dur=12)
+    records[1].update(sbp=None, hdl=np.nan, sex=2)
+    records[2].update(glu=None, tg=np.nan, sleep_time=None)
+    _assert_frame_matches_scalar(records)
+
+    result = HEALTH_RULE_ENGINE.analyze_frame(pd.DataFrame(records))[0]
+    assert "175mmHg" in result['혈압']
+    assert "130mg/dL" in result['혈당']
+
+
+def test_fractional_values_are_kept():
+    record = dict(_person_data()[0], he_bmi=31.4, sleep_time=5.5)
+    result = HEALTH_RULE_ENGINE.analyze(record)
+    assert "BMI 31.4" in result['체중']
+    assert "5.5시간" in result['생활습관']
+
+
+def test_scalar_formatting_matches_baseline():
+    # 단건 analyze 는 입력 값을 그대로 표시 (float 25.0 은 "25.0", 정수 25 는 "25")
+    record = dict(_person_data()[0], he_bmi=25.0, sbp=150.0)
+    result = HEALTH_RULE_ENGINE.analyze(record)
+    assert "BMI 25.0로" in result['체중']
+    assert "수축기 혈압 150.0mmHg" in result['혈압']
+    assert "BMI 25로" in HEALTH_RULE_ENGINE.analyze(dict(record, he_bmi=25))['체중']
+
+
+def test_flags_bucket_users_in_the_same_ranges():
+    # 측정값이 달라도 같은 구간이면 같은 flags (개인화 설명 캐시 키)
+    first = dict(_person_data()[0], sbp=132, ldl=135, sleep_time=6)
+    second = dict(first, sbp=138, ldl=150, sleep_time=5.5)
+    assert HEALTH_RULE_ENGINE.flags(first) == HEALTH_RULE_ENGINE.flags(second)
+    assert HEALTH_RULE_ENGINE.flags(first)['혈압'] == ['고혈압 전단계']
+    assert HEALTH_RULE_ENGINE.flags(dict(first, sbp=145))['혈압'] == ['고혈압']
+    assert age_group(34) == age_group(39) == "30대"
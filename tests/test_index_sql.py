@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""IndexSQLBuilder 가 생성한 SQL 의 점수가 calculate_three_indices_batch 와 같은지 확인 (sqlite 메모리 DB)"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from calculate import INDEX_NAMES, calculate_three_indices_batch
+from index_sql import score_table, verify_against_python
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# SQL ROUND 는 0.5 를 0 에서 먼 쪽으로 반올림하므로 경계값에서 0.1 차이까지 허용
+TOLERANCE = 0.1 + 1e-9
+
+
+def _person_data():
+    with open(os.path.join(ROOT, 'person_data.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _cohort(n, seed):
+    """person_data.json 주변으로 흔들고 기본값 필드(pack_year, met, rfs, eq5d, he_bmi, asm) 일부를 비운 코호트"""
+    rng = np.random.default_rng(seed)
+    base = pd.DataFrame(_person_data())
+    cohort = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    for column in ('sbp', 'dbp', 'glu', 'tc', 'ldl', 'hdl', 'tg', 'he_wc', 'weight', 'per_bodyfat', 'skeletal_muscle_mass'):
+        cohort[column] = cohort[column] * rng.uniform(0.9, 1.1, n)
+    cohort['smok_dur'] = rng.integers(0, 30, n).astype(float)
+    cohort['sex'] = rng.integers(1, 3, n)
+    cohort['pack_year'] = np.where(rng.random(n) < 0.5, cohort['smok_dur'] * 0.7, np.nan)
+    cohort['met'] = np.where(rng.random(n) < 0.5, rng.uniform(0.5, 10, n), np.nan)
+    cohort['rfs'] = np.where(rng.random(n) < 0.5, 40.0, np.nan)
+    cohort['eq5d'] = np.where(rng.random(n) < 0.5, 0.95, np.nan)
+    cohort['asm'] = np.where(rng.random(n) < 0.3, cohort['skeletal_muscle_mass'] * 0.8, np.nan)
+    cohort.loc[rng.random(n) < 0.3, 'he_bmi'] = np.nan
+    cohort.loc[rng.random(n) < 0.2, 'skeletal_muscle_mass'] = np.nan
+    cohort['user_id'] = np.arange(n)
+    return cohort
+
+
+def _scored(frame):
+    engine = create_engine('sqlite://')
+    frame.to_sql('inp_ehr', engine, index=False)
+    return score_table(engine, 'inp_ehr', key_columns=['user_id']).set_index('user_id'), engine
+
+
+def _assert_matches_python(frame):
+    scored, engine = _scored(frame)
+    expected = calculate_three_indices_batch(frame, errors='coerce').set_axis(frame['user_id'])
+    for name in INDEX_NAMES:
+        sql_scores = scored.loc[expected.index, name].astype(float)
+        np.testing.assert_array_equal(sql_scores.isna().to_numpy(), expected[name].isna().to_numpy())
+        np.testing.assert_allclose(sql_scores.to_numpy(), expected[name].to_numpy(), rtol=0, atol=TOLERANCE)
+    return engine
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_sql_scores_match_python(seed):
+    engine = _assert_matches_python(_cohort(300, seed))
+    assert all(diff <= TOLERANCE for diff in verify_against_python(engine, 'inp_ehr').values())
+
+
+def test_missing_columns_use_defaults():
+    # 골격근량/ASM/BMI 등 컬럼 자체가 없는 테이블 - asm 은 0, he_bmi 는 키/몸무게로 계산
+    frame = _cohort(100, seed=2).drop(columns=['asm', 'skeletal_muscle_mass', 'he_bmi', 'pack_year', 'met', 'rfs', 'eq5d'])
+    _assert_matches_python(frame)
+
+
+def test_invalid_rows_are_null():
+    frame = _cohort(20, seed=3)
+    frame.loc[0, 'sbp'] = 400
+    frame.loc[1, 'glu'] = np.nan
+    scored, _ = _scored(frame)
+    assert scored.loc[[0, 1], list(INDEX_NAMES)].isna().all().all()
+    assert scored.loc[2:, list(INDEX_NAMES)].notna().all().all()
+    _assert_matches_python(frame)
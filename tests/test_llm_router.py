@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""LLMRouter 장애 전환 - 로컬 스텁 서버 두 개 (빠른 서버 / 항상 오류 서버) 로 확인"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import llm_router
+from llm_router import LLMRouter, Provider
+from llm_scheduler import LLMQueueFull
+from llm_stub_server import StubConfig, serve
+
+MODEL = "stub-model"
+MESSAGES = [{'role': 'user', 'content': "안녕하세요"}]
+
+
+class StubClient:
+    """스텁 서버용 최소 클라이언트 (LLMClient 와 같은 complete() / stream() / stats())"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def _post(self, body, timeout):
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions", data=json.dumps(body).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST',
+        )
+        return urllib.request.urlopen(request, timeout=timeout)
+
+    def complete(self, model, messages, max_tokens, temperature, timeout=None, priority=None):
+        body = {'model': model, 'messages': messages, 'max_tokens': max_tokens, 'temperature': temperature}
+        with self._post(body, timeout) as response:
+            return json.load(response)['choices'][0]['message']['content']
+
+    def stream(self, model, messages, max_tokens, temperature, timeout=None, priority=None):
+        body = {'model': model, 'messages': messages, 'max_tokens': max_tokens, 'temperature': temperature, 'stream': True}
+        with self._post(body, timeout) as response:
+            for line in response:
+                line = line.decode('utf-8').strip()
+                if not line.startswith('data: ') or line == 'data: [DONE]':
+                    continue
+                delta = json.loads(line[len('data: '):])['choices'][0]['delta'].get('content')
+                if delta:
+                    yield delta
+
+    def stats(self):
+        with urllib.request.urlopen(f"{self.base_url}/stats", timeout=5) as response:
+            return json.load(response)
+
+
+class DroppingStubClient(StubClient):
+    """첫 토큰을 보낸 뒤 연결이 끊기는 스트림"""
+
+    def stream(self, *args, **kwargs):
+        for delta in super().stream(*args, **kwargs):
+            yield delta
+            raise ConnectionError("stream dropped")
+
+
+class QueueFullClient:
+    def complete(self, *args, **kwargs):
+        raise LLMQueueFull("full")
+
+    def stats(self):
+        return {}
+
+
+@pytest.fixture
+def stub_servers():
+    """(빠른 서버 설정, 항상 오류 서버 설정, 빠른 서버 주소, 오류 서버 주소)"""
+    fast, failing = StubConfig(latency=0.01), StubConfig(latency=0.01, error_rate=1.0)
+    servers = [serve(0, fast), serve(0, failing)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_address[1]}/v1" for server in servers]
+    yield fast, failing, urls[0], urls[1]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def slow_server():
+    """응답이 라우터 마감 시간보다 늦는 서버 (설정, 주소)"""
+    config = StubConfig(latency=1.0)
+    server = serve(0, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield config, f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_slow_provider_is_demoted(stub_servers, slow_server):
+    _, _, fast_url, _ = stub_servers
+    _, slow_url = slow_server
+    slow, good = Provider('slow', StubClient(slow_url)), Provider('good', StubClient(fast_url))
+    router = LLMRouter([slow, good], timeout=0.5, explore_rate=0.0)
+
+    # 장애 전환용 몫(마감 시간의 일부) 안에 응답하지 않으면 공급자 실패로 기록
+    for _ in range(llm_router.MIN_SAMPLES):
+        assert router.complete(MODEL, MESSAGES, 16, 0.0)
+    assert slow.degraded
+    assert [p.name for p in router.candidates()] == ['good', 'slow']
+
+    started = time.monotonic()
+    assert router.complete(MODEL, MESSAGES, 16, 0.0)
+    assert time.monotonic() - started < 0.2
+
+
+def test_overall_deadline_is_not_a_provider_failure(slow_server):
+    _, slow_url = slow_server
+    only = Provider('slow', StubClient(slow_url))
+    router = LLMRouter([only], timeout=0.2, explore_rate=0.0)
+    with pytest.raises(TimeoutError):
+        router.complete(MODEL, MESSAGES, 16, 0.0)
+    assert not only.outcomes
+
+
+def test_failover_degrade_and_recover(stub_servers, monkeypatch):
+    fast, failing, fast_url, failing_url = stub_servers
+    monkeypatch.setattr(llm_router, 'COOLDOWN', 0.5)
+    bad, good = Provider('bad', StubClient(failing_url)), Provider('good', StubClient(fast_url))
+    router = LLMRouter([bad, good], timeout=5, explore_rate=0.0)
+
+    # 설정 순서대로 오류 서버를 먼저 시도하고 빠른 서버로 넘김
+    for _ in range(llm_router.MIN_SAMPLES):
+        assert router.complete(MODEL, MESSAGES, 16, 0.0)
+    assert router.counters['failovers'] == llm_router.MIN_SAMPLES
+    assert bad.degraded and not good.degraded
+
+    # 쿨다운 동안은 빠른 서버만 사용
+    errors = failing.counters['requests']
+    assert router.complete(MODEL, MESSAGES, 16, 0.0)
+    assert failing.counters['requests'] == errors
+    assert [p.name for p in router.candidates()] == ['good', 'bad']
+
+    # 쿨다운이 끝나고 서버가 회복되면 다시 설정 순서대로 사용
+    failing.error_rate = 0.0
+    time.sleep(0.6)
+    assert not bad.degraded
+    assert router.complete(MODEL, MESSAGES, 16, 0.0)
+    assert failing.counters['requests'] == errors + 1
+    assert bad.outcomes[-1] is True
+
+
+def test_stream_fails_over_before_first_token(stub_servers):
+    _, failing, fast_url, failing_url = stub_servers
+    router = LLMRouter([Provider('bad', StubClient(failing_url)), Provider('good', StubClient(fast_url))],
+                       timeout=5, explore_rate=0.0)
+    text = "".join(router.stream(MODEL, MESSAGES, 32, 0.0))
+    assert text
+    assert failing.counters['errors'] == 1
+    assert router.counters['failovers'] == 1
+
+
+def test_stream_does_not_fail_over_after_first_token(stub_servers):
+    fast, _, fast_url, _ = stub_servers
+    backup = StubClient(fast_url)
+    router = LLMRouter([Provider('dropping', DroppingStubClient(fast_url)), Provider('backup', backup)],
+                       timeout=5, explore_rate=0.0)
+    received = []
+    with pytest.raises(ConnectionError):
+        for delta in router.stream(MODEL, MESSAGES, 32, 0.0):
+            received.append(delta)
+    assert len(received) == 1
+    assert fast.counters['requests'] == 1
+    assert router.counters['failovers'] == 0
+
+
+def test_local_errors_do_not_count_against_provider(stub_servers):
+    _, _, fast_url, _ = stub_servers
+    local = Provider('local', QueueFullClient())
+    router = LLMRouter([local, Provider('good', StubClient(fast_url))], timeout=5, explore_rate=0.0)
+    for _ in range(llm_router.MIN_SAMPLES):
+        assert router.complete(MODEL, MESSAGES, 16, 0.0)
+    assert not local.outcomes
+    assert not local.degraded
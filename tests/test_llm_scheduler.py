@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""LLMScheduler 토큰 예약 정산 - 가짜 SDK 클라이언트로 LLMClient 스트리밍/일반 호출 후 토큰 버킷 확인"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from llm_client import LLMClient
+from llm_scheduler import LLMScheduler, request_cost
+
+MESSAGES = [{'role': 'user', 'content': "혈압 관리에 도움이 되는 제품을 알려주세요"}]
+MAX_TOKENS = 1000
+TPM = 60000
+
+
+class FakeStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FakeStream:
+    def __init__(self, deltas, usage=None):
+        self.chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=d))], usage=None) for d in deltas]
+        if usage is not None:
+            self.chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=usage)))
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    """failures 개수만큼 오류 응답 후 성공 (stream=True 면 FakeStream)"""
+
+    def __init__(self, failures=0, usage=None):
+        self.failures = failures
+        self.usage = usage
+        self.calls = 0
+
+    async def create(self, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise FakeStatusError(503)
+        if stream:
+            return FakeStream(["안녕", "하세요"], self.usage)
+        usage = SimpleNamespace(total_tokens=self.usage) if self.usage is not None else None
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="안녕하세요"))], usage=usage)
+
+
+def _client(completions):
+    scheduler = LLMScheduler(rpm=0, tpm=TPM)
+    client = LLMClient("test", scheduler=scheduler, hedge=False, timeout=10)
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client, scheduler
+
+
+COST = request_cost(MESSAGES, MAX_TOKENS)
+
+
+@pytest.mark.parametrize('usage', [42, None])
+def test_stream_settles_reservation(usage):
+    client, scheduler = _client(FakeCompletions(usage=usage))
+    assert "".join(client.stream("m", MESSAGES, MAX_TOKENS, 0.0)) == "안녕하세요"
+    refunded = scheduler.stats()['refunded_tokens']
+    if usage is not None:
+        assert refunded == COST - usage
+    else:
+        # usage 가 없으면 입력 추정치 + 받은 출력으로 정산 - 사용하지 않은 max_tokens 대부분은 반환
+        assert COST - MAX_TOKENS < COST - refunded < COST - MAX_TOKENS + 20
+    assert scheduler.tokens.tokens > TPM - COST + refunded - 1
+
+
+def test_stream_refunds_failed_attempt_before_retry():
+    completions = FakeCompletions(failures=1, usage=42)
+    client, scheduler = _client(completions)
+    assert "".join(client.stream("m", MESSAGES, MAX_TOKENS, 0.0)) == "안녕하세요"
+    assert completions.calls == 2
+    # 오류 응답을 받은 첫 시도는 예약 전부, 성공한 시도는 사용량과의 차이를 반환
+    assert scheduler.stats()['refunded_tokens'] == COST + (COST - 42)
+
+
+def test_complete_refunds_failed_attempt_before_retry():
+    completions = FakeCompletions(failures=1, usage=42)
+    client, scheduler = _client(completions)
+    assert client.complete("m", MESSAGES, MAX_TOKENS, 0.0) == "안녕하세요"
+    assert scheduler.stats()['refunded_tokens'] == COST + (COST - 42)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""StatementCache 의 PREPARE / EXECUTE 오류 처리 - 서버 상태를 흉내 낸 가짜 PostgreSQL 커넥션으로 확인"""
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from prepared import DUPLICATE_PREPARED_STATEMENT, INVALID_SQL_STATEMENT_NAME, PreparedQuery, StatementCache
+
+QUERY = PreparedQuery('products_by_name', "SELECT name FROM products WHERE name = ANY($1)", ('text[]',))
+
+
+class FakeDriverError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+class FakeResult:
+    def fetchall(self):
+        return [('a',)]
+
+    def keys(self):
+        return ['name']
+
+
+class FakeConnection:
+    """서버 쪽 준비된 문장은 server 에 (트랜잭션과 무관하게) 남고, info 는 풀 커넥션별 기록"""
+
+    def __init__(self, server):
+        self.server = server
+        self.info = {}
+        self.statements = []
+        self.fail_execute = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _error(self, sql, pgcode):
+        return DBAPIError(sql, None, FakeDriverError(pgcode))
+
+    def rollback(self):
+        self.statements.append('ROLLBACK')
+
+    def exec_driver_sql(self, sql, params=None):
+        self.statements.append(sql.split()[0])
+        name = sql.split()[1]
+        if sql.startswith('PREPARE'):
+            if name in self.server:
+                raise self._error(sql, DUPLICATE_PREPARED_STATEMENT)
+            self.server.add(name)
+        elif sql.startswith('DEALLOCATE'):
+            self.server.discard(name)
+        elif sql.startswith('EXECUTE'):
+            if name not in self.server:
+                raise self._error(sql, INVALID_SQL_STATEMENT_NAME)
+            if self.fail_execute:
+                pgcode, self.fail_execute = self.fail_execute, None
+                raise self._error(sql, pgcode)
+            return FakeResult()
+
+
+class FakeEngine:
+    def __init__(self):
+        self.dialect = SimpleNamespace(name='postgresql')
+        self.conn = FakeConnection(set())
+
+    def connect(self):
+        return self.conn
+
+
+def test_execute_error_keeps_statement():
+    engine, cache = FakeEngine(), StatementCache()
+    engine.conn.fail_execute = '22P02'
+    with pytest.raises(DBAPIError):
+        cache.read_frame(engine, QUERY, ['a'])
+    # 서버에 남아 있는 문장을 그대로 재사용 (다시 PREPARE 하면 "already exists")
+    assert cache.read_frame(engine, QUERY, ['a'])['name'].tolist() == ['a']
+    assert engine.conn.statements.count('PREPARE') == 1
+    assert cache.stats()['reuses'] == 1
+
+
+def test_missing_server_statement_is_prepared_again():
+    engine, cache = FakeEngine(), StatementCache()
+    cache.read_frame(engine, QUERY, ['a'])
+    engine.conn.server.clear()      # DISCARD ALL
+    with pytest.raises(DBAPIError):
+        cache.read_frame(engine, QUERY, ['a'])
+    assert not engine.conn.info['prepared_statements']
+    assert len(cache.read_frame(engine, QUERY, ['a'])) == 1
+    assert engine.conn.statements.count('PREPARE') == 2
+
+
+def test_duplicate_statement_is_deallocated_and_prepared_again():
+    engine, cache = FakeEngine(), StatementCache()
+    cache.read_frame(engine, QUERY, ['a'])
+    engine.conn.info.clear()        # 기록만 사라지고 서버에는 남은 문장
+    assert len(cache.read_frame(engine, QUERY, ['a'])) == 1
+    assert engine.conn.statements[-5:] == ['PREPARE', 'ROLLBACK', 'DEALLOCATE', 'PREPARE', 'EXECUTE']
+    assert 'products_by_name' in engine.conn.info['prepared_statements']
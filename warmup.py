@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 응답 캐시 워밍업
+- 배포 직후나 카탈로그 변경 후 캐시가 비어 첫 사용자들이 70B 전체 생성을 기다리지 않도록, 자주 쓰이는 입력 조합을 미리 recommend_products 로 실행
+- 시나리오 (자주 쓰일 순서):
+    1. 건강지표 상태 27가지 × 관심 영역 없음
+    2. person_data.json 프로필 × '좋음' 이 아닌 상태 26가지 (user_data 는 문제 지표가 있을 때만 프롬프트에 쓰임)
+    3. 건강지표 상태 × 해당 상태에서 선택 가능한 인체 생리 네트워크 영역 1개 (--areas none 이면 생략)
+- LLM 을 실제로 호출한 시나리오 사이에는 --rpm 기준으로 간격을 둠 (캐시 적중은 대기 없음)
+- LLM 호출은 스케줄러의 배치 우선순위로 보내 같은 프로세스의 대화형 요청보다 뒤에 처리
+- 진행 상황을 출력하고 완료한 시나리오를 상태 파일에 기록 - 다시 실행하면 이어서 (카탈로그 버전이 바뀌면 처음부터)
+
+사용 예:
+    python warmup.py                  # 전체
+    python warmup.py --areas none --rpm 10
+    python warmup.py --restart        # 상태 파일 무시하고 처음부터
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+from catalog_index import HEALTH_INDICATORS
+from llm_scheduler import PRIORITY_BATCH
+from prompts import create_health_assessment
+
+STATUSES = ("좋음", "주의", "관리")
+DEFAULT_STATE_PATH = os.getenv('WARMUP_STATE_PATH', os.path.join(os.getcwd(), '.llm_cache', 'warmup_state.json'))
+DEFAULT_RPM = float(os.getenv('WARMUP_RPM', '20'))
+
+
+def scenario_id(scenario):
+    """시나리오의 고정 식별자 (상태 파일 기록용)"""
+    serialized = json.dumps(scenario, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(serialized).hexdigest()[:16]
+
+
+def build_scenarios(system, profiles, areas='single'):
+    """(이름, assessments, physiology_network, health_concerns, user_data) 시나리오 목록 - 중복 제거, 자주 쓰일 순서"""
+    status_sets = [create_health_assessment(*statuses) for statuses in itertools.product(STATUSES, repeat=len(HEALTH_INDICATORS))]
+    problematic_sets = [a for a in status_sets if any(v in ["주의", "관리"] for v in a.values())]
+
+    scenarios = []
+    for assessments in status_sets:
+        scenarios.append({'name': '상태', 'assessments': assessments, 'physiology': [], 'concerns': [], 'user_data': None})
+    for profile in profiles:
+        for assessments in problematic_sets:
+            scenarios.append({'name': f"프로필 {profile.get('age')}세", 'assessments': assessments, 'physiology': [], 'concerns': [], 'user_data': profile})
+    if areas == 'single':
+        for assessments in status_sets:
+            problematic = [k for k, v in assessments.items() if v in ["주의", "관리"]]
+            physiology_options, _ = system.get_filtered_options(problematic)
+            for area in physiology_options:
+                scenarios.append({'name': f"영역 {area}", 'assessments': assessments, 'physiology': [area], 'concerns': [], 'user_data': None})
+
+    unique = {}
+    for scenario in scenarios:
+        unique.setdefault(scenario_id(scenario), scenario)
+    return list(unique.items())
+
+
+class WarmupState:
+    """완료한 시나리오 기록 (카탈로그 버전별, 임시 파일 교체로 원자적 저장)"""
+
+    def __init__(self, path, catalog_version, restart=False):
+        self.path = path
+        self.catalog_version = catalog_version
+        self.done = set()
+        if not restart:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('catalog_version') == catalog_version:
+                    self.done = set(data.get('done', []))
+            except (FileNotFoundError, ValueError):
+                pass
+
+    def mark(self, sid):
+        self.done.add(sid)
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.warmup-', suffix='.json', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'catalog_version': self.catalog_version, 'done': sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def run(system, scenarios, state, rpm=DEFAULT_RPM, save_every=10, out=sys.stdout):
+    """시나리오를 순서대로 실행 - 결과별 개수 반환 (cached: LLM 호출 없음, generated: 새로 생성, failed: 오류)"""
+    pending = [(sid, scenario) for sid, scenario in scenarios if sid not in state.done]
+    print(f"시나리오 {len(scenarios)}개 중 완료 {len(scenarios) - len(pending)}개, 남은 {len(pending)}개", file=out)
+
+    interval = 60.0 / rpm if rpm and rpm > 0 else 0.0
+    counts = {'cached': 0, 'generated': 0, 'failed': 0}
+    started = time.monotonic()
+    for index, (sid, scenario) in enumerate(pending, 1):
+        attempts_before = system.llm_client.stats()['attempts']
+        scenario_started = time.monotonic()
+        try:
+            _, explanation = system.recommend_products(
+                assessments=scenario['assessments'],
+                physiology_network=scenario['physiology'],
+                health_concerns=scenario['concerns'],
+                user_data=scenario['user_data'],
+            )
+        except Exception as e:
+            explanation = f"오류가 발생했습니다: {e}"
+        called_llm = system.llm_client.stats()['attempts'] > attempts_before
+
+        if "오류가 발생했습니다" in (explanation or ""):
+            result = 'failed'
+        else:
+            result = 'generated' if called_llm else 'cached'
+            state.mark(sid)
+        counts[result] += 1
+
+        elapsed = time.monotonic() - started
+        eta = elapsed / index * (len(pending) - index)
+        statuses = '/'.join(scenario['assessments'].values())
+        print(f"[{index}/{len(pending)}] {result:<9} {scenario['name']} ({statuses}) - 경과 {elapsed:.0f}초, 남은 예상 {eta:.0f}초", file=out)
+        if index % save_every == 0:
+            state.save()
+
+        # LLM 을 호출한 경우에만 다음 시나리오까지 간격 유지
+        if called_llm and index < len(pending):
+            time.sleep(max(0.0, interval - (time.monotonic() - scenario_started)))
+    state.save()
+    print(f"완료: 새로 생성 {counts['generated']}, 캐시 적중 {counts['cached']}, 실패 {counts['failed']}", file=out)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LLM 응답 캐시 워밍업")
+    parser.add_argument('--profiles', default='person_data.json')
+    parser.add_argument('--areas', choices=('none', 'single'), default='single', help="관심 영역 1개 선택 시나리오 포함 여부")
+    parser.add_argument('--rpm', type=float, default=DEFAULT_RPM, help="분당 LLM 호출 상한 (0 이면 제한 없음)")
+    parser.add_argument('--limit', type=int, default=None, help="앞에서부터 N개 시나리오만")
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH)
+    parser.add_argument('--restart', action='store_true', help="상태 파일을 무시하고 처음부터")
+    args = parser.parse_args(argv)
+
+    from catalog_index import get_catalog_index
+    from connections import get_setting
+    from data import HealthRAGSystem
+
+    with open(args.profiles, 'r', encoding='utf-8') as f:
+        profiles = json.load(f)
+
+    system = HealthRAGSystem(get_setting('GROQ_API_KEY', ''))
+    system.llm_priority = PRIORITY_BATCH
+    scenarios = build_scenarios(system, profiles, areas=args.areas)
+    if args.limit is not None:
+        scenarios = scenarios[:args.limit]
+    state = WarmupState(args.state, get_catalog_index(system.engine).version(), restart=args.restart)
+    counts = run(system, scenarios, state, rpm=args.rpm)
+    print(json.dumps(system.query_cache_stats()['llm_responses'], ensure_ascii=False))
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
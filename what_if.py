@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+What-if 지수 계산기
+- 세 지수는 클리핑 전까지 입력값에 대한 선형식이므로, 변수별 기여도를 보관해 두면
+  입력 하나가 바뀔 때 해당 변수의 기여도 차이만 더해 O(1)로 점수 갱신
+- 기여도는 모집단 평균(mean) 대비 100점 환산 점수로 표현 (평균 프로필일 때 0)
+- 원본에 없어 다른 입력으로부터 채운 값(pack_year ← smok_dur, he_bmi ← weight/height, asm ← skeletal_muscle_mass)은
+  원본 입력이 바뀌면 스키마 기본값 규칙으로 다시 계산 (직접 값을 지정하면 그 뒤로는 고정)
+"""
+
+import math
+
+from index_registry import FEATURES, MUSCLE_PERCENT_FIELDS, clip_score, current_models
+from record_schema import RECORD_SCHEMA
+
+# 원본 입력 → 영향을 받는 파생 변수
+_DERIVED_BY_SOURCE = {source: (var,) for var, source in MUSCLE_PERCENT_FIELDS}
+_DERIVED_BY_SOURCE['weight'] = tuple(var for var, _ in MUSCLE_PERCENT_FIELDS)
+_DERIVED_SOURCE = dict(MUSCLE_PERCENT_FIELDS)
+
+
+class WhatIfScorer:
+    """변수별 기여도를 유지하며 입력 변경 시 점수를 증분 갱신하는 계산기"""
+
+    def __init__(self, data, models=None):
+        self.models = models or current_models()
+        # 기본값이 채워진 입력값과, 스키마로 디코딩된 변수값
+        self.values = RECORD_SCHEMA.fill_defaults(data)
+        self.defaulted = RECORD_SCHEMA.derived_defaults(data)
+        self.features = dict(zip(FEATURES, RECORD_SCHEMA.decode_one(data).tolist()))
+
+        # 모델별 {변수: (가중치, 평균)} / {변수: 기여도} / 총점
+        self._terms = {}
+        self.contributions = {}
+        self.totals = {}
+        for key, model in self.models.models.items():
+            terms = {}
+            for i, weight in model.used_index:
+                terms[FEATURES[i]] = (weight, float(model.centers[i]))
+            self._terms[key] = terms
+        self.recompute()
+
+    def recompute(self):
+        """전체 기여도와 총점을 다시 계산 (증분 갱신 누적 오차 정리용)"""
+        for key, model in self.models.models.items():
+            contributions = {
+                var: weight * (self.features[var] - center)
+                for var, (weight, center) in self._terms[key].items()
+            }
+            baseline = model.offset + sum(weight * center for weight, center in self._terms[key].values())
+            self.contributions[key] = contributions
+            self.totals[key] = baseline + sum(contributions.values())
+
+    def _update_feature(self, var, value):
+        old = self.features[var]
+        if value == old:
+            return
+        self.features[var] = value
+        for key, terms in self._terms.items():
+            if var in terms:
+                weight, center = terms[var]
+                new_contrib = weight * (value - center)
+                self.totals[key] += new_contrib - self.contributions[key][var]
+                self.contributions[key][var] = new_contrib
+
+    def _get(self, name):
+        value = self.values.get(name)
+        return float('nan') if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+    def _apply(self, name, value):
+        self.values[name] = value
+        if name in self.features:
+            self._update_feature(name, value)
+        for var in _DERIVED_BY_SOURCE.get(name, ()):
+            source = _DERIVED_SOURCE[var]
+            self._update_feature(var, (self.values[source] / self.values['weight']) * 100)
+        # 이 입력으로부터 기본값을 채운 필드도 다시 계산
+        for spec in RECORD_SCHEMA.dependents(name):
+            if spec.name in self.defaulted:
+                self._apply(spec.name, spec.default_value(self._get))
+
+    def set(self, name, value):
+        """입력값 하나 변경 - 해당 변수(와 체중 대비 % 파생 변수, 이 값으로 채운 기본값)의 기여도만 갱신"""
+        self.defaulted.discard(name)
+        self._apply(name, value)
+
+    def update(self, changes):
+        for name, value in changes.items():
+            self.set(name, value)
+
+    def scores(self):
+        """현재 입력값 기준 세 지수 (calculate_three_indices 와 같은 형태)"""
+        return {model.name: clip_score(self.totals[key]) for key, model in self.models.models.items()}
+
+    def what_if(self, changes):
+        """입력을 임시로 바꿨을 때의 점수 (상태는 원래대로 복원)"""
+        previous = {name: self.values.get(name) for name in changes}
+        defaulted = set(self.defaulted)
+        self.update(changes)
+        try:
+            return self.scores()
+        finally:
+            self.update(previous)
+            self.defaulted = defaulted
+
+    def breakdown(self, key):
+        """지수별 변수 기여도 목록 [(변수, 점수)] - 영향이 큰 순서"""
+        if key not in self.contributions:
+            key = next(k for k, model in self.models.models.items() if model.name == key)
+        return sorted(self.contributions[key].items(), key=lambda item: abs(item[1]), reverse=True)